@@ -0,0 +1,426 @@
+"""Benchmark checks, validation and Update All against synthetic catalogs.
+
+Runs on a plain Linux/macOS box: stub `powershell` and `msiexec` commands
+with configurable latency are put first on PATH, and fake installers (stub
+scripts), zip bundles and install
+directories are generated in a temporary workspace. Everything is driven
+through the GUI-free code paths (the CLI's check/update functions and
+validate_programs), so no display is needed.
+
+    python scripts/benchmark.py --save baseline.json
+    python scripts/benchmark.py --compare baseline.json
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+
+# Share the code under test with the GUI in src/
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "..", "src"))
+from catalog import CatalogCache
+from cli import check_programs, update_programs
+from version_probe import NEEDS_UPDATE
+from config import read_programs
+from probe_cache import ProbeCache
+from settings import load_settings
+import validate_programs
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+# Stub PowerShell: version batches answer with one version per path (looked
+# up by file name in DFIR_BENCH_EXE_VERSIONS, a JSON object), or with the raw
+# DFIR_BENCH_VERSION_REPLY and exit code DFIR_BENCH_VERSION_EXIT if set; any
+# other command echoes its quoted text after the probe latency
+STUB_POWERSHELL = '''#!{python}
+import json, os, re, sys, time
+command = sys.argv[-1] if len(sys.argv) > 1 else ""
+time.sleep(float(os.environ.get("DFIR_BENCH_PROBE_LATENCY", "0")))
+if "VersionInfo" in command:
+    paths = json.loads(sys.stdin.read() or "[]")
+    versions = json.loads(os.environ.get("DFIR_BENCH_EXE_VERSIONS", "{}"))
+    default = os.environ.get("DFIR_BENCH_EXE_VERSION", "1.0.0")
+    reply = [versions.get(os.path.basename(path), default) for path in paths]
+    print(os.environ.get("DFIR_BENCH_VERSION_REPLY", json.dumps(reply)))
+    sys.exit(int(os.environ.get("DFIR_BENCH_VERSION_EXIT", "0")))
+else:
+    match = re.search(r"'([^']*)'", command)
+    print(match.group(1) if match else "")
+'''
+
+# Stub installer, used for the fake .exe installers and as msiexec: reports
+# progress and exits after the install latency
+STUB_INSTALLER = '''#!{python}
+import os, time
+latency = float(os.environ.get("DFIR_BENCH_INSTALL_LATENCY", "0"))
+for percent in (50, 100):
+    time.sleep(latency / 2)
+    print(f"Installing... {percent}%", flush=True)
+'''
+
+# Version each fake program reports when installed, and the one "available"
+OLD_VERSION = "1.0.0"
+NEW_VERSION = "2.0.0"
+
+def utf16z(text):
+    """Encode a string as NUL-terminated UTF-16LE"""
+    return text.encode("utf-16-le") + b"\0\0"
+
+def pad4(data):
+    """Pad bytes to a 32-bit boundary"""
+    return data + b"\0" * (-len(data) % 4)
+
+def version_block(key, value=b"", value_length=0, value_type=0, children=b""):
+    """Build one VS_VERSIONINFO block (wLength, wValueLength, wType, szKey, value, children)"""
+    body = pad4(pad4(struct.pack("<HHH", 0, value_length, value_type) + utf16z(key)) + value) + children
+    return struct.pack("<H", len(body)) + body[2:]
+
+def write_fake_exe(path, version):
+    """Write a minimal PE32 file whose only content is a version resource"""
+    strings = b""
+    for key in ("FileVersion", "ProductVersion"):
+        value = utf16z(version)
+        strings += pad4(version_block(key, value, len(value) // 2, 1))
+    numbers = [int(part) for part in (version.split(".") + ["0"] * 4)[:4]]
+    fixed = struct.pack(
+        "<13I", 0xFEEF04BD, 0x10000,
+        (numbers[0] << 16) | numbers[1], (numbers[2] << 16) | numbers[3],
+        (numbers[0] << 16) | numbers[1], (numbers[2] << 16) | numbers[3],
+        0, 0, 0, 0, 0, 0, 0
+    )
+    table = pad4(version_block("040904b0", children=strings, value_type=1))
+    string_info = pad4(version_block("StringFileInfo", children=table, value_type=1))
+    version_info = version_block("VS_VERSION_INFO", fixed, len(fixed), 0, string_info)
+
+    # Resource tree: type RT_VERSION -> name 1 -> language 0x409 -> data entry
+    rsrc_rva, raw_offset, data_offset = 0x1000, 0x400, 88
+    directory = struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1)
+    rsrc = (
+        directory + struct.pack("<II", 16, 0x80000000 | 24) +
+        directory + struct.pack("<II", 1, 0x80000000 | 48) +
+        directory + struct.pack("<II", 0x409, 72) +
+        struct.pack("<IIII", rsrc_rva + data_offset, len(version_info), 0, 0)
+    )
+    rsrc += b"\0" * (data_offset - len(rsrc)) + version_info
+
+    dos = b"MZ" + b"\0" * 58 + struct.pack("<I", 0x80)
+    dos += b"\0" * (0x80 - len(dos))
+    coff = b"PE\0\0" + struct.pack("<HHIIIHH", 0x14C, 1, 0, 0, 0, 224, 0x22)
+    optional = bytearray(224)
+    struct.pack_into("<H", optional, 0, 0x10B)
+    struct.pack_into("<II", optional, 96 + 16, rsrc_rva, len(rsrc))
+    section = b".rsrc\0\0\0" + struct.pack(
+        "<IIII", len(rsrc), rsrc_rva, len(rsrc) + (-len(rsrc) % 512), raw_offset) + b"\0" * 16
+    header = dos + coff + bytes(optional) + section
+    header += b"\0" * (raw_offset - len(header))
+
+    with open(path, "wb") as f:
+        f.write(header + rsrc + b"\0" * (-len(rsrc) % 512))
+
+def write_stub(bin_dir, name, script):
+    """Write a stub executable into bin_dir"""
+    os.makedirs(bin_dir, exist_ok=True)
+    path = os.path.join(bin_dir, name)
+    with open(path, "w") as f:
+        f.write(script.replace("{python}", sys.executable))
+    os.chmod(path, 0o755)
+    return path
+
+def write_stub_powershell(bin_dir):
+    """Write the stub powershell executable into bin_dir"""
+    return write_stub(bin_dir, "powershell", STUB_POWERSHELL)
+
+def write_zip_bundle(path, files, file_size):
+    """Write a zip installer with a number of pseudo-random files"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for n in range(files):
+            seed = hashlib.sha256(f"{path}:{n}".encode()).digest()
+            archive.writestr(f"tool/file_{n:03d}.bin", (seed * (file_size // len(seed) + 1))[:file_size])
+
+def sha256_of(path):
+    """Return the SHA-256 of a file"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def generate_catalog(workspace, size, zip_bundles=4, zip_files=20, file_size=8192, installer_size=32768):
+    """Generate a synthetic programs.json and the files it refers to; returns its path.
+
+    Programs rotate through every version_check type (including none and a
+    missing version_check), through up to date / outdated / not installed
+    states and through exe, msi and zip installers. exe_version probes
+    alternate between real PE files (read natively) and non-PE files (which
+    fall back to PowerShell). Every other program has a sha256 configured.
+    """
+    installers_dir = os.path.join(workspace, "installers")
+    install_root = os.path.join(workspace, "install")
+    os.makedirs(installers_dir, exist_ok=True)
+    os.makedirs(install_root, exist_ok=True)
+
+    bundles = []
+    for n in range(zip_bundles):
+        path = os.path.join(installers_dir, f"bundle_{n}.zip")
+        write_zip_bundle(path, zip_files, file_size)
+        bundles.append(path)
+
+    check_types = ["none", "exe_version", "exe_version_fallback", "cmd_output", "file_content", None]
+    programs = []
+    for i in range(size):
+        name = f"Program{i:04d}"
+        check_type = check_types[i % len(check_types)]
+        state = (i // len(check_types)) % 3  # 0 up to date, 1 outdated, 2 not installed
+        installed_version = NEW_VERSION if state == 0 else OLD_VERSION
+        install_path = os.path.join(install_root, name)
+
+        installer_kind = ("exe", "msi", "zip")[(i + i // len(check_types)) % 3]
+        if installer_kind == "zip":
+            installer_path = bundles[i % len(bundles)]
+        else:
+            installer_path = os.path.join(installers_dir, f"{name}.{installer_kind}")
+            # Executable stub padded to installer_size, so hashing and staging have some data to read
+            padding = "#" + hashlib.sha256(name.encode()).hexdigest() * (installer_size // 64) + "\n"
+            with open(installer_path, "w") as f:
+                f.write(STUB_INSTALLER.replace("{python}", sys.executable) + padding)
+            os.chmod(installer_path, 0o755)
+
+        program = {
+            "name": name,
+            "install_path": install_path,
+            "installer_path": installer_path,
+            "silent_args": "/quiet" if installer_kind == "msi" else "/S",
+            "new_version": NEW_VERSION,
+        }
+        if (i // 3) % 2 == 0:
+            program["sha256"] = sha256_of(installer_path)
+
+        if state != 2:
+            os.makedirs(install_path, exist_ok=True)
+
+        exe_path = os.path.join(install_path, f"{name}.exe")
+        if check_type in ("exe_version", "exe_version_fallback"):
+            program["version_check"] = {"type": "exe_version", "path": exe_path}
+            if state != 2 and check_type == "exe_version":
+                write_fake_exe(exe_path, installed_version)
+            elif state != 2:
+                with open(exe_path, "wb") as f:
+                    f.write(b"not a PE file")
+        elif check_type == "cmd_output":
+            program["version_check"] = {
+                "type": "cmd_output",
+                "command": f"powershell -NoProfile -Command \"Write-Output '{name} version {installed_version}'\"",
+                "regex": r"version ([\d.]+)",
+            }
+        elif check_type == "file_content":
+            version_file = os.path.join(install_path, "version.txt")
+            program["version_check"] = {"type": "file_content", "path": version_file, "regex": r"Version: ([\d.]+)"}
+            if state != 2:
+                with open(version_file, "w") as f:
+                    f.write(f"{name}\nVersion: {installed_version}\n")
+        elif check_type == "none":
+            program["version_check"] = {"type": "none"}
+
+        programs.append(program)
+
+    config_path = os.path.join(workspace, "programs.json")
+    with open(config_path, "w") as f:
+        json.dump(programs, f, indent=2)
+    return config_path
+
+def reset_data_dir(workspace, settings):
+    """Delete the app data directory (caches, manifests) of a workspace"""
+    shutil.rmtree(os.path.join(workspace, settings["data_dir"]), ignore_errors=True)
+
+def time_runs(func, repeat, setup=None):
+    """Run func repeat times and return the durations in seconds"""
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+def summarize(durations):
+    """Reduce repeated durations to the numbers that are saved and compared"""
+    return {
+        "median": round(statistics.median(durations), 6),
+        "min": round(min(durations), 6),
+        "max": round(max(durations), 6),
+        "runs": len(durations),
+    }
+
+def benchmark_size(workspace, size, repeat, log):
+    """Benchmark one catalog size; returns {benchmark name: summary}"""
+    config_path = generate_catalog(workspace, size)
+    settings = load_settings()
+    results = {}
+
+    def record(name, durations):
+        key = f"{name}/{size}"
+        results[key] = summarize(durations)
+        log(f"  {key:<24} median {results[key]['median']:8.3f} s   min {results[key]['min']:8.3f} s")
+
+    record("config_load", time_runs(lambda: read_programs(config_path), repeat))
+
+    # Loading through a warm snapshot cache skips schema validation
+    catalog_cache_path = os.path.join(workspace, "bench_catalog_cache.json")
+    read_programs(config_path, CatalogCache(catalog_cache_path))
+    record("config_load_cached", time_runs(
+        lambda: read_programs(config_path, CatalogCache(catalog_cache_path)), repeat))
+    programs = read_programs(config_path)
+
+    # Cold check: no probe cache, every probe runs
+    record("check_cold", time_runs(lambda: check_programs(programs, settings), repeat))
+
+    # Warm check: the probe cache was filled by a previous check
+    cache_path = os.path.join(workspace, "bench_probe_cache.json")
+
+    def warm_check():
+        check_programs(programs, settings, ProbeCache(
+            cache_path,
+            cmd_output_ttl=settings["cmd_output_ttl"],
+            max_entries=max(size, settings["probe_cache_max_entries"]),
+            max_age_days=settings["probe_cache_max_age_days"]
+        ))
+
+    warm_check()
+    record("check_warm", time_runs(warm_check, repeat))
+
+    # validate_programs.py, with a cold hash manifest each run
+    def validate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            validate_programs.validate_programs()
+
+    record("validate", time_runs(validate, repeat, setup=lambda: reset_data_dir(workspace, settings)))
+
+    # Update All: everything the check reports as missing or outdated
+    checks = check_programs(programs, settings)
+    to_update = [
+        program for program, check in zip(programs, checks)
+        if check["status"] in NEEDS_UPDATE
+    ]
+
+    def reset_installs():
+        reset_data_dir(workspace, settings)
+        # Zip installs are extracted again from scratch on every run
+        for program in to_update:
+            if program["installer_path"].endswith(".zip"):
+                shutil.rmtree(program["install_path"], ignore_errors=True)
+
+    def update_all():
+        with contextlib.redirect_stderr(io.StringIO()):
+            update_programs(to_update, settings)
+
+    record("update_all", time_runs(update_all, repeat, setup=reset_installs))
+    return results
+
+def compare(results, baseline, threshold, min_delta=0.005):
+    """Print each benchmark against the baseline; returns the names that regressed.
+
+    A benchmark regressed if its median grew by more than threshold (relative)
+    and by more than min_delta seconds, so sub-millisecond noise is ignored.
+    """
+    regressions = []
+    print(f"{'benchmark':<24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            print(f"{key:<24} {'-':>10} {current['median']:10.3f}      new")
+            continue
+        change = (current["median"] - previous["median"]) / previous["median"] if previous["median"] else 0.0
+        marker = ""
+        if change > threshold and current["median"] - previous["median"] > min_delta:
+            marker = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<24} {previous['median']:10.3f} {current['median']:10.3f} {change:+8.1%}{marker}")
+    return regressions
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(description="Benchmark checks, validation and Update All on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Catalog sizes (default: 10 100 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the median is reported (default: 3)")
+    parser.add_argument("--probe-latency", type=float, default=0.05,
+                        help="Seconds the stub powershell takes per version query (default: 0.05)")
+    parser.add_argument("--install-latency", type=float, default=0.05,
+                        help="Seconds each stub installer takes (default: 0.05)")
+    parser.add_argument("--save", metavar="FILE", help="Save the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="FILE", help="Compare the results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown of a median that counts as a regression (default: 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="Smallest slowdown in seconds that counts as a regression (default: 0.005)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated workspaces")
+    return parser
+
+def main(argv=None):
+    """Run the benchmarks; returns 1 if --compare found a regression"""
+    args = build_parser().parse_args(argv)
+    log = lambda message: print(message, flush=True)
+
+    root = tempfile.mkdtemp(prefix="dfir_bench_")
+    cwd = os.getcwd()
+    environ = dict(os.environ)
+    os.environ["PATH"] = os.path.join(root, "bin") + os.pathsep + os.environ.get("PATH", "")
+    os.environ["DFIR_BENCH_PROBE_LATENCY"] = str(args.probe_latency)
+    os.environ["DFIR_BENCH_INSTALL_LATENCY"] = str(args.install_latency)
+    os.environ["DFIR_BENCH_EXE_VERSION"] = OLD_VERSION
+    write_stub_powershell(os.path.join(root, "bin"))
+    write_stub(os.path.join(root, "bin"), "msiexec", STUB_INSTALLER)
+
+    results = {}
+    try:
+        for size in args.sizes:
+            log(f"Catalog of {size} programs:")
+            workspace = os.path.join(root, f"catalog_{size}")
+            os.makedirs(workspace)
+            # Settings, caches and programs.json are looked up in the current directory
+            os.chdir(workspace)
+            try:
+                results.update(benchmark_size(workspace, size, max(1, args.repeat), log))
+            finally:
+                os.chdir(cwd)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+        if args.keep:
+            log(f"Workspaces kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    document = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "probe_latency": args.probe_latency,
+        "install_latency": args.install_latency,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(document, f, indent=2)
+        log(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.threshold, args.min_delta):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
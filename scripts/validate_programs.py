@@ -1,184 +1,233 @@
+import argparse
+import csv
 import json
 import os
-import subprocess
-import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def get_resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller"""
+# Share the probe engine and helpers with the GUI in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from catalog import CatalogCache, ConfigError
+from config import find_config_path, read_programs
+from install_manifest import InstallIndex
+from integrity import HashManifest, verify_installers
+from program_state import ProgramStore
+from settings import get_data_path, load_settings
+from timeouts import create_timeout_policy
+from timing_history import open_timing_history
+from update_planner import plan_updates
+from version_probe import ProbeEngine
+
+CSV_FIELDS = [
+    "config", "name", "installer_path", "installer_found", "hash_status", "installed", "current_version",
+    "new_version", "status", "install_check", "error"
+]
+
+def validate_catalog(config_path, plan=False):
+    """Validate one programs.json and return its report as a dict.
+
+    All programs are probed concurrently through the same probe engine as the
+    GUI, and installer hashes are verified concurrently. Load errors are
+    reported in the "error" field (schema problems also in "problems")
+    instead of being raised, so one broken catalog does not stop a fleet run.
+    With plan=True, the report's "plan" holds the dry-run Update All plan of
+    the programs that need updating.
+    """
+    report = {"config": config_path, "error": None, "problems": [], "programs": [], "plan": None}
+    settings = load_settings()
     try:
-        # PyInstaller creates a temp folder and stores path in _MEIPASS
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    
-    return os.path.join(base_path, relative_path)
-
-def get_program_version(program):
-    """Get the currently installed version of a program"""
+        programs = read_programs(config_path, CatalogCache(get_data_path(settings, "catalog_cache.json")))
+    except FileNotFoundError:
+        report["error"] = "programs.json file not found"
+        return report
+    except json.JSONDecodeError as e:
+        report["error"] = f"Invalid JSON in programs.json: {str(e)}"
+        return report
+    except ConfigError as e:
+        report["error"] = f"{len(e.problems)} schema problem(s) in programs.json"
+        report["problems"] = e.problems
+        return report
+    except Exception as e:
+        report["error"] = str(e)
+        return report
+
     try:
-        # Check if program has version checking configuration
-        if "version_check" not in program:
-            return "Unknown"
-            
-        version_check = program["version_check"]
-        check_type = version_check.get("type", "none")
-        
-        if check_type == "none":
-            return "N/A"
-            
-        elif check_type == "exe_version":
-            # Get version from executable file properties
-            exe_path = version_check.get("path", "")
-            if not os.path.exists(exe_path):
-                return "Not Installed"
-                
-            # Use PowerShell to get file version
-            ps_command = f"(Get-Item '{exe_path}').VersionInfo.ProductVersion"
-            result = subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-            else:
-                return "Unknown"
-                
-        elif check_type == "cmd_output":
-            # Get version from command output
-            command = version_check.get("command", "")
-            regex_pattern = version_check.get("regex", "")
-            
-            if not command:
-                return "Unknown"
-                
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30
+        # Verify all installer hashes up front, reusing cached hashes of unchanged files
+        manifest = HashManifest(get_data_path(settings, "hash_manifest.json"))
+        hash_results = verify_installers(programs, manifest=manifest, max_workers=settings["verify_workers"])
+
+        # Probe every program at once (exe versions in one batch)
+        # and check installs that have a manifest for missing or modified files
+        install_index = InstallIndex(get_data_path(settings, "install_index.json"), hash_workers=settings["verify_workers"])
+        history = open_timing_history(settings)
+        engine = ProbeEngine(
+            max_workers=settings["probe_workers"],
+            install_index=install_index,
+            timeouts=create_timeout_policy(settings, history)
+        )
+        try:
+            probes = engine.probe_all_sync(programs)
+        finally:
+            engine.shutdown()
+
+        # Every entry passed schema validation, so all required fields are present
+        store = ProgramStore(programs)
+        for state, (installed, current_version) in zip(store, probes):
+            program = state.program
+            status = store.apply_probe(state, installed, current_version)
+            hash_status, hash_message = hash_results[program["name"]]
+            check = install_index.last_check(program["name"])
+            report["programs"].append({
+                "name": program["name"],
+                "installer_path": program["installer_path"],
+                "installer_found": os.path.exists(program["installer_path"]),
+                "hash_status": hash_status,
+                "hash_message": hash_message,
+                "installed": installed,
+                "current_version": current_version,
+                "new_version": program.get("new_version", "Unknown"),
+                "status": status,
+                "install_check": check.describe() if check else None,
+            })
+
+        if plan:
+            to_update = [state.program for state in store.needing_update()]
+            update_plan = plan_updates(
+                to_update,
+                history,
+                max_workers=settings["install_workers"],
+                class_limits=settings["install_class_limits"],
+                manifest=manifest
             )
-            
-            if result.returncode == 0 and result.stdout:
-                if regex_pattern:
-                    match = re.search(regex_pattern, result.stdout)
-                    if match:
-                        return match.group(1)
-                return result.stdout.strip()
-            elif result.stderr:
-                match = re.search(regex_pattern, result.stderr)
-                if match:
-                    return match.group(1)
-                return "Unknown"
-            else:
-                return "Unknown"
-                
-        elif check_type == "file_content":
-            # Get version from file content
-            file_path = version_check.get("path", "")
-            regex_pattern = version_check.get("regex", "")
-            
-            if not os.path.exists(file_path):
-                return "Not Installed"
-                
-            with open(file_path, "r") as f:
-                content = f.read()
-                
-            if regex_pattern:
-                match = re.search(regex_pattern, content)
-                if match:
-                    return match.group(1)
-            return "Unknown"
-            
-        else:
-            return "Unknown"
-            
-    except subprocess.TimeoutExpired:
-        return "Timeout"
+            report["plan"] = dict(update_plan.as_dict(), lines=update_plan.describe())
     except Exception as e:
-        print(f"Error getting version: {str(e)}")
-        return "Error"
+        report["error"] = str(e)
+    return report
 
-def validate_programs():
-    """Validate the programs.json file"""
-    try:
-        # First check if programs.json exists in current directory (for packaged version)
-        cwd_config_path = os.path.join(os.getcwd(), "programs.json")
-        if os.path.exists(cwd_config_path):
-            config_path = cwd_config_path
+def validate_catalogs(config_paths, processes=None, plan=False):
+    """Validate several catalogs, spread across a process pool; returns reports in input order"""
+    if len(config_paths) == 1:
+        return [validate_catalog(config_paths[0], plan)]
+    processes = processes or min(len(config_paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max(1, processes)) as pool:
+        return list(pool.map(validate_catalog, config_paths, [plan] * len(config_paths)))
+
+def print_report(report, show_config=False):
+    """Print a catalog report in the human-readable format"""
+    if show_config:
+        print(f"=== {report['config']} ===")
+    if report["error"]:
+        print(f"ERROR: {report['error']}")
+        for problem in report["problems"]:
+            print(f"  {problem}")
+        return
+
+    print(f"Found {len(report['programs'])} programs in programs.json")
+    print("-" * 50)
+
+    for i, entry in enumerate(report["programs"]):
+        print(f"Program {i+1}: {entry['name']}")
+
+        # Check if installer exists
+        if entry["installer_found"]:
+            print(f"  Installer: Found")
         else:
-            # For development version, look in project root
-            config_path = get_resource_path("programs.json")
-        
-        # Load programs from JSON file
-        with open(config_path, "r") as f:
-            programs = json.load(f)
-            
-        print(f"Found {len(programs)} programs in programs.json")
-        print("-" * 50)
-        
-        # Validate each program
-        for i, program in enumerate(programs):
-            print(f"Program {i+1}: {program['name']}")
-            
-            # Check required fields
-            required_fields = ["name", "install_path", "installer_path", "silent_args"]
-            for field in required_fields:
-                if field not in program:
-                    print(f"  ERROR: Missing field '{field}'")
-                    continue
-                    
-            # Check if installer exists
-            if os.path.exists(program["installer_path"]):
-                print(f"  Installer: Found")
-            else:
-                print(f"  Installer: NOT FOUND ({program['installer_path']})")
-                
-            # Check if currently installed
-            if os.path.exists(program["install_path"]):
-                print(f"  Status: Installed")
-            else:
-                print(f"  Status: Not Installed")
-                
-            # Check version information
-            current_version = get_program_version(program)
-            new_version = program.get("new_version", "Unknown")
-            
-            print(f"  Current Version: {current_version}")
-            if new_version != "Unknown" and new_version != "N/A":
-                print(f"  New Version: {new_version}")
-                
-                # Check if update is available
-                if (new_version != "Unknown" and new_version != "N/A" and 
-                    current_version != new_version and 
-                    current_version != "Not Installed" and
-                    current_version != "Unknown"):
-                    print(f"  Update Available: YES")
-                elif current_version == "Not Installed":
-                    print(f"  Update Available: Not Installed")
-                else:
-                    print(f"  Update Available: NO")
+            print(f"  Installer: NOT FOUND ({entry['installer_path']})")
+
+        # Check installer hash
+        if entry["hash_status"] == "OK":
+            print(f"  Hash: OK")
+        elif entry["hash_status"] == "No Hash":
+            print(f"  Hash: Not configured")
+        elif entry["hash_status"] != "Missing":
+            print(f"  Hash: {entry['hash_status'].upper()} ({entry['hash_message']})")
+
+        # Check if currently installed
+        if entry["installed"]:
+            print(f"  Status: Installed")
+        else:
+            print(f"  Status: Not Installed")
+
+        if entry.get("install_check") and entry["status"] == "Damaged":
+            print(f"  Install: DAMAGED ({entry['install_check']})")
+
+        # Check version information
+        new_version = entry["new_version"]
+        print(f"  Current Version: {entry['current_version']}")
+        if new_version != "Unknown" and new_version != "N/A":
+            print(f"  New Version: {new_version}")
+            if entry["status"] == "Update Available":
+                print(f"  Update Available: YES")
+            elif entry["status"] == "Not Installed":
+                print(f"  Update Available: Not Installed")
+            elif entry["status"] == "Damaged":
+                print(f"  Update Available: Reinstall (damaged)")
+            elif entry["status"] == "Newer Installed":
+                print(f"  Update Available: NO (installed version is newer; downgrade flagged)")
             else:
-                print(f"  New Version: N/A")
-                
-            print()
-            
+                print(f"  Update Available: NO")
+        else:
+            print(f"  New Version: N/A")
+
+        print()
+
+    if report["plan"]:
+        print("Update All plan (dry run):")
+        for line in report["plan"]["lines"]:
+            print(f"  {line}")
+        print()
+
+def write_json_report(reports, path):
+    """Write all catalog reports as one JSON document"""
+    with open(path, "w") as f:
+        json.dump({"catalogs": reports}, f, indent=2)
+        f.write("\n")
+
+def write_csv_report(reports, path):
+    """Write one CSV row per program (or per catalog that failed to load)"""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for report in reports:
+            if report["error"]:
+                writer.writerow({"config": report["config"], "error": "; ".join([report["error"]] + report["problems"])})
+            for entry in report["programs"]:
+                writer.writerow(dict(entry, config=report["config"]))
+
+def validate_programs(config_paths=None, json_path=None, csv_path=None, processes=None, quiet=False, plan=False):
+    """Validate one or more programs.json files and print and/or write the reports.
+
+    Returns True if every catalog could be loaded.
+    """
+    # programs.json in the current directory wins over the bundled one
+    config_paths = list(config_paths or [find_config_path()])
+    reports = validate_catalogs(config_paths, processes, plan)
+
+    if not quiet:
+        for report in reports:
+            print_report(report, show_config=len(reports) > 1)
         print("Validation complete.")
-        return True
-        
-    except FileNotFoundError:
-        print("ERROR: programs.json file not found")
-        return False
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Invalid JSON in programs.json: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"ERROR: {str(e)}")
-        return False
+
+    if json_path:
+        write_json_report(reports, json_path)
+    if csv_path:
+        write_csv_report(reports, csv_path)
+    return all(not report["error"] for report in reports)
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(description="Validate programs.json catalogs and report installed versions.")
+    parser.add_argument("configs", nargs="*", metavar="CONFIG",
+                        help="programs.json files to validate (default: current directory, then bundled)")
+    parser.add_argument("--json", metavar="FILE", help="Write a JSON report of all catalogs")
+    parser.add_argument("--csv", metavar="FILE", help="Write a CSV report with one row per program")
+    parser.add_argument("--processes", type=int, help="Catalogs validated in parallel (default: one per CPU)")
+    parser.add_argument("--quiet", action="store_true", help="Do not print the text report")
+    parser.add_argument("--plan", action="store_true",
+                        help="Include a dry-run Update All plan with the predicted wall-clock time")
+    return parser
 
 if __name__ == "__main__":
-    validate_programs()
\ No newline at end of file
+    args = build_parser().parse_args()
+    ok = validate_programs(args.configs, args.json, args.csv, args.processes, args.quiet, args.plan)
+    sys.exit(0 if ok else 1)
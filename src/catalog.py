@@ -0,0 +1,348 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from json_store import save_entries
+from timeouts import TIMEOUT_PHASES
+from versions import VERSION_SCHEMES
+
+# Cached snapshots skip validation, so bump this whenever validate_program()
+# accepts or rejects different entries; snapshots of an older schema are dropped
+CATALOG_CACHE_FORMAT_VERSION = 3
+
+# version_check types and the fields each one requires
+PROBE_TYPES = {
+    "none": (),
+    "exe_version": ("path",),
+    "cmd_output": ("command",),
+    "file_content": ("path",),
+}
+
+REQUIRED_FIELDS = ("name", "install_path", "installer_path", "silent_args")
+
+# Format stored in the catalog cache: the version plus a hash of the tables validation
+# checks against, so a new probe type, version scheme or timeout phase also drops old snapshots
+CATALOG_CACHE_FORMAT = "{}:{}".format(
+    CATALOG_CACHE_FORMAT_VERSION,
+    hashlib.sha1(repr((PROBE_TYPES, REQUIRED_FIELDS, VERSION_SCHEMES, TIMEOUT_PHASES)).encode("utf-8")).hexdigest()[:12]
+)
+
+class ConfigError(ValueError):
+    """programs.json (or one of its include files) does not match the schema.
+
+    problems holds one message per invalid field, so every mistake in a
+    catalog is reported at once.
+    """
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__("Invalid programs.json:\n" + "\n".join(self.problems))
+
+class VersionProbe:
+    """Immutable, compiled form of a program's version_check.
+
+    kind is the version_check type (None if the program has no version_check),
+    and regex is a compiled pattern or None. encoding, max_bytes and tail
+    control how file_content probes read the file.
+    """
+
+    __slots__ = ("kind", "path", "command", "regex", "encoding", "max_bytes", "tail")
+
+    def __init__(self, kind, path=None, command=None, regex=None, encoding=None, max_bytes=None, tail=False):
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "command", command)
+        object.__setattr__(self, "regex", regex)
+        object.__setattr__(self, "encoding", encoding)
+        object.__setattr__(self, "max_bytes", max_bytes)
+        object.__setattr__(self, "tail", tail)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("VersionProbe is immutable")
+
+    def __repr__(self):
+        return f"VersionProbe({self.kind!r}, path={self.path!r}, command={self.command!r})"
+
+class Program(dict):
+    """A programs.json entry: the plain dict, plus its compiled probe"""
+
+    __slots__ = ("probe",)
+
+    def __init__(self, entry):
+        super().__init__(entry)
+        self.probe = compile_probe(entry.get("version_check"))
+
+    def __reduce__(self):
+        return (Program, (dict(self),))
+
+def compile_probe(version_check):
+    """Resolve a version_check dict into a VersionProbe, compiling its regex once"""
+    if version_check is None:
+        return VersionProbe(None)
+    if not isinstance(version_check, dict):
+        raise ValueError("version_check must be an object")
+    regex = version_check.get("regex") or None
+    return VersionProbe(
+        version_check.get("type", "none"),
+        path=version_check.get("path"),
+        command=version_check.get("command"),
+        regex=re.compile(regex) if regex else None,
+        encoding=version_check.get("encoding"),
+        max_bytes=version_check.get("max_bytes"),
+        tail=version_check.get("from") == "tail"
+    )
+
+def is_positive_number(value):
+    """Return True for a number of seconds greater than zero (booleans are not numbers here)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+def validate_program(program, where):
+    """Return a list of schema problems of one programs.json entry"""
+    if not isinstance(program, dict):
+        return [f"{where}: must be an object"]
+
+    problems = []
+    for field in REQUIRED_FIELDS:
+        if field not in program:
+            problems.append(f"{where}: missing field '{field}'")
+        elif not isinstance(program[field], str):
+            problems.append(f"{where}: '{field}' must be a string")
+    if isinstance(program.get("name"), str) and not program["name"].strip():
+        problems.append(f"{where}: 'name' must not be empty")
+
+    for field in ("new_version", "resource_class"):
+        if field in program and not isinstance(program[field], str):
+            problems.append(f"{where}: '{field}' must be a string")
+    if "version_scheme" in program and program["version_scheme"] not in VERSION_SCHEMES:
+        problems.append(f"{where}: unknown version_scheme {program['version_scheme']!r} "
+                        f"(expected one of {', '.join(VERSION_SCHEMES)})")
+    if "verify_install" in program and not isinstance(program["verify_install"], bool):
+        problems.append(f"{where}: 'verify_install' must be true or false")
+    if "stage" in program and not isinstance(program["stage"], bool):
+        problems.append(f"{where}: 'stage' must be true or false")
+    if "sha256" in program and not re.fullmatch(r"\s*[0-9a-fA-F]{64}\s*", str(program["sha256"])):
+        problems.append(f"{where}: 'sha256' must be 64 hexadecimal characters")
+    timeout = program.get("timeout", 1)
+    if isinstance(timeout, dict):
+        for phase, seconds in timeout.items():
+            if phase not in TIMEOUT_PHASES:
+                problems.append(f"{where}: unknown timeout phase {phase!r} (expected one of {', '.join(TIMEOUT_PHASES)})")
+            elif not is_positive_number(seconds):
+                problems.append(f"{where}: timeout '{phase}' must be a positive number of seconds")
+    elif not is_positive_number(timeout):
+        problems.append(f"{where}: 'timeout' must be a positive number of seconds or an object with "
+                        f"'install' and/or 'probe' seconds")
+    manifest_exclude = program.get("manifest_exclude", [])
+    if not isinstance(manifest_exclude, list) or not all(isinstance(pattern, str) for pattern in manifest_exclude):
+        problems.append(f"{where}: 'manifest_exclude' must be a list of glob patterns")
+    depends_on = program.get("depends_on", [])
+    if not isinstance(depends_on, list) or not all(isinstance(name, str) for name in depends_on):
+        problems.append(f"{where}: 'depends_on' must be a list of program names")
+
+    if "version_check" in program:
+        problems.extend(validate_version_check(program["version_check"], f"{where}: version_check"))
+    return problems
+
+def validate_version_check(version_check, where):
+    """Return a list of schema problems of a version_check object"""
+    if not isinstance(version_check, dict):
+        return [f"{where}: must be an object"]
+
+    check_type = version_check.get("type", "none")
+    if check_type not in PROBE_TYPES:
+        return [f"{where}: unknown type '{check_type}' (expected one of {', '.join(PROBE_TYPES)})"]
+
+    problems = []
+    for field in PROBE_TYPES[check_type]:
+        if not isinstance(version_check.get(field), str) or not version_check[field]:
+            problems.append(f"{where}: type '{check_type}' requires '{field}'")
+
+    regex = version_check.get("regex")
+    if regex:
+        try:
+            pattern = re.compile(regex)
+        except (re.error, TypeError) as e:
+            problems.append(f"{where}: invalid regex {regex!r}: {e}")
+        else:
+            if pattern.groups < 1:
+                problems.append(f"{where}: regex {regex!r} needs a capture group for the version")
+
+    # Options of file_content probes
+    encoding = version_check.get("encoding")
+    if encoding is not None:
+        try:
+            codecs.lookup(encoding)
+        except (LookupError, TypeError):
+            problems.append(f"{where}: unknown encoding {encoding!r}")
+    max_bytes = version_check.get("max_bytes")
+    if max_bytes is not None and (not isinstance(max_bytes, int) or isinstance(max_bytes, bool) or max_bytes <= 0):
+        problems.append(f"{where}: 'max_bytes' must be a positive integer")
+    if version_check.get("from", "head") not in ("head", "tail"):
+        problems.append(f"{where}: 'from' must be \"head\" or \"tail\"")
+    return problems
+
+def read_entries(config_path, stack=()):
+    """Read a programs.json list, expanding {"include": "file.json"} entries recursively.
+
+    Include paths are relative to the file that includes them. Returns
+    (entries, files) where entries are (where, entry) pairs and files lists
+    every file read, the config itself first.
+    """
+    config_path = os.path.abspath(config_path)
+    if config_path in stack:
+        raise ConfigError([f"{config_path}: include cycle ({' -> '.join(stack + (config_path,))})"])
+
+    with open(config_path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("programs.json must contain a list of programs")
+
+    entries = []
+    files = [config_path]
+    for index, entry in enumerate(data):
+        if isinstance(entry, dict) and "include" in entry:
+            include = entry["include"]
+            if not isinstance(include, str) or len(entry) != 1:
+                raise ConfigError([f"{config_path} entry {index + 1}: an include entry must be {{\"include\": \"file.json\"}}"])
+            include_path = os.path.join(os.path.dirname(config_path), include)
+            try:
+                included, included_files = read_entries(include_path, stack + (config_path,))
+            except FileNotFoundError:
+                raise ConfigError([f"{config_path} entry {index + 1}: include file not found: {include_path}"])
+            entries.extend(included)
+            files.extend(path for path in included_files if path not in files)
+        else:
+            where = f"{os.path.basename(config_path)} entry {index + 1}"
+            if isinstance(entry, dict) and isinstance(entry.get("name"), str):
+                where += f" ({entry['name']})"
+            entries.append((where, entry))
+    return entries, files
+
+def load_catalog(config_path):
+    """Read, validate and compile a catalog.
+
+    Returns (programs, files): a list of Program objects and the files the
+    catalog was read from. Raises FileNotFoundError, json.JSONDecodeError,
+    or ValueError/ConfigError listing every schema problem.
+    """
+    entries, files = read_entries(config_path)
+
+    problems = []
+    seen = set()
+    for where, entry in entries:
+        problems.extend(validate_program(entry, where))
+        name = entry.get("name") if isinstance(entry, dict) else None
+        if name in seen:
+            problems.append(f"{where}: duplicate program name '{name}'")
+        seen.add(name)
+    if problems:
+        raise ConfigError(problems)
+
+    return [Program(entry) for where, entry in entries], files
+
+def file_digest(path):
+    """Return [size, mtime_ns, sha256] of a file"""
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    return [st.st_size, st.st_mtime_ns, sha256]
+
+class CatalogCache:
+    """On-disk cache of validated catalogs keyed by config path.
+
+    A snapshot is valid while every file it was read from (the config and
+    its includes) has the same size and mtime, or, if the mtime changed,
+    the same SHA-256. A valid snapshot skips reading includes and schema
+    validation; only the regexes are compiled again.
+    """
+
+    def __init__(self, path, max_entries=16):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.catalogs = {}
+        # Config paths whose snapshot changed since the last save
+        self.changed = set()
+        self.load()
+
+    def load(self):
+        """Load snapshots from disk, starting empty if the file is missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == CATALOG_CACHE_FORMAT:
+                self.catalogs = data.get("catalogs", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading catalog cache {self.path}: {e}")
+
+    def lookup(self, config_path):
+        """Return (programs, files) of a still-valid snapshot, or None"""
+        key = os.path.abspath(config_path)
+        with self.lock:
+            snapshot = self.catalogs.get(key)
+        if snapshot is None:
+            return None
+
+        for path, (size, mtime_ns, sha256) in snapshot["files"].items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            if st.st_size == size and st.st_mtime_ns == mtime_ns:
+                continue
+            # Touched but possibly unchanged (e.g. copied over); compare the content
+            try:
+                digest = file_digest(path)
+            except OSError:
+                return None
+            if digest[2] != sha256:
+                return None
+            with self.lock:
+                snapshot["files"][path] = digest
+                self.changed.add(key)
+
+        with self.lock:
+            snapshot["used"] = time.time()
+        return [Program(entry) for entry in snapshot["programs"]], list(snapshot["files"])
+
+    def store(self, config_path, programs, files):
+        """Remember a freshly validated catalog"""
+        try:
+            digests = {path: file_digest(path) for path in files}
+        except OSError:
+            return
+        with self.lock:
+            key = os.path.abspath(config_path)
+            self.catalogs[key] = {
+                "files": digests,
+                "programs": [dict(program) for program in programs],
+                "used": time.time(),
+            }
+            self.changed.add(key)
+            self.prune(self.catalogs)
+
+    def prune(self, catalogs):
+        """Keep only the most recently used catalogs, in place"""
+        if len(catalogs) > self.max_entries:
+            ordered = sorted(catalogs, key=lambda key: catalogs[key]["used"])
+            for key in ordered[:len(catalogs) - self.max_entries]:
+                del catalogs[key]
+
+    def save(self):
+        """Write the cache to disk atomically if it changed, keeping snapshots other processes saved meanwhile"""
+        with self.lock:
+            if not self.changed:
+                return
+            catalogs, changed = dict(self.catalogs), self.changed
+            self.changed = set()
+
+        try:
+            save_entries(self.path, CATALOG_CACHE_FORMAT, "catalogs", catalogs, changed, prune=self.prune)
+        except Exception as e:
+            print(f"Error saving catalog cache {self.path}: {e}")
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Only GUI-free modules may be imported here, so the CLI starts fast and runs
+# without a display (task scheduler, jump-box runbooks)
+from catalog import CatalogCache, ConfigError
+from config import find_config_path, read_programs
+from install_manifest import InstallIndex
+from install_scheduler import InstallScheduler
+from instrumentation import Tracer, span, write_run
+from integrity import HashManifest
+from output_capture import output_log_dir
+from probe_cache import ProbeCache
+from process_runner import ProcessRunner
+from program_state import ProgramStore
+from settings import get_data_path, load_settings
+from staging import InstallerCache
+from timeouts import create_timeout_policy
+from timing_history import open_timing_history
+from update_journal import UpdateJournal, load_journal
+from update_planner import plan_updates
+from update_run import prepare_installers, skip_update, update_program
+from version_probe import NEEDS_UPDATE, ProbeEngine
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONFIG_ERROR = 2
+EXIT_UPDATES_AVAILABLE = 3
+
+def log(message):
+    """Write a human-readable progress message to stderr (stdout is reserved for JSON)"""
+    print(message, file=sys.stderr, flush=True)
+
+def create_probe_cache(settings):
+    """Open the probe cache shared with the GUI"""
+    return ProbeCache(
+        get_data_path(settings, "probe_cache.json"),
+        cmd_output_ttl=settings["cmd_output_ttl"],
+        max_entries=settings["probe_cache_max_entries"],
+        max_age_days=settings["probe_cache_max_age_days"]
+    )
+
+def create_install_index(settings):
+    """Open the install manifest index shared with the GUI"""
+    return InstallIndex(get_data_path(settings, "install_index.json"), hash_workers=settings["verify_workers"])
+
+def create_installer_cache(settings):
+    """Open the installer staging cache shared with the GUI, or return None if staging is disabled"""
+    if not settings["staging_cache_max_mb"]:
+        return None
+    return InstallerCache(get_data_path(settings, "installers"), settings["staging_cache_max_mb"] * 1024 * 1024)
+
+def check_programs(programs, settings, cache=None, tracer=None, install_index=None, runner=None):
+    """Probe every program concurrently and return one result dict per program"""
+    engine = ProbeEngine(
+        max_workers=settings["probe_workers"],
+        cache=cache,
+        install_index=install_index,
+        runner=runner,
+        timeouts=create_timeout_policy(settings, open_timing_history(settings))
+    )
+    try:
+        probes = engine.probe_all_sync(programs, tracer=tracer)
+    finally:
+        engine.shutdown()
+
+    # The same state model as the GUI classifies the results
+    store = ProgramStore(programs)
+    results = []
+    for state, (installed, current_version) in zip(store, probes):
+        store.apply_probe(state, installed, current_version)
+        result = state.as_dict()
+        check = install_index.last_check(state.name) if install_index else None
+        if result["status"] == "Damaged" and check:
+            result["missing_files"] = check.missing
+            result["modified_files"] = check.modified
+        results.append(result)
+    return results
+
+def update_programs(programs, settings, cache=None, tracer=None, install_index=None, runner=None, journal=None):
+    """Verify and install programs through the install scheduler, returning one result dict per program.
+
+    With a journal (already begun), every program's state transitions are
+    recorded, and the journal is finished once all programs are done.
+    """
+    results = {program["name"]: {"name": program["name"]} for program in programs}
+    if not programs:
+        if journal:
+            journal.finish()
+        return []
+
+    manifest = HashManifest(get_data_path(settings, "hash_manifest.json"))
+    # Longest predicted installs start first, so they do not become the tail of the run
+    history = open_timing_history(settings)
+    timeouts = create_timeout_policy(settings, history)
+    plan = plan_updates(
+        programs,
+        history,
+        max_workers=settings["install_workers"],
+        class_limits=settings["install_class_limits"],
+        manifest=manifest
+    )
+    log(plan.describe()[0])
+    output_dir = output_log_dir(settings, tracer.run_id if tracer else None)
+    installers = prepare_installers(plan.programs, settings, manifest, create_installer_cache(settings), tracer, log)
+
+    def run_job(program, payload):
+        log(f"Starting update for {program['name']}...")
+        started = time.monotonic()
+        status, success, message = update_program(
+            program,
+            installers,
+            log,
+            journal=journal,
+            probe_cache=cache,
+            tracer=tracer,
+            extract_workers=settings["extract_workers"],
+            install_index=install_index,
+            runner=runner,
+            output_dir=output_dir,
+            output_lines=settings["output_lines"],
+            timeouts=timeouts
+        )
+        results[program["name"]].update(
+            hash=status, success=success, message=message, duration=round(time.monotonic() - started, 3))
+        log(message)
+        return success
+
+    def skip_job(program, payload, reason):
+        message = skip_update(program, installers, reason, journal)
+        results[program["name"]].update(success=False, message=message)
+        log(message)
+
+    scheduler = InstallScheduler(
+        max_workers=settings["install_workers"],
+        class_limits=settings["install_class_limits"]
+    )
+    scheduler.start([(program, None) for program in plan.programs], run_job, on_skip=skip_job)
+    scheduler.wait()
+    installers.close()
+    if journal:
+        journal.finish()
+    if cache:
+        cache.save()
+    return [results[program["name"]] for program in programs]
+
+def record_manifests(programs, install_index):
+    """Record the current install directories as known-good manifests, returning one result dict per program"""
+    results = []
+    for program in programs:
+        if not os.path.isdir(program["install_path"]):
+            results.append({"name": program["name"], "success": False, "message": "Not installed"})
+            log(f"Skipped {program['name']}: not installed")
+            continue
+        try:
+            count = install_index.record(program)
+        except Exception as e:
+            results.append({"name": program["name"], "success": False, "message": str(e)})
+            log(f"Could not record manifest for {program['name']}: {str(e)}")
+            continue
+        results.append({"name": program["name"], "success": True, "files": count})
+        log(f"Recorded manifest for {program['name']}: {count} files")
+    install_index.save()
+    return results
+
+def write_output(document, output_path):
+    """Write the JSON result document to a file, or to stdout"""
+    text = json.dumps(document, indent=2)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        prog="dfir_cli",
+        description="Check and update software on offline workstations without the GUI."
+    )
+    parser.add_argument("--config", help="Path to programs.json (default: current directory, then bundled)")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--profile", action="store_true", help="Also record a cProfile dump with the run's trace")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    subparsers.add_parser("check", help="Report installed and available versions")
+    update_parser = subparsers.add_parser("update", help="Update the named programs")
+    update_parser.add_argument("names", nargs="+", metavar="NAME", help="Program name as in programs.json")
+    update_all_parser = subparsers.add_parser(
+        "update-all", help="Update every program that is missing, damaged or out of date")
+    update_all_parser.add_argument("--resume", action="store_true",
+                                   help="Continue an interrupted Update All run, skipping programs it already updated")
+    manifest_parser = subparsers.add_parser(
+        "record-manifest", help="Record the current install directories as known-good manifests")
+    manifest_parser.add_argument("names", nargs="*", metavar="NAME", help="Program name (default: every installed program)")
+    return parser
+
+def main(argv=None):
+    """Run the command line and return its exit code"""
+    args = build_parser().parse_args(argv)
+    settings = load_settings()
+    config_path = args.config or find_config_path()
+    tracer = Tracer(args.command, profile=args.profile or settings["profile"])
+
+    try:
+        with span(tracer, "config_load"):
+            programs = read_programs(config_path, CatalogCache(get_data_path(settings, "catalog_cache.json")))
+    except FileNotFoundError:
+        log(f"ERROR: programs.json file not found: {config_path}")
+        return EXIT_CONFIG_ERROR
+    except ConfigError as e:
+        log(f"ERROR: {str(e)}")
+        return EXIT_CONFIG_ERROR
+    except (ValueError, json.JSONDecodeError) as e:
+        log(f"ERROR: Invalid programs.json: {str(e)}")
+        return EXIT_CONFIG_ERROR
+
+    cache = create_probe_cache(settings)
+    install_index = create_install_index(settings)
+    runner = ProcessRunner(settings["max_processes"])
+    document = {"command": args.command, "config": config_path}
+
+    if args.command == "check":
+        results = check_programs(programs, settings, cache, tracer, install_index, runner)
+        document["results"] = results
+        write_output(document, args.output)
+        write_run(tracer, settings)
+        if any(r["status"] in NEEDS_UPDATE for r in results):
+            return EXIT_UPDATES_AVAILABLE
+        return EXIT_OK
+
+    if args.command in ("update", "record-manifest"):
+        by_name = {program["name"]: program for program in programs}
+        unknown = [name for name in args.names if name not in by_name]
+        if unknown:
+            log(f"ERROR: Unknown program(s): {', '.join(unknown)}")
+            return EXIT_CONFIG_ERROR
+        selected = [by_name[name] for name in dict.fromkeys(args.names)]
+
+    if args.command == "record-manifest":
+        results = record_manifests(selected or programs, install_index)
+        document["results"] = results
+        write_output(document, args.output)
+        write_run(tracer, settings)
+        if any(not r["success"] for r in results if r["name"] in args.names):
+            return EXIT_FAILED
+        return EXIT_OK
+
+    journal = None
+    if args.command == "update":
+        to_update = selected
+    else:
+        # Update All runs are journaled, so an interrupted run can be resumed
+        journal = UpdateJournal(get_data_path(settings, "update_journal.jsonl"))
+        interrupted = load_journal(journal.path) if args.resume else None
+        if interrupted and interrupted.config != os.path.abspath(config_path):
+            interrupted = None
+        if interrupted:
+            to_update = interrupted.remaining(programs)
+            log(f"Resuming interrupted Update All: {interrupted.done_count()} of {len(interrupted.planned)} programs "
+                f"already updated")
+        else:
+            if args.resume:
+                log("No interrupted Update All run to resume.")
+            checks = check_programs(programs, settings, cache, tracer, install_index, runner)
+            to_update = [
+                program for program, check in zip(programs, checks)
+                if check["status"] in NEEDS_UPDATE
+            ]
+        if not to_update:
+            log("No programs need updating.")
+        else:
+            log(f"Starting update for {len(to_update)} programs...")
+        journal.begin(to_update, config_path, interrupted.started if interrupted else None)
+
+    results = update_programs(to_update, settings, cache, tracer, install_index, runner, journal)
+    document["results"] = results
+    write_output(document, args.output)
+    write_run(tracer, settings)
+    if any(not r.get("success") for r in results):
+        return EXIT_FAILED
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
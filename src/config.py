@@ -0,0 +1,95 @@
+import os
+
+from catalog import load_catalog
+from settings import get_resource_path
+
+def find_config_path():
+    """Return the path of programs.json, preferring the current directory over bundled resources"""
+    cwd_config_path = os.path.join(os.getcwd(), "programs.json")
+    if os.path.exists(cwd_config_path):
+        return cwd_config_path
+    return get_resource_path("programs.json")
+
+def read_programs(config_path=None, cache=None):
+    """Read the program list from programs.json; see load_config()"""
+    return load_config(config_path, cache)[0]
+
+def load_config(config_path=None, cache=None):
+    """Read, validate and compile programs.json and its include files.
+
+    Returns (programs, files): Program objects (dicts with a compiled probe)
+    and every file the catalog was read from. A CatalogCache, if given, is
+    used to skip validation of unchanged files. Raises FileNotFoundError,
+    json.JSONDecodeError or ValueError (ConfigError for schema problems);
+    callers decide how to report these.
+    """
+    if config_path is None:
+        config_path = find_config_path()
+
+    if cache is not None:
+        snapshot = cache.lookup(config_path)
+        if snapshot is not None:
+            # Keeps digests refreshed for touched but unchanged files, so they are not hashed on every launch
+            cache.save()
+            return snapshot
+
+    programs, files = load_catalog(config_path)
+    if cache is not None:
+        cache.store(config_path, programs, files)
+        cache.save()
+    return programs, files
+
+def diff_programs(old_programs, new_programs):
+    """Compare two program lists by name.
+
+    Returns (added, removed, changed) lists of program names; a program is
+    changed if any of its fields differ.
+    """
+    old_by_name = {program.get("name"): program for program in old_programs}
+    new_by_name = {program.get("name"): program for program in new_programs}
+    added = [name for name in new_by_name if name not in old_by_name]
+    removed = [name for name in old_by_name if name not in new_by_name]
+    changed = [name for name, program in new_by_name.items()
+               if name in old_by_name and old_by_name[name] != program]
+    return added, removed, changed
+
+class ConfigWatcher:
+    """Detects changes to config files by polling their size and modification time.
+
+    A change is only reported once the files have looked the same on two
+    consecutive polls, so a file that is still being written is not read.
+    """
+
+    def __init__(self, paths):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.fingerprint = self.stat()
+        self.pending = self.fingerprint
+
+    def set_paths(self, paths):
+        """Watch a new set of files (e.g. after includes changed) from their current state"""
+        self.paths = list(paths)
+        self.fingerprint = self.pending = self.stat()
+
+    def stat(self):
+        """Return (size, mtime_ns) of every file, with None for missing files"""
+        fingerprint = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                fingerprint.append(None)
+            else:
+                fingerprint.append((st.st_size, st.st_mtime_ns))
+        return fingerprint
+
+    def changed(self):
+        """Return True once per settled change of the file"""
+        fingerprint = self.stat()
+        if fingerprint == self.fingerprint:
+            self.pending = fingerprint
+            return False
+        if fingerprint != self.pending:
+            self.pending = fingerprint
+            return False
+        self.fingerprint = fingerprint
+        return fingerprint[0] is not None
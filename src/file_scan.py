@@ -0,0 +1,124 @@
+import codecs
+import os
+
+# Bytes read per step
+CHUNK_SIZE = 64 * 1024
+
+# Characters kept between steps, so a match spanning two chunks is still
+# found; matches longer than this may be missed
+OVERLAP = 4096
+
+# Byte order marks, longest first so UTF-32 LE is not taken for UTF-16 LE
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+def detect_encoding(f, encoding=None):
+    """Return (codec name, BOM length) for an open binary file.
+
+    A byte order mark always decides the encoding when one is present;
+    otherwise the given encoding (default UTF-8) is used. Encodings that
+    need a BOM to pick a byte order ("utf-16", "utf-32") default to
+    little-endian, as written by Windows.
+    """
+    f.seek(0)
+    head = f.read(4)
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name, len(bom)
+
+    name = codecs.lookup(encoding or "utf-8").name
+    if name in ("utf-16", "utf-32"):
+        name += "-le"
+    elif name == "utf-8-sig":
+        name = "utf-8"
+    return name, 0
+
+def code_unit(encoding):
+    """Return the byte alignment of characters in an encoding"""
+    if encoding.startswith("utf-32"):
+        return 4
+    if encoding.startswith("utf-16"):
+        return 2
+    return 1
+
+def search_file(path, regex, encoding=None, max_bytes=None, tail=False):
+    """Search a text file for a compiled regex without reading all of it.
+
+    The file is decoded chunk by chunk (undecodable bytes are replaced), so
+    memory use stays constant. From the head, the first match is returned;
+    with tail=True the file is read backwards from the end and the last
+    match is returned. max_bytes limits how much of the file (from the head
+    or the tail) is searched. Returns a match object or None.
+    """
+    with open(path, "rb") as f:
+        encoding, bom_length = detect_encoding(f, encoding)
+        size = os.fstat(f.fileno()).st_size
+        if tail:
+            return search_backward(f, regex, encoding, bom_length, size, max_bytes)
+        return search_forward(f, regex, encoding, bom_length, size, max_bytes)
+
+def search_forward(f, regex, encoding, start, size, max_bytes):
+    """Return the first match between start and start + max_bytes"""
+    end = size if max_bytes is None else min(size, start + max_bytes)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    f.seek(start)
+    position = start
+
+    while True:
+        data = f.read(min(CHUNK_SIZE, end - position))
+        position += len(data)
+        at_end = not data or position >= end
+        buffer += decoder.decode(data, final=at_end)
+
+        match = regex.search(buffer)
+        # A match reaching into the last OVERLAP characters might continue in
+        # the next chunk, so it is only final once more data has been read
+        if match and (at_end or match.end() < len(buffer) - OVERLAP):
+            return match
+        if at_end:
+            return None
+
+        keep_from = len(buffer) - OVERLAP
+        if match:
+            keep_from = min(keep_from, match.start())
+        if keep_from > 0:
+            buffer = buffer[keep_from:]
+
+def search_backward(f, regex, encoding, start, size, max_bytes):
+    """Return the last match between size - max_bytes and the end of the file"""
+    unit = code_unit(encoding)
+    limit = start if max_bytes is None else max(start, size - max_bytes)
+    # Consecutive windows share room for 2 * OVERLAP characters of up to 4
+    # bytes, so a match starting in a window's first OVERLAP characters fits
+    # whole in the next window
+    overlap_bytes = 2 * OVERLAP * 4
+    window_end = size
+
+    while window_end > limit:
+        window_start = max(limit, window_end - CHUNK_SIZE - overlap_bytes)
+        # Keep multi-byte encodings aligned to whole characters
+        misalignment = (window_start - start) % unit
+        if misalignment:
+            window_start += unit - misalignment
+        f.seek(window_start)
+        text = f.read(window_end - window_start).decode(encoding, errors="replace")
+
+        # A match near the window start may begin before it; it is found
+        # whole in the next (earlier) window instead
+        safe_from = 0 if window_start <= limit else OVERLAP
+        last = None
+        for match in regex.finditer(text):
+            if match.start() >= safe_from:
+                last = match
+        if last:
+            return last
+        if window_start <= limit:
+            return None
+        window_end = window_start + overlap_bytes
+    return None
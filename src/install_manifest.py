@@ -0,0 +1,197 @@
+import fnmatch
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from integrity import hash_file
+from json_store import save_entries
+
+INDEX_FORMAT_VERSION = 1
+
+# Install states reported by InstallIndex.check()
+INTACT = "Intact"
+DAMAGED = "Damaged"
+
+def scan_tree(root):
+    """Return {relative path: (size, mtime_ns)} for every file under root.
+
+    Uses os.scandir, whose directory entries carry stat data on Windows, so
+    most files cost no extra system call. Relative paths use "/" separators;
+    symlinks are not followed.
+    """
+    files = {}
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, f"{prefix}{entry.name}/"))
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files[prefix + entry.name] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    return files
+
+def is_excluded(rel, patterns):
+    """Return True if a relative path matches one of a program's manifest_exclude glob patterns"""
+    return any(fnmatch.fnmatch(rel, pattern) for pattern in patterns)
+
+class InstallCheck:
+    """Result of comparing an install directory with its manifest"""
+
+    __slots__ = ("state", "missing", "modified")
+
+    def __init__(self, state, missing=(), modified=()):
+        self.state = state
+        self.missing = list(missing)
+        self.modified = list(modified)
+
+    def describe(self):
+        """Return a one-line summary of what is wrong"""
+        parts = []
+        if self.missing:
+            parts.append(f"{len(self.missing)} missing (e.g. {self.missing[0]})")
+        if self.modified:
+            parts.append(f"{len(self.modified)} modified (e.g. {self.modified[0]})")
+        return ", ".join(parts) or "intact"
+
+class InstallIndex:
+    """On-disk index of install-directory manifests, keyed by program name.
+
+    A manifest records the relative path, size, mtime and SHA-256 of every
+    file of a known-good install. Checking an install compares stat data
+    first and only hashes files whose mtime changed with the size unchanged,
+    so an untouched install is verified without reading any file. Files
+    created after the manifest was recorded, and files matching the
+    program's "manifest_exclude" patterns (settings and logs the tool
+    rewrites in place), are ignored.
+    """
+
+    def __init__(self, path, hash_workers=4):
+        self.path = path
+        self.hash_workers = max(1, int(hash_workers))
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.manifests = {}
+        self.last_checks = {}
+        # Programs whose manifest changed since the last save
+        self.changed = set()
+        self.load()
+
+    def load(self):
+        """Load the index, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == INDEX_FORMAT_VERSION:
+                self.manifests = data.get("programs", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading install index {self.path}: {e}")
+
+    def get_manifest(self, program):
+        """Return the manifest of a program, or None if there is none for its current install_path"""
+        with self.lock:
+            manifest = self.manifests.get(program["name"])
+        if manifest is None or manifest["root"] != os.path.abspath(program["install_path"]):
+            return None
+        return manifest
+
+    def record(self, program):
+        """Walk and hash a program's install directory and store it as the program's manifest.
+
+        Returns the number of files recorded.
+        """
+        root = os.path.abspath(program["install_path"])
+        stats = scan_tree(root)
+        excludes = program.get("manifest_exclude", ())
+        paths = sorted(rel for rel in stats if not is_excluded(rel, excludes))
+        with ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix="manifest") as pool:
+            hashes = list(pool.map(lambda rel: hash_file(os.path.join(root, rel)), paths))
+
+        files = {rel: [stats[rel][0], stats[rel][1], sha256] for rel, sha256 in zip(paths, hashes)}
+        with self.lock:
+            self.manifests[program["name"]] = {"root": root, "created": time.time(), "files": files}
+            self.last_checks.pop(program["name"], None)
+            self.changed.add(program["name"])
+        return len(files)
+
+    def check(self, program):
+        """Compare a program's install directory with its manifest.
+
+        Returns an InstallCheck, or None if the program has no manifest.
+        """
+        manifest = self.get_manifest(program)
+        if manifest is None:
+            return None
+
+        root = manifest["root"]
+        present = scan_tree(root)
+        # Patterns added since the manifest was recorded apply too
+        excludes = program.get("manifest_exclude", ())
+        missing = []
+        modified = []
+        refreshed = {}
+        for rel, (size, mtime_ns, sha256) in manifest["files"].items():
+            if excludes and is_excluded(rel, excludes):
+                continue
+            stat = present.get(rel)
+            if stat is None:
+                missing.append(rel)
+            elif stat[0] != size:
+                modified.append(rel)
+            elif stat[1] != mtime_ns:
+                # Same size but touched: only the content can tell
+                try:
+                    same = hash_file(os.path.join(root, rel)) == sha256
+                except OSError:
+                    same = False
+                if same:
+                    refreshed[rel] = [size, stat[1], sha256]
+                else:
+                    modified.append(rel)
+
+        result = InstallCheck(DAMAGED if missing or modified else INTACT, sorted(missing), sorted(modified))
+        with self.lock:
+            # Remember new mtimes of unchanged files so the next check is stat-only
+            if refreshed and self.manifests.get(program["name"]) is manifest:
+                manifest["files"].update(refreshed)
+                self.changed.add(program["name"])
+            self.last_checks[program["name"]] = result
+        return result
+
+    def last_check(self, name):
+        """Return the most recent InstallCheck of a program, or None"""
+        with self.lock:
+            return self.last_checks.get(name)
+
+    def save(self):
+        """Write the index to disk atomically if it changed, keeping manifests other processes saved meanwhile"""
+        with self.save_lock:
+            with self.lock:
+                if not self.changed:
+                    return
+                manifests, changed = dict(self.manifests), self.changed
+                self.changed = set()
+
+            try:
+                save_entries(self.path, INDEX_FORMAT_VERSION, "programs", manifests, changed)
+            except Exception as e:
+                print(f"Error saving install index {self.path}: {e}")
+
+def is_install_intact(program, install_index=None):
+    """Return True if a program's install directory exists and matches its manifest, if it has one"""
+    if not os.path.exists(program["install_path"]):
+        return False
+    check = install_index.check(program) if install_index else None
+    return check is None or check.state != DAMAGED
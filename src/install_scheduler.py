@@ -0,0 +1,151 @@
+import os
+import threading
+
+# Default per-class concurrency limits; classes not listed only share the worker limit.
+# Windows Installer holds a system-wide mutex, so MSI packages must run one at a time.
+DEFAULT_CLASS_LIMITS = {"msi": 1}
+
+def get_resource_class(program):
+    """Return the resource class of a program's installer ("msi", "zip", "exe" or a custom class)"""
+    if program.get("resource_class"):
+        return program["resource_class"]
+
+    file_ext = os.path.splitext(program.get("installer_path", ""))[1].lower()
+    if file_ext == ".msi":
+        return "msi"
+    elif file_ext == ".zip":
+        return "zip"
+    return "exe"
+
+class InstallScheduler:
+    """Run install jobs on a bounded set of worker threads.
+
+    Jobs are started in the order given, subject to the overall worker
+    limit, per-resource-class limits and the optional "depends_on" list of
+    program names in each program. A job whose dependency failed or was
+    skipped is skipped as well; dependencies outside the planned set are
+    treated as already satisfied.
+    """
+
+    def __init__(self, max_workers=4, class_limits=None):
+        self.max_workers = max(1, int(max_workers))
+        self.class_limits = dict(DEFAULT_CLASS_LIMITS if class_limits is None else class_limits)
+        self.cond = threading.Condition()
+
+    def start(self, jobs, run_job, on_skip=None, on_complete=None):
+        """Start running jobs in the background.
+
+        jobs is a list of (program, payload) tuples. run_job(program, payload)
+        runs in a worker thread and returns True on success.
+        on_skip(program, payload, reason) is called, with the scheduler lock
+        held, for jobs that will not run; on_complete() is called once every
+        job has finished or been skipped.
+        """
+        self.pending = list(jobs)
+        self.run_job = run_job
+        self.on_skip = on_skip
+        self.on_complete = on_complete
+        self.planned = {program["name"] for program, payload in self.pending}
+        self.results = {}
+        self.running = 0
+        self.running_by_class = {}
+        self.completed = False
+
+        if not self.pending:
+            self.completed = True
+            if on_complete:
+                on_complete()
+            return
+
+        for i in range(min(self.max_workers, len(self.pending))):
+            thread = threading.Thread(target=self.worker, name=f"install-{i}")
+            thread.daemon = True
+            thread.start()
+
+    def wait(self):
+        """Block until every job has finished or been skipped"""
+        with self.cond:
+            while not self.completed:
+                self.cond.wait()
+
+    def worker(self):
+        """Take ready jobs until none are left"""
+        while True:
+            with self.cond:
+                job = self.next_ready()
+                while job is None and self.pending:
+                    if not self.running:
+                        # Nothing running and nothing ready: the rest wait on each other
+                        for program, payload in self.pending:
+                            self.skip(program, payload, "Dependency cycle")
+                        self.pending = []
+                        break
+                    self.cond.wait()
+                    job = self.next_ready()
+
+                if job is None:
+                    finished = self.mark_complete()
+                else:
+                    resource_class = get_resource_class(job[0])
+                    self.running += 1
+                    self.running_by_class[resource_class] = self.running_by_class.get(resource_class, 0) + 1
+
+            if job is None:
+                if finished and self.on_complete:
+                    self.on_complete()
+                return
+            self.run(job)
+
+    def run(self, job):
+        """Run one job and release its slot"""
+        program, payload = job
+        try:
+            success = bool(self.run_job(program, payload))
+        except Exception as e:
+            print(f"Error installing {program.get('name', 'Unknown')}: {str(e)}")
+            success = False
+
+        with self.cond:
+            resource_class = get_resource_class(program)
+            self.running -= 1
+            self.running_by_class[resource_class] -= 1
+            self.results[program["name"]] = success
+            self.cond.notify_all()
+
+    def mark_complete(self):
+        """Return True exactly once, when nothing is pending or running (called with the lock held)"""
+        if self.pending or self.running or self.completed:
+            return False
+        self.completed = True
+        self.cond.notify_all()
+        return True
+
+    def skip(self, program, payload, reason):
+        """Record a job that will not run (called with the lock held)"""
+        self.results[program["name"]] = False
+        if self.on_skip:
+            self.on_skip(program, payload, reason)
+
+    def next_ready(self):
+        """Pop the first job that may start now, or return None (called with the lock held)"""
+        for job in list(self.pending):
+            program, payload = job
+            dependencies = [d for d in program.get("depends_on", []) if d in self.planned]
+
+            failed = [d for d in dependencies if self.results.get(d) is False]
+            if failed:
+                self.pending.remove(job)
+                self.skip(program, payload, f"Dependency failed: {', '.join(failed)}")
+                # A skip can fail further dependents, so rescan from the start
+                return self.next_ready()
+            if any(d not in self.results for d in dependencies):
+                continue
+
+            resource_class = get_resource_class(program)
+            limit = self.class_limits.get(resource_class)
+            if limit is not None and self.running_by_class.get(resource_class, 0) >= limit:
+                continue
+
+            self.pending.remove(job)
+            return job
+        return None
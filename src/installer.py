@@ -0,0 +1,136 @@
+import os
+import re
+
+from instrumentation import span
+from output_capture import OutputCapture, output_file_name
+from process_runner import get_runner
+from timing_history import staged_hash
+from update_planner import format_seconds
+from zip_extract import extract_zip
+
+# Seconds an installer may run before its process tree is killed, unless a timeout is given
+INSTALL_TIMEOUT = 300
+
+# Exit codes of Windows Installer (and most setup programs) for a successful install that needs a restart
+RESTART_EXIT_CODES = (3010, 1641)
+
+# Percentages in installer output, e.g. "Installing... 45%"
+PROGRESS_PATTERN = re.compile(r"(\d{1,3}(?:\.\d+)?)\s?%")
+
+def parse_progress(line):
+    """Return the last percentage (0-100) in a line of installer output, or None"""
+    values = [float(value) for value in PROGRESS_PATTERN.findall(line)]
+    values = [value for value in values if value <= 100]
+    return values[-1] if values else None
+
+def installer_command(installer_path, silent_args):
+    """Return the shell command line that runs an installer directly, msiexec for .msi packages"""
+    if installer_path.lower().endswith(".msi"):
+        command = f'msiexec /i "{installer_path}"'
+    else:
+        command = f'"{installer_path}"'
+    return f"{command} {silent_args}" if silent_args else command
+
+def run_installer(program, log, progress=None, extract_workers=4, tracer=None, install_index=None, installer_path=None,
+                  runner=None, on_job=None, output_dir=None, output_lines=200, timeouts=None):
+    """Install or update one program; returns (success, message)"""
+    installer = os.path.splitext(program.get("installer_path", ""))[1].lower().lstrip(".")
+    # Keys the install's duration in the timing history
+    installer_hash = program.get("sha256", "").strip().lower() or staged_hash(installer_path)
+    # The installer's whole process tree is killed after the program's install timeout
+    timeout = timeouts.get(program, "install", installer_hash) if timeouts else INSTALL_TIMEOUT
+    with span(tracer, "install", program.get("name"), installer=installer, installer_hash=installer_hash,
+              timeout=timeout) as attrs:
+        # installer_path overrides the catalog's, e.g. with a staged local copy
+        success, message = install(
+            program, installer_path or program["installer_path"], log, progress, extract_workers, tracer,
+            runner or get_runner(), on_job, output_dir, output_lines, timeout, attrs)
+        attrs["success"] = success
+
+    # A successful install becomes the program's known-good manifest if it asks for one or already has one
+    if success and install_index and (program.get("verify_install") or install_index.get_manifest(program)):
+        try:
+            with span(tracer, "manifest", program["name"]):
+                count = install_index.record(program)
+            install_index.save()
+            log(f"{program['name']}: recorded install manifest of {count} files")
+        except Exception as e:
+            log(f"{program['name']}: could not record install manifest: {str(e)}")
+    return success, message
+
+def install(program, installer_path, log, progress, extract_workers, tracer, runner, on_job, output_dir, output_lines,
+            timeout, install_attrs):
+    """Extract or run one installer for run_installer(); install_attrs receives "timed_out" for the install span"""
+    # Check if installer exists
+    with span(tracer, "installer_check", program["name"]):
+        installer_found = os.path.exists(installer_path)
+    if not installer_found:
+        return False, f"Installer not found: {installer_path}"
+
+    try:
+        # Handle different file types
+        file_ext = os.path.splitext(installer_path)[1].lower()
+
+        if file_ext == ".zip":
+            # Special handling for zip files (extract instead of execute)
+            log(f"Extracting: {installer_path} -> {program['install_path']}")
+            with span(tracer, "extract", program["name"]) as attrs:
+                extracted, unchanged = extract_zip(
+                    installer_path,
+                    program["install_path"],
+                    max_workers=extract_workers,
+                    progress=progress
+                )
+                attrs.update(extracted=extracted, unchanged=unchanged)
+            log(f"{program['name']}: {extracted} files extracted, {unchanged} already up to date")
+            return True, f"{program['name']} updated successfully!"
+
+        # The installer is started directly, not through Start-Process, so its own console output
+        # and exit code reach the runner; silent_args are passed on as written
+        command = installer_command(installer_path, program.get("silent_args", ""))
+        log(f"Executing: {command}")
+
+        # Only the first output_lines lines go to log and only the last output_lines are kept in memory,
+        # for the error message; the full output is streamed to the program's log file in output_dir
+        capture = OutputCapture(
+            os.path.join(output_dir, output_file_name(program["name"])) if output_dir else None,
+            max_lines=output_lines
+        )
+
+        def on_line(stream, line):
+            capture.add(stream, line)
+            if capture.line_count <= output_lines:
+                log(f"{program['name']}: {line}")
+            elif capture.line_count == output_lines + 1:
+                log(f"{program['name']}: further output is not shown" +
+                    (f" (full output in {capture.log_path})" if capture.log_path else ""))
+            percent = parse_progress(line)
+            if progress and percent is not None:
+                progress(percent, 100)
+
+        # Run the installer, streaming its output as it arrives; on_job lets the caller cancel it
+        with capture, span(tracer, "installer_process", program["name"]) as attrs:
+            job = runner.submit(command, on_line=on_line, timeout=timeout, shell=True, capture=False)
+            if on_job:
+                on_job(job)
+            result = job.result()
+            attrs.update(returncode=result.returncode, cancelled=result.cancelled, timed_out=result.timed_out,
+                         output_lines=capture.line_count)
+
+        # Check result
+        if result.cancelled:
+            return False, f"Update of {program['name']} cancelled"
+        if result.timed_out:
+            # Recorded in the timing history, so the next adaptive timeout is longer
+            install_attrs["timed_out"] = True
+            return False, f"Update timed out after {format_seconds(timeout)}"
+        if result.returncode == 0:
+            return True, f"{program['name']} updated successfully!"
+        if result.returncode in RESTART_EXIT_CODES:
+            return True, f"{program['name']} updated successfully! A restart is required to finish the install."
+        if capture.log_path:
+            log(f"{program['name']}: full installer output in {capture.log_path}")
+        return False, f"Update failed: {capture.summary() or f'installer exited with code {result.returncode}'}"
+
+    except Exception as e:
+        return False, f"Update error: {str(e)}"
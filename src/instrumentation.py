@@ -0,0 +1,201 @@
+import contextlib
+import cProfile
+import json
+import math
+import os
+import pstats
+import threading
+import time
+
+from settings import get_data_path
+from timing_history import open_timing_history
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def duration_stats(durations):
+    """Summarize a list of durations in seconds"""
+    return {
+        "count": len(durations),
+        "total": round(sum(durations), 6),
+        "p50": round(percentile(durations, 0.50), 6),
+        "p95": round(percentile(durations, 0.95), 6),
+        "max": round(max(durations), 6) if durations else 0.0,
+    }
+
+class Tracer:
+    """Collects monotonic-clock spans for one run (a check or an update).
+
+    Spans carry a phase (e.g. "probe", "install"), an optional program name
+    and free-form attributes such as the probe type. With profile=True,
+    callables run through profiled() are also recorded with cProfile.
+    """
+
+    def __init__(self, run_type, profile=False):
+        self.run_type = run_type
+        self.started = time.monotonic()
+        self.started_wall = time.time()
+        millis = int(self.started_wall * 1000) % 1000
+        self.run_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_wall)) + f"{millis:03d}-{run_type}"
+        self.spans = []
+        self.profiles = []
+        self.profile = profile
+        self.lock = threading.Lock()
+
+    def record(self, phase, start, duration, program=None, **attrs):
+        """Record a finished span; start is a time.monotonic() value"""
+        span = {
+            "phase": phase,
+            "program": program,
+            "start": round(start - self.started, 6),
+            "duration": round(duration, 6),
+            "thread": threading.current_thread().name,
+        }
+        span.update(attrs)
+        with self.lock:
+            self.spans.append(span)
+
+    @contextlib.contextmanager
+    def span(self, phase, program=None, **attrs):
+        """Time the enclosed block as one span"""
+        start = time.monotonic()
+        try:
+            yield attrs
+        finally:
+            self.record(phase, start, time.monotonic() - start, program, **attrs)
+
+    def profiled(self, func, *args, **kwargs):
+        """Call func, under cProfile if profiling is enabled"""
+        if not self.profile:
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            with self.lock:
+                self.profiles.append(profiler)
+
+    def summary(self):
+        """Return per-phase, per-probe-type and per-installer duration statistics"""
+        with self.lock:
+            spans = list(self.spans)
+
+        groups = {"phases": {}, "probe_types": {}, "installers": {}}
+        for span in spans:
+            groups["phases"].setdefault(span["phase"], []).append(span["duration"])
+            if span["phase"] == "probe" and span.get("probe_type"):
+                groups["probe_types"].setdefault(span["probe_type"], []).append(span["duration"])
+            if span["phase"] == "install" and span.get("program"):
+                groups["installers"].setdefault(span["program"], []).append(span["duration"])
+
+        summary = {
+            "run_id": self.run_id,
+            "run_type": self.run_type,
+            "started": self.started_wall,
+            "wall_time": round(time.monotonic() - self.started, 6),
+            "span_count": len(spans),
+        }
+        for group, durations in groups.items():
+            summary[group] = {key: duration_stats(values) for key, values in sorted(durations.items())}
+        return summary
+
+    def write(self, trace_dir, keep_runs=20, prometheus_path=None):
+        """Write the JSON-lines trace, summary (and profile) for this run; returns the summary"""
+        os.makedirs(trace_dir, exist_ok=True)
+        summary = self.summary()
+        base = os.path.join(trace_dir, self.run_id)
+
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+            profiles = list(self.profiles)
+
+        with open(f"{base}.jsonl", "w") as f:
+            for span in spans:
+                f.write(json.dumps(span, separators=(",", ":")) + "\n")
+        with open(f"{base}-summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profiler in profiles[1:]:
+                stats.add(profiler)
+            stats.dump_stats(f"{base}.prof")
+
+        if prometheus_path:
+            write_prometheus_textfile(summary, prometheus_path)
+
+        prune_traces(trace_dir, keep_runs)
+        return summary
+
+def write_prometheus_textfile(summary, path):
+    """Write run metrics in the Prometheus textfile collector format (atomically)"""
+    run_type = summary["run_type"]
+    lines = [
+        "# HELP dfir_updater_run_seconds Wall-clock time of the last run.",
+        "# TYPE dfir_updater_run_seconds gauge",
+        f'dfir_updater_run_seconds{{run="{run_type}"}} {summary["wall_time"]}',
+        "# HELP dfir_updater_phase_seconds Duration quantiles per phase, probe type and installer.",
+        "# TYPE dfir_updater_phase_seconds gauge",
+    ]
+    for group, label in (("phases", "phase"), ("probe_types", "probe_type"), ("installers", "program")):
+        for key, stats in summary[group].items():
+            key = str(key).replace("\\", "\\\\").replace('"', '\\"')
+            for stat, quantile in (("p50", "0.5"), ("p95", "0.95")):
+                lines.append(
+                    f'dfir_updater_phase_seconds{{run="{run_type}",{label}="{key}",'
+                    f'quantile="{quantile}"}} {stats[stat]}'
+                )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+def prune_traces(trace_dir, keep_runs):
+    """Delete all but the newest keep_runs runs' trace files"""
+    runs = sorted({name.split(".")[0].replace("-summary", "") for name in os.listdir(trace_dir)})
+    for run_id in runs[:-keep_runs] if keep_runs > 0 else []:
+        for suffix in (".jsonl", "-summary.json", ".prof"):
+            path = os.path.join(trace_dir, run_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+def span(tracer, phase, program=None, **attrs):
+    """Return tracer.span(...), or a no-op context manager when tracer is None"""
+    if tracer is None:
+        return contextlib.nullcontext(attrs)
+    return tracer.span(phase, program, **attrs)
+
+def profiled(tracer, func, args=(), kwargs=None):
+    """Return tracer.profiled(func, *args, **kwargs), or just call func when tracer is None"""
+    kwargs = kwargs or {}
+    if tracer is None:
+        return func(*args, **kwargs)
+    return tracer.profiled(func, *args, **kwargs)
+
+def write_run(tracer, settings):
+    """Write a finished run's trace files and timing history as configured in settings; errors are only printed"""
+    if tracer is None:
+        return None
+    try:
+        history = open_timing_history(settings)
+        if history:
+            history.record_spans(tracer.spans)
+    except Exception as e:
+        print(f"Error recording timing history of run {tracer.run_id}: {e}")
+    if not settings["trace_enabled"]:
+        return None
+    try:
+        return tracer.write(
+            get_data_path(settings, settings["trace_dir"]),
+            keep_runs=settings["trace_keep_runs"],
+            prometheus_path=settings["metrics_textfile"]
+        )
+    except Exception as e:
+        print(f"Error writing trace for run {tracer.run_id}: {e}")
+        return None
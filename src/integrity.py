@@ -0,0 +1,156 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import span
+from json_store import save_entries
+
+# Bytes hashed per step, both for mmap slices and plain reads
+CHUNK_SIZE = 4 * 1024 * 1024
+
+MANIFEST_FORMAT_VERSION = 1
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file, hashed in chunks through mmap where possible"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files and some network filesystems cannot be mapped
+            data = None
+
+        if data is not None:
+            with data:
+                for offset in range(0, len(data), CHUNK_SIZE):
+                    digest.update(data[offset:offset + CHUNK_SIZE])
+        else:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.hexdigest()
+
+class HashManifest:
+    """On-disk cache of file hashes keyed by (path, size, mtime)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = {}
+        # Paths hashed since the last save
+        self.changed = set()
+        self.load()
+
+    def load(self):
+        """Load the manifest, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == MANIFEST_FORMAT_VERSION:
+                self.entries = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading hash manifest {self.path}: {e}")
+
+    def get_hash(self, path):
+        """Return the SHA-256 of a file, re-hashing only if its size or mtime changed"""
+        key = os.path.abspath(path)
+        st = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+
+        sha256 = hash_file(path)
+        with self.lock:
+            self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+            self.changed.add(key)
+        return sha256
+
+    def peek(self, path):
+        """Return the cached SHA-256 of a file if its size and mtime are unchanged, without hashing it"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self.lock:
+            entry = self.entries.get(os.path.abspath(path))
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        return None
+
+    def remember(self, path, st, sha256):
+        """Store a hash computed elsewhere (e.g. while copying) for a file with stat result st"""
+        with self.lock:
+            key = os.path.abspath(path)
+            self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+            self.changed.add(key)
+
+    def save(self):
+        """Write the manifest to disk atomically if it changed, keeping hashes other processes saved meanwhile"""
+        with self.save_lock:
+            with self.lock:
+                if not self.changed:
+                    return
+                entries, changed = dict(self.entries), self.changed
+                self.changed = set()
+
+            try:
+                save_entries(self.path, MANIFEST_FORMAT_VERSION, "files", entries, changed)
+            except Exception as e:
+                print(f"Error saving hash manifest {self.path}: {e}")
+
+def verify_installer(program, manifest=None):
+    """Check a program's installer against its optional "sha256" field.
+
+    Returns (status, message) where status is "OK", "Mismatch", "Missing",
+    "Error" or "No Hash" (no sha256 configured).
+    """
+    expected = program.get("sha256", "").strip().lower()
+    if not expected:
+        return "No Hash", "No sha256 configured"
+
+    installer_path = program["installer_path"]
+    if not os.path.exists(installer_path):
+        return "Missing", f"Installer not found: {installer_path}"
+
+    try:
+        actual = manifest.get_hash(installer_path) if manifest else hash_file(installer_path)
+    except Exception as e:
+        return "Error", f"Could not hash installer: {str(e)}"
+
+    if actual != expected:
+        return "Mismatch", f"Installer hash mismatch: expected {expected}, got {actual}"
+    return "OK", "Installer hash verified"
+
+def verify_installers(programs, manifest=None, max_workers=4, tracer=None):
+    """Verify many installers concurrently.
+
+    Returns a dict mapping program name to (status, message). The manifest,
+    if given, is saved once all programs are checked. With a tracer, each
+    check is recorded as a "verify" span.
+    """
+    programs = list(programs)
+
+    def verify(program):
+        with span(tracer, "verify", program["name"]) as attrs:
+            status, message = verify_installer(program, manifest)
+            attrs["status"] = status
+        return status, message
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="verify") as pool:
+        results = list(pool.map(verify, programs))
+    if manifest:
+        manifest.save()
+    return {program["name"]: result for program, result in zip(programs, results)}
+
+def is_verified(status):
+    """Return True if an installer may be run given its verification status"""
+    return status in ("OK", "No Hash")
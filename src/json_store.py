@@ -0,0 +1,61 @@
+import contextlib
+import json
+import os
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on a lock file, shared by every process and thread"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            # LK_LOCK retries for about 10 seconds before raising
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def read_entries(path, format_version, key):
+    """Return the entries dict stored under key in a JSON store, or {} if it is missing, unreadable or outdated"""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("format") != format_version:
+        return {}
+    entries = data.get(key)
+    return entries if isinstance(entries, dict) else {}
+
+def save_entries(path, format_version, key, entries, changed, prune=None):
+    """Write a JSON store atomically, merged with the copy on disk, and return the merged entries.
+
+    Other processes (parallel validator workers, the CLI next to the GUI)
+    may have saved since this one loaded, so the file is re-read under a
+    lock: their entries are kept, and only the names in changed, which this
+    process added, replaced or removed, are taken from entries. prune, if
+    given, trims the merged dict in place before it is written.
+    """
+    with file_lock(f"{path}.lock"):
+        merged = read_entries(path, format_version, key)
+        for name in changed:
+            if name in entries:
+                merged[name] = entries[name]
+            else:
+                merged.pop(name, None)
+        if prune:
+            prune(merged)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": format_version, key: merged}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    return merged
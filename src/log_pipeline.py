@@ -0,0 +1,57 @@
+import logging
+import logging.handlers
+import queue
+
+class LogPipeline:
+    """Thread-safe log pipeline.
+
+    Any thread can call log() without blocking on Tk or the disk: records go
+    to an in-memory queue that the UI drains in batches, and through a
+    QueueHandler to a background listener that writes a rotating log file
+    with a timestamp and program name on every line.
+    """
+
+    def __init__(self, log_path=None, max_bytes=1024 * 1024, backup_count=5):
+        self.display_queue = queue.SimpleQueue()
+        self.listener = None
+
+        self.logger = logging.getLogger(f"dfir_updater.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+        if log_path:
+            try:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+                file_handler.setFormatter(logging.Formatter(
+                    "%(asctime)s %(levelname)s [%(program)s] %(message)s"))
+                file_queue = queue.SimpleQueue()
+                self.logger.addHandler(logging.handlers.QueueHandler(file_queue))
+                self.listener = logging.handlers.QueueListener(file_queue, file_handler)
+                self.listener.start()
+            except Exception as e:
+                print(f"Could not open log file {log_path}: {e}")
+
+    def log(self, message, program=None, level=logging.INFO):
+        """Queue a message for the UI and the log file"""
+        self.display_queue.put(message)
+        if self.listener:
+            self.logger.log(level, message, extra={"program": program or "-"})
+
+    def drain(self, max_records=1000):
+        """Return up to max_records queued display messages, oldest first"""
+        messages = []
+        try:
+            while len(messages) < max_records:
+                messages.append(self.display_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return messages
+
+    def close(self):
+        """Flush and stop the log file writer"""
+        if self.listener:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
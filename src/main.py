@@ -1,12 +1,32 @@
 import customtkinter as ctk
 import os
-import subprocess
 import threading
 import json
-import re
 import sys
+import time
 from tkinter import messagebox
 
+from catalog import CatalogCache
+from config import ConfigWatcher, diff_programs, find_config_path, load_config
+from install_scheduler import InstallScheduler
+from instrumentation import Tracer, span, write_run
+from install_manifest import InstallIndex
+from integrity import HashManifest
+from log_pipeline import LogPipeline
+from output_capture import output_log_dir
+from probe_cache import ProbeCache
+from process_runner import ProcessRunner
+from program_list import VirtualProgramList
+from program_state import CHECKING, ProgramStore
+from settings import get_data_path, load_settings
+from staging import InstallerCache
+from timeouts import create_timeout_policy
+from timing_history import open_timing_history
+from update_journal import UpdateJournal, load_journal
+from update_planner import plan_updates
+from update_run import prepare_installers, skip_update, update_program
+from version_probe import ProbeEngine, get_program_version
+
 # Configure CustomTkinter appearance
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -26,14 +46,85 @@ class SoftwareUpdater:
         except Exception as e:
             print(f"Could not set icon: {e}")
         
-        # Load program data from JSON file
-        self.programs_data = self.load_programs()
+        # Load application settings and program data from JSON files; the config
+        # load is timed as part of the first check
+        self.settings = load_settings()
+        self.catalog_cache = CatalogCache(get_data_path(self.settings, "catalog_cache.json"))
+        self.startup_tracer = Tracer("check", profile=self.settings["profile"])
+        with span(self.startup_tracer, "config_load"):
+            self.programs_data = self.load_programs()
+        
+        # Probe and update state of every program, indexed by name; changes from
+        # worker threads are batched and drawn together with the log
+        self.program_store = ProgramStore(self.programs_data)
+        
+        # Log records are queued from any thread and drained into the UI on a timer
+        self.log_pipeline = LogPipeline(
+            get_data_path(self.settings, self.settings["log_file"]),
+            max_bytes=self.settings["log_max_bytes"],
+            backup_count=self.settings["log_backup_count"]
+        )
         
         # Initialize counter for Update All functionality
         self.pending_updates = 0
         
+        # Probe commands and installers run on one asyncio event loop, which
+        # streams their output and lets a running installer be cancelled
+        self.process_runner = ProcessRunner(self.settings["max_processes"])
+        
+        # Past durations predict how long Update All will take, order it longest-first and
+        # set adaptive timeouts, after which a probe's or installer's process tree is killed
+        self.timing_history = open_timing_history(self.settings)
+        self.timeouts = create_timeout_policy(self.settings, self.timing_history)
+        
+        # Version probes run on a bounded worker pool off the UI thread, and
+        # results are cached on disk until the probed files change
+        self.probe_cache = ProbeCache(
+            get_data_path(self.settings, "probe_cache.json"),
+            cmd_output_ttl=self.settings["cmd_output_ttl"],
+            max_entries=self.settings["probe_cache_max_entries"],
+            max_age_days=self.settings["probe_cache_max_age_days"]
+        )
+        # Installs with a recorded manifest are checked for missing or modified files
+        self.install_index = InstallIndex(
+            get_data_path(self.settings, "install_index.json"),
+            hash_workers=self.settings["verify_workers"]
+        )
+        self.probe_engine = ProbeEngine(
+            max_workers=self.settings["probe_workers"],
+            cache=self.probe_cache,
+            install_index=self.install_index,
+            runner=self.process_runner,
+            timeouts=self.timeouts
+        )
+        self.probe_generation = 0
+        
+        # Installer hashes are cached by (path, size, mtime) between runs
+        self.hash_manifest = HashManifest(get_data_path(self.settings, "hash_manifest.json"))
+        
+        # Installers are copied from slow media into a local content-addressed cache before they run
+        self.installer_cache = None
+        if self.settings["staging_cache_max_mb"]:
+            self.installer_cache = InstallerCache(
+                get_data_path(self.settings, "installers"),
+                self.settings["staging_cache_max_mb"] * 1024 * 1024
+            )
+        self.update_all_installers = None
+        self.update_all_output_dir = None
+        
+        # Update All progress is journaled so an interrupted run can be resumed
+        self.update_journal = UpdateJournal(get_data_path(self.settings, "update_journal.jsonl"))
+        
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.drain_log()
         self.check_installations()
+        self.root.after(0, self.offer_resume)
+        
+        # Edits to programs.json are picked up without a restart
+        self.config_watcher = ConfigWatcher(self.config_files)
+        if self.settings["config_poll_interval_ms"] > 0:
+            self.root.after(self.settings["config_poll_interval_ms"], self.poll_config)
         
     def get_resource_path(self, relative_path):
         """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -47,9 +138,13 @@ class SoftwareUpdater:
         
     def load_programs(self):
         """Load program data from JSON file"""
+        # A programs.json created or edited later in the current directory is picked up by the watcher
+        cwd_config_path = os.path.join(os.getcwd(), "programs.json")
+        self.config_path = cwd_config_path
+        self.config_files = [cwd_config_path]
         try:
-            # Get the path to programs.json
-            config_path = self.get_resource_path("programs.json")
+            # programs.json in the current directory wins over the bundled one
+            config_path = find_config_path()
             
             # Check if programs.json exists, if not create from template
             if not os.path.exists(config_path):
@@ -57,18 +152,17 @@ class SoftwareUpdater:
                 if os.path.exists(template_path):
                     import shutil
                     # For packaged version, we need to copy to the current working directory
-                    cwd_config_path = os.path.join(os.getcwd(), "programs.json")
                     shutil.copy(template_path, cwd_config_path)
-                    messagebox.showinfo("Info", "Created programs.json from template in the current directory. Please configure your programs and restart the application.")
+                    messagebox.showinfo("Info", "Created programs.json from template in the current directory. Please configure your programs; the list is updated when the file is saved.")
                     return []
                 else:
                     messagebox.showerror("Error", "programs.json file not found and template not available.")
                     return self.get_default_programs()
             
-            # Load programs from JSON file
-            with open(config_path, "r") as f:
-                programs = json.load(f)
-                
+            # Load programs from JSON file (and its includes), validated once up front
+            self.config_path = config_path
+            self.config_files = [config_path]
+            programs, self.config_files = load_config(config_path, self.catalog_cache)
             return programs
         except FileNotFoundError:
             messagebox.showerror("Error", "programs.json file not found. Using default programs.")
@@ -76,6 +170,9 @@ class SoftwareUpdater:
         except json.JSONDecodeError as e:
             messagebox.showerror("Error", f"Error parsing programs.json: {str(e)}")
             return self.get_default_programs()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return self.get_default_programs()
         except Exception as e:
             messagebox.showerror("Error", f"Error loading programs: {str(e)}")
             return self.get_default_programs()
@@ -99,92 +196,7 @@ class SoftwareUpdater:
         
     def get_program_version(self, program):
         """Get the currently installed version of a program"""
-        try:
-            # Check if program has version checking configuration
-            if "version_check" not in program:
-                return "Unknown"
-                
-            version_check = program["version_check"]
-            check_type = version_check.get("type", "none")
-            
-            if check_type == "none":
-                return "N/A"
-                
-            elif check_type == "exe_version":
-                # Get version from executable file properties
-                exe_path = version_check.get("path", "")
-                if not os.path.exists(exe_path):
-                    return "Not Installed"
-                    
-                # Use PowerShell to get file version
-                ps_command = f"(Get-Item '{exe_path}').VersionInfo.FileVersion"
-                result = subprocess.run(
-                    ["powershell", "-Command", ps_command],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    return result.stdout.strip()
-                else:
-                    return "Unknown"
-                    
-            elif check_type == "cmd_output":
-                # Get version from command output
-                command = version_check.get("command", "")
-                regex_pattern = version_check.get("regex", "")
-                
-                if not command:
-                    return "Unknown"
-                    
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                if result.returncode == 0 and result.stdout:
-                    if regex_pattern:
-                        match = re.search(regex_pattern, result.stdout)
-                        if match:
-                            return match.group(1)
-                    return result.stdout.strip()
-                elif result.stderr:
-                    match = re.search(regex_pattern, result.stderr)
-                    if match:
-                        return match.group(1)
-                    return "Unknown"
-                else:
-                    return "Unknown"
-                    
-            elif check_type == "file_content":
-                # Get version from file content
-                file_path = version_check.get("path", "")
-                regex_pattern = version_check.get("regex", "")
-                
-                if not os.path.exists(file_path):
-                    return "Not Installed"
-                    
-                with open(file_path, "r") as f:
-                    content = f.read()
-                    
-                if regex_pattern:
-                    match = re.search(regex_pattern, content)
-                    if match:
-                        return match.group(1)
-                return "Unknown"
-                
-            else:
-                return "Unknown"
-                
-        except subprocess.TimeoutExpired:
-            return "Timeout"
-        except Exception as e:
-            print(f"Error getting version for {program.get('name', 'Unknown')}: {str(e)}")
-            return "Error"
+        return get_program_version(program, self.process_runner, self.timeouts.get(program, "probe"))
             
     def setup_ui(self):
         # Main frame
@@ -207,24 +219,51 @@ class SoftwareUpdater:
         )
         desc_label.pack(pady=(0, 10))
         
+        # Action buttons
+        button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        button_frame.pack(pady=(0, 20))
+        
         # Update All button
         self.update_all_btn = ctk.CTkButton(
-            self.main_frame,
+            button_frame,
             text="Update All",
             command=self.start_update_all,
             font=ctk.CTkFont(size=16, weight="bold"),
             height=40
         )
-        self.update_all_btn.pack(pady=(0, 20))
+        self.update_all_btn.pack(side="left", padx=5)
         
-        # Programs frame
-        self.programs_frame = ctk.CTkScrollableFrame(self.main_frame, height=300)
-        self.programs_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        # Refresh button (re-runs all version probes)
+        self.refresh_btn = ctk.CTkButton(
+            button_frame,
+            text="Refresh",
+            command=self.check_installations,
+            font=ctk.CTkFont(size=16, weight="bold"),
+            height=40
+        )
+        self.refresh_btn.pack(side="left", padx=5)
         
-        # Create program widgets
-        self.program_widgets = []
-        for program in self.programs_data:
-            self.create_program_widget(program)
+        # Plan button (dry run: predicted order and duration of Update All)
+        self.plan_btn = ctk.CTkButton(
+            button_frame,
+            text="Plan",
+            command=self.show_plan,
+            font=ctk.CTkFont(size=16, weight="bold"),
+            height=40
+        )
+        self.plan_btn.pack(side="left", padx=5)
+        
+        # Programs list (only the rows in view get widgets)
+        self.program_list = VirtualProgramList(
+            self.main_frame,
+            on_update=self.on_row_button,
+            height=300
+        )
+        self.program_list.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        
+        # The list redraws once per batch of state changes
+        self.program_store.subscribe(self.on_states_changed)
+        self.program_list.set_items(self.program_store)
         
         # Log frame
         log_frame = ctk.CTkFrame(self.main_frame)
@@ -248,139 +287,200 @@ class SoftwareUpdater:
         )
         self.status_label.pack(pady=5)
         
-    def create_program_widget(self, program):
-        # Frame for each program
-        frame = ctk.CTkFrame(self.programs_frame)
-        frame.pack(fill="x", padx=10, pady=5)
-        
-        # Program name
-        name_label = ctk.CTkLabel(frame, text=program["name"], font=ctk.CTkFont(size=16, weight="bold"))
-        name_label.grid(row=0, column=0, padx=10, pady=10, sticky="w")
-        
-        # Installation path (smaller font)
-        path_label = ctk.CTkLabel(frame, text=program["install_path"], font=ctk.CTkFont(size=12))
-        path_label.grid(row=1, column=0, padx=10, pady=(0, 5), sticky="w")
-        
-        # Version information
-        version_label = ctk.CTkLabel(frame, text="Checking...", font=ctk.CTkFont(size=12))
-        version_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="w")
-        
-        # Status label
-        status_label = ctk.CTkLabel(frame, text="Checking...", font=ctk.CTkFont(size=12))
-        status_label.grid(row=0, column=1, padx=10, pady=10)
-        
-        # Update button
-        update_btn = ctk.CTkButton(
-            frame, 
-            text="Update", 
-            command=lambda p=program: self.start_update(p),
-            width=80
-        )
-        update_btn.grid(row=0, column=2, padx=10, pady=10)
-        
-        # Progress bar (hidden by default)
-        progress_bar = ctk.CTkProgressBar(frame)
-        progress_bar.set(0)
-        progress_bar.grid(row=3, column=0, columnspan=3, padx=10, pady=(0, 10), sticky="ew")
-        progress_bar.grid_forget()  # Hide initially
-        
-        # Store widget references
-        widget_data = {
-            "frame": frame,
-            "status_label": status_label,
-            "version_label": version_label,
-            "update_btn": update_btn,
-            "progress_bar": progress_bar
-        }
-        self.program_widgets.append(widget_data)
+    def on_states_changed(self, states, reset):
+        """Redraw the program list for a batch of state changes"""
+        if reset:
+            self.program_list.set_items(self.program_store)
+        else:
+            self.program_list.refresh_items(states)
         
     def check_installations(self):
         """Check which programs are installed and their versions"""
-        # For packaged version, check if programs.json exists in current directory
+        # Results from an earlier, superseded check are ignored
+        self.probe_generation += 1
+        generation = self.probe_generation
+        tracer = self.startup_tracer or Tracer("check", profile=self.settings["profile"])
+        self.startup_tracer = None
+        
+        states = list(self.program_store)
+        for state in states:
+            self.program_store.update(state, status=CHECKING, installed=None, current_version=None, detail=None)
+        self.program_store.flush()
+        
+        self.refresh_btn.configure(state="disabled")
+        self.status_label.configure(text=f"Checking {len(self.programs_data)} programs...")
+        
+        # Probe all programs concurrently; results are recorded as they land and drawn in batches
+        self.probe_engine.probe_all(
+            [state.program for state in states],
+            on_result=lambda i, program, installed, version: self.apply_probe_result(
+                generation, states[i], program, installed, version),
+            on_complete=lambda: self.root.after(0, lambda: self.finish_check(generation, tracer)),
+            tracer=tracer
+        )
+        
+    def apply_probe_result(self, generation, state, program, installed, current_version):
+        """Record the result of one version probe in its program's state (any thread)"""
+        # Skip results of a superseded check or for a program that has since been reloaded
+        if generation != self.probe_generation or state.program is not program:
+            return
+        
+        detail = None
+        if installed and current_version == "Damaged":
+            check = self.install_index.last_check(program["name"])
+            detail = check.describe() if check else "files changed"
+            self.log_message(f"Install of {program['name']} is damaged: {detail}", program["name"])
+        
+        # An older catalog version is flagged, never installed by Update All
+        if self.program_store.apply_probe(state, installed, current_version, detail) == "Newer Installed":
+            self.log_message(
+                f"{program['name']}: installed version {current_version} is newer than "
+                f"{state.new_version} in programs.json; not downgrading", program["name"])
+                
+    def recheck_program(self, program):
+        """Re-probe a single program, e.g. after it has been updated"""
+        state = self.program_store.get(program["name"])
+        if state is None or state.program is not program:
+            return
+        
+        # Its cached result is stale even if the probed files look unchanged
+        self.probe_cache.invalidate(program["name"])
+        self.probe_states([state])
+        
+    def probe_states(self, states):
+        """Probe some programs as part of the current check generation"""
+        generation = self.probe_generation
+        self.probe_engine.probe_all(
+            [state.program for state in states],
+            on_result=lambda i, program, installed, version: self.apply_probe_result(
+                generation, states[i], program, installed, version)
+        )
+        
+    def poll_config(self):
+        """Reload programs.json if it changed on disk, then reschedule"""
         try:
-            if hasattr(sys, '_MEIPASS'):
-                # Running as packaged executable
-                cwd_config_path = os.path.join(os.getcwd(), "programs.json")
-                if os.path.exists(cwd_config_path):
-                    # Load programs from current working directory
-                    with open(cwd_config_path, "r") as f:
-                        self.programs_data = json.load(f)
+            if self.config_watcher.changed():
+                self.reload_programs()
         except Exception as e:
-            print(f"Error loading programs from current directory: {e}")
+            self.log_message(f"Error reloading programs.json: {str(e)}")
+        self.root.after(self.settings["config_poll_interval_ms"], self.poll_config)
         
-        for i, program in enumerate(self.programs_data):
-            widget_data = self.program_widgets[i]
-            status_label = widget_data["status_label"]
-            version_label = widget_data["version_label"]
-            
-            # Check if installed
-            if os.path.exists(program["install_path"]):
-                # Get current version
-                current_version = self.get_program_version(program)
-                new_version = program.get("new_version", "Unknown")
-                
-                # Update version label
-                if current_version != "Unknown" and current_version != "Error":
-                    version_text = f"Current: {current_version}"
-                    if new_version != "Unknown" and new_version != "N/A":
-                        version_text += f" → New: {new_version}"
-                    version_label.configure(text=version_text)
-                    
-                    # Check if update is available
-                    if (new_version != "Unknown" and new_version != "N/A" and 
-                        current_version != new_version):
-                        status_label.configure(text="Update Available", text_color="orange")
-                    else:
-                        status_label.configure(text="Installed", text_color="green")
-                else:
-                    version_label.configure(text="Version: Unknown")
-                    status_label.configure(text="Installed", text_color="green")
-            else:
-                status_label.configure(text="Not Installed", text_color="red")
-                new_version = program.get("new_version", "Unknown")
-                if new_version != "Unknown" and new_version != "N/A":
-                    version_label.configure(text=f"New: {new_version}")
-                else:
-                    version_label.configure(text="Not Installed")
+    def reload_programs(self):
+        """Apply an edited programs.json, re-probing only the programs that changed"""
+        try:
+            programs, files = load_config(self.config_path, self.catalog_cache)
+        except Exception as e:
+            # Keep the current list; the next saved edit is tried again
+            self.log_message(f"Could not reload programs.json: {str(e)}")
+            return
+        
+        # Includes may have been added or removed
+        if files != self.config_watcher.paths:
+            self.config_watcher.set_paths(files)
+        
+        added, removed, changed = diff_programs(self.programs_data, programs)
+        if not (added or removed or changed) and programs == self.programs_data:
+            return
+        
+        # Unchanged programs keep their state, and with it their status and version;
+        # programs being updated keep theirs until the update is done
+        to_probe = self.program_store.set_programs(programs)
+        self.programs_data = [state.program for state in self.program_store]
+        self.program_store.flush()
+        self.log_message(
+            f"Reloaded programs.json: {len(added)} added, {len(removed)} removed, {len(changed)} changed")
+        if to_probe:
+            self.probe_states(to_probe)
+        
+    def finish_check(self, generation, tracer=None):
+        """Re-enable refreshing once every probe of a check has landed"""
+        if generation != self.probe_generation:
+            return
+        self.refresh_btn.configure(state="normal")
+        self.status_label.configure(text="Ready")
+        self.write_trace(tracer)
+        
+    def write_trace(self, tracer):
+        """Write a finished run's trace files off the UI thread"""
+        if tracer is not None and (self.settings["trace_enabled"] or self.settings["timing_history"]):
+            thread = threading.Thread(target=write_run, args=(tracer, self.settings))
+            thread.daemon = True
+            thread.start()
                     
+    def on_row_button(self, state):
+        """Start updating a program, or cancel its update if one is pending or running"""
+        if state.busy:
+            self.cancel_update(state)
+        else:
+            self.start_update(state.program)
+            
+    def cancel_update(self, state):
+        """Cancel a pending update, or kill its running installer process"""
+        self.program_store.update(state, cancelled=True)
+        job = state.job
+        if job:
+            job.cancel()
+        self.program_store.flush()
+        self.log_message(f"Cancelling update of {state.name}...", state.name)
+        
+    def attach_job(self, state, job):
+        """Remember the installer process of a program so it can be cancelled (any thread)"""
+        state.job = job
+        if state.cancelled:
+            job.cancel()
+            
     def start_update(self, program):
         """Start the update process for a program"""
-        # Find the widget data for this program
-        widget_data = None
-        for wd in self.program_widgets:
-            name_label = wd["frame"].winfo_children()[0]  # First label is the name
-            if name_label.cget("text") == program["name"]:
-                widget_data = wd
-                break
-                
-        if not widget_data:
-            self.log_message(f"Error: Could not find widget for {program['name']}")
+        state = self.program_store.get(program["name"])
+        if state is None:
+            self.log_message(f"Error: Could not find {program['name']}")
             return
             
-        # Disable update button
-        widget_data["update_btn"].configure(state="disabled", text="Updating...")
-        
-        # Show progress bar
-        widget_data["progress_bar"].grid()
+        # Turn the update button into a cancel button and show progress bar
+        self.program_store.update(state, busy=True, cancelled=False, job=None, progress=0)
+        self.program_store.flush()
         
         # Start update in separate thread
-        thread = threading.Thread(target=self.run_update, args=(program, widget_data))
+        thread = threading.Thread(target=self.run_update, args=(program, state))
         thread.daemon = True
         thread.start()
         
-    def start_update_all(self):
-        """Start the update process for all programs"""
+    def offer_resume(self):
+        """Offer to resume an Update All run that was interrupted, e.g. by a crash or reboot"""
+        interrupted = load_journal(self.update_journal.path)
+        if interrupted is None:
+            return
+        remaining = interrupted.remaining(self.programs_data)
+        if interrupted.config != os.path.abspath(self.config_path) or not remaining:
+            self.update_journal.finish()
+            return
+        
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(interrupted.started))
+        if messagebox.askyesno(
+            "Resume Update All",
+            f"Update All started {started} was interrupted after {interrupted.done_count()} of "
+            f"{len(interrupted.planned)} programs were updated.\n\n"
+            f"Resume and update the remaining {len(remaining)} programs?"
+        ):
+            self.start_update_all(resume=interrupted)
+        else:
+            self.update_journal.finish()
+            
+    def start_update_all(self, resume=None):
+        """Start the update process for all programs, or for the rest of an interrupted run"""
         # Disable the Update All button
         self.update_all_btn.configure(state="disabled", text="Updating All...")
         
         # Get list of programs that need updating
         programs_to_update = []
-        for i, program in enumerate(self.programs_data):
-            widget_data = self.program_widgets[i]
-            status_text = widget_data["status_label"].cget("text")
-            # Add programs that are either "Not Installed" or "Update Available"
-            if status_text in ["Not Installed", "Update Available"]:
-                programs_to_update.append((program, widget_data))
+        if resume:
+            # Everything planned except the programs already updated and verified
+            programs_to_update = [
+                (program, self.program_store.get(program["name"])) for program in resume.remaining(self.programs_data)
+            ]
+        else:
+            # Programs that are "Not Installed", "Update Available" or "Damaged"
+            programs_to_update = [(state.program, state) for state in self.program_store.needing_update()]
         
         if not programs_to_update:
             self.log_message("No programs need updating.")
@@ -389,166 +489,218 @@ class SoftwareUpdater:
             
         self.log_message(f"Starting update for {len(programs_to_update)} programs...")
         
-        # Start updates in separate threads
         self.pending_updates = len(programs_to_update)
-        for program, widget_data in programs_to_update:
-            # Disable individual update button
-            widget_data["update_btn"].configure(state="disabled", text="Pending...")
-            
-            # Show progress bar
-            widget_data["progress_bar"].grid()
-            
-            # Start update in separate thread
-            thread = threading.Thread(target=self.run_update_all, args=(program, widget_data))
-            thread.daemon = True
-            thread.start()
+        self.update_all_tracer = Tracer("update-all", profile=self.settings["profile"])
+        for program, state in programs_to_update:
+            # Turn individual update buttons into cancel buttons and show progress bars
+            self.program_store.update(state, busy=True, cancelled=False, job=None, progress=0)
+        self.program_store.flush()
+        
+        # Verify installer hashes before any install starts, off the UI thread
+        resumed_from = resume.started if resume else None
+        thread = threading.Thread(target=self.verify_and_schedule, args=(programs_to_update, resumed_from))
+        thread.daemon = True
+        thread.start()
         
-    def run_update(self, program, widget_data):
-        """Run the actual update process using PowerShell"""
-        self.log_message(f"Starting update for {program['name']}...")
+    def plan_update_all(self, programs):
+        """Return the UpdatePlan of updating programs with the configured install workers"""
+        return plan_updates(
+            programs,
+            self.timing_history,
+            max_workers=self.settings["install_workers"],
+            class_limits=self.settings["install_class_limits"],
+            manifest=self.hash_manifest
+        )
         
-        # Check if installer exists
-        if not os.path.exists(program["installer_path"]):
-            self.root.after(0, lambda: self.finish_update(
-                program, widget_data, f"Installer not found: {program['installer_path']}", False))
+    def show_plan(self):
+        """Show the predicted order and wall-clock time of Update All without installing anything"""
+        programs = [state.program for state in self.program_store.needing_update()]
+        if not programs:
+            self.log_message("No programs need updating.")
             return
-            
+        self.plan_btn.configure(state="disabled")
+        
+        def plan():
+            try:
+                lines = self.plan_update_all(programs).describe()
+            except Exception as e:
+                lines = [f"Could not plan Update All: {str(e)}"]
+            self.root.after(0, lambda: finish(lines))
+        
+        def finish(lines):
+            self.plan_btn.configure(state="normal")
+            for line in lines:
+                self.log_message(line)
+            shown = lines[:26] + ([f"  ... and {len(lines) - 26} more"] if len(lines) > 26 else [])
+            messagebox.showinfo("Update All Plan", "\n".join(shown))
+        
+        thread = threading.Thread(target=plan)
+        thread.daemon = True
+        thread.start()
+        
+    def verify_and_schedule(self, programs_to_update, resumed_from=None):
+        """Stage or verify the installers, then hand the updates to the install scheduler"""
+        journal_started = False
+        installers = None
         try:
-            # Handle different file types
-            installer_path = program["installer_path"]
-            file_ext = os.path.splitext(installer_path)[1].lower()
+            # Longest predicted installs start first, so they do not become the tail of the run
+            states = {program["name"]: state for program, state in programs_to_update}
+            plan = self.plan_update_all([program for program, state in programs_to_update])
+            self.log_message(plan.describe()[0])
+            programs = plan.programs
+            self.update_all_output_dir = output_log_dir(self.settings, self.update_all_tracer.run_id)
+            self.update_journal.begin(programs, self.config_path, resumed_from)
+            journal_started = True
+            installers = prepare_installers(
+                programs, self.settings, self.hash_manifest, self.installer_cache, self.update_all_tracer,
+                self.log_message)
+            self.update_all_installers = installers
             
-            if file_ext == ".zip":
-                # Special handling for zip files (extract instead of execute)
-                ps_command = (
-                    f"Expand-Archive -Path '{installer_path}' "
-                    f"-DestinationPath '{program['install_path']}' -Force"
-                )
-                self.log_message(f"Extracting: {ps_command}")
-            else:
-                # Construct PowerShell command for executables
-                ps_command = (
-                    f"Start-Process -FilePath '{installer_path}' "
-                    f"-ArgumentList '{program['silent_args']}' -Wait"
-                )
-                self.log_message(f"Executing: {ps_command}")
+            def skip(program, state, reason):
+                message = skip_update(program, installers, reason, self.update_journal)
+                self.root.after(0, lambda: self.finish_update_all(program, state, message, False))
             
-            # Run PowerShell with the command
-            result = subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
+            # Run the updates on a bounded scheduler (MSI installers one at a time)
+            scheduler = InstallScheduler(
+                max_workers=self.settings["install_workers"],
+                class_limits=self.settings["install_class_limits"]
             )
+            def complete():
+                installers.close()
+                self.update_journal.finish()
             
-            # Check result
-            if result.returncode == 0:
-                self.root.after(0, lambda: self.finish_update(
-                    program, widget_data, f"{program['name']} updated successfully!", True))
-            else:
-                error_msg = result.stderr if result.stderr else "Unknown error occurred"
-                self.root.after(0, lambda: self.finish_update(
-                    program, widget_data, f"Update failed: {error_msg}", False))
-                
-        except subprocess.TimeoutExpired:
-            self.root.after(0, lambda: self.finish_update(
-                program, widget_data, "Update timed out after 5 minutes", False))
+            scheduler.start(
+                [(program, states[program["name"]]) for program in programs],
+                self.run_update_all,
+                on_skip=skip,
+                on_complete=complete
+            )
         except Exception as e:
-            self.root.after(0, lambda: self.finish_update(
-                program, widget_data, f"Update error: {str(e)}", False))
-                
-    def run_update_all(self, program, widget_data):
-        """Run the actual update process using PowerShell for Update All functionality"""
-        self.log_message(f"Starting update for {program['name']}...")
-        
-        # Check if installer exists
-        if not os.path.exists(program["installer_path"]):
-            self.root.after(0, lambda: self.finish_update_all(
-                program, widget_data, f"Installer not found: {program['installer_path']}", False))
-            return
+            # Nothing was installed: drop the run, but keep an interrupted run's journal if this one never began
+            self.log_message(f"Could not start Update All: {str(e)}")
+            if installers:
+                installers.close()
+            if journal_started:
+                self.update_journal.finish()
+            self.root.after(0, lambda: self.abort_update_all([state for program, state in programs_to_update]))
             
+    def abort_update_all(self, states):
+        """Reset the Update All button and the rows of an Update All run that could not start"""
+        fresh = [self.program_store.finish_update(state) for state in states]
+        self.program_store.flush()
+        self.pending_updates = 0
+        self.update_all_btn.configure(state="normal", text="Update All")
+        self.status_label.configure(text="Update All failed to start")
+        fresh = [state for state in fresh if state]
+        if fresh:
+            self.programs_data = [state.program for state in self.program_store]
+            self.probe_states(fresh)
+        
+    def install_options(self, state, output_dir):
+        """Return the run_installer() options of a GUI update, which report into the program's state"""
+        return {
+            "progress": self.progress_callback(state),
+            "extract_workers": self.settings["extract_workers"],
+            "install_index": self.install_index,
+            "runner": self.process_runner,
+            "on_job": lambda job: self.attach_job(state, job),
+            "output_dir": output_dir,
+            "output_lines": self.settings["output_lines"],
+            "timeouts": self.timeouts,
+        }
+        
+    def run_update(self, program, state):
+        """Run the actual update process"""
+        self.log_message(f"Starting update for {program['name']}...", program["name"])
+        
+        tracer = Tracer("update", profile=self.settings["profile"])
+        
+        # Refuse to run an installer that does not match its configured hash
+        installers = prepare_installers(
+            [program], self.settings, self.hash_manifest, self.installer_cache, tracer,
+            lambda text: self.log_message(text, program["name"]))
         try:
-            # Handle different file types
-            installer_path = program["installer_path"]
-            file_ext = os.path.splitext(installer_path)[1].lower()
-            
-            if file_ext == ".zip":
-                # Special handling for zip files (extract instead of execute)
-                ps_command = (
-                    f"Expand-Archive -Path '{installer_path}' "
-                    f"-DestinationPath '{program['install_path']}' -Force"
-                )
-                self.log_message(f"Extracting: {ps_command}")
-            else:
-                # Construct PowerShell command for executables
-                ps_command = (
-                    f"Start-Process -FilePath '{installer_path}' "
-                    f"-ArgumentList '{program['silent_args']}' -Wait"
-                )
-                self.log_message(f"Executing: {ps_command}")
-            
-            # Run PowerShell with the command
-            result = subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
+            status, success, message = update_program(
+                program,
+                installers,
+                lambda text: self.log_message(text, program["name"]),
+                cancelled=lambda: state.cancelled,
+                probe_cache=self.probe_cache,
+                tracer=tracer,
+                **self.install_options(state, output_log_dir(self.settings, tracer.run_id))
             )
-            
-            # Check result
-            if result.returncode == 0:
-                self.root.after(0, lambda: self.finish_update_all(
-                    program, widget_data, f"{program['name']} updated successfully!", True))
-            else:
-                error_msg = result.stderr if result.stderr else "Unknown error occurred"
-                self.root.after(0, lambda: self.finish_update_all(
-                    program, widget_data, f"Update failed: {error_msg}", False))
-                
-        except subprocess.TimeoutExpired:
-            self.root.after(0, lambda: self.finish_update_all(
-                program, widget_data, "Update timed out after 5 minutes", False))
-        except Exception as e:
-            self.root.after(0, lambda: self.finish_update_all(
-                program, widget_data, f"Update error: {str(e)}", False))
+        finally:
+            installers.close()
+        write_run(tracer, self.settings)
+        self.root.after(0, lambda: self.finish_update(program, state, message, success))
                 
-    def finish_update(self, program, widget_data, message, success):
-        """Finish the update process and update UI"""
-        # Hide progress bar
-        widget_data["progress_bar"].grid_forget()
+    def run_update_all(self, program, state):
+        """Run the actual update process for Update All functionality.
+        
+        Returns True if the installer succeeded, so the scheduler can hold back dependents.
+        """
+        self.log_message(f"Starting update for {program['name']}...", program["name"])
+        
+        # Installers were staged ahead, or verified up front, by verify_and_schedule
+        status, success, message = update_program(
+            program,
+            self.update_all_installers,
+            lambda text: self.log_message(text, program["name"]),
+            journal=self.update_journal,
+            cancelled=lambda: state.cancelled,
+            probe_cache=self.probe_cache,
+            tracer=self.update_all_tracer,
+            **self.install_options(state, self.update_all_output_dir)
+        )
+        self.root.after(0, lambda: self.finish_update_all(program, state, message, success))
+        return success
+        
+    def progress_callback(self, state):
+        """Return a thread-safe callback that records installer byte progress for a program's progress bar"""
+        last = [-1.0]
         
-        # Re-enable update button
-        widget_data["update_btn"].configure(state="normal", text="Update")
+        def update(done, total):
+            fraction = done / total if total else 1.0
+            # Only queue a redraw when the bar moves by at least 1%
+            if fraction - last[0] >= 0.01 or fraction >= 1.0:
+                last[0] = fraction
+                self.program_store.update(state, progress=fraction)
         
-        # Update status
-        status_text = "Installed" if success else "Error"
-        status_color = "green" if success else "red"
-        widget_data["status_label"].configure(text=status_text, text_color=status_color)
+        return update
+                
+    def settle_update(self, program, state, message, success):
+        """Show the result of a finished update in its program's row, and probe the program again"""
+        # Hide the progress bar, re-enable the update button and update the status
+        cancelled = state.cancelled and not success
+        status = "Installed" if success else "Cancelled" if cancelled else "Error"
+        fresh = self.program_store.finish_update(state, status=status, message=message)
+        self.program_store.flush()
         
         # Log message
-        self.log_message(message)
+        self.log_message(message, program["name"])
         
         # Update status bar
         self.status_label.configure(text=message)
         
+        if fresh:
+            # programs.json changed the program while it was being updated
+            self.programs_data = [state.program for state in self.program_store]
+            self.probe_states([fresh])
+        elif success or cancelled:
+            # Show the newly installed version, or what a cancelled installer left behind
+            self.recheck_program(program)
+            
+    def finish_update(self, program, state, message, success):
+        """Finish the update process and update UI"""
+        self.settle_update(program, state, message, success)
+        
         # Show completion message if needed
         if success:
             messagebox.showinfo("Update Complete", message)
             
-    def finish_update_all(self, program, widget_data, message, success):
+    def finish_update_all(self, program, state, message, success):
         """Finish the update process for Update All functionality and update UI"""
-        # Hide progress bar
-        widget_data["progress_bar"].grid_forget()
-        
-        # Update status
-        status_text = "Installed" if success else "Error"
-        status_color = "green" if success else "red"
-        widget_data["status_label"].configure(text=status_text, text_color=status_color)
-        
-        # Log message
-        self.log_message(message)
-        
-        # Update status bar
-        self.status_label.configure(text=message)
+        self.settle_update(program, state, message, success)
         
         # Decrement pending updates counter
         self.pending_updates -= 1
@@ -556,15 +708,42 @@ class SoftwareUpdater:
         # If all updates are done, re-enable the Update All button
         if self.pending_updates <= 0:
             self.update_all_btn.configure(state="normal", text="Update All")
+            self.write_trace(self.update_all_tracer)
             self.log_message("All updates completed.")
             messagebox.showinfo("Update Complete", "All programs have been updated.")
             
-    def log_message(self, message):
-        """Add a message to the log"""
-        self.log_text.configure(state="normal")
-        self.log_text.insert("end", f"{message}\n")
-        self.log_text.configure(state="disabled")
-        self.log_text.see("end")  # Scroll to end
+    def log_message(self, message, program=None):
+        """Add a message to the log (safe to call from any thread)"""
+        self.log_pipeline.log(message, program)
+        
+    def drain_log(self):
+        """Move queued log messages and program state changes into the UI in one batch, then reschedule"""
+        self.program_store.flush()
+        messages = self.log_pipeline.drain()
+        if messages:
+            self.log_text.configure(state="normal")
+            self.log_text.insert("end", "\n".join(messages) + "\n")
+            
+            # Keep only the newest lines in the textbox (the log file keeps everything)
+            line_count = int(self.log_text.index("end-1c").split(".")[0])
+            excess = line_count - self.settings["log_max_lines"]
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+                
+            self.log_text.configure(state="disabled")
+            self.log_text.see("end")  # Scroll to end
+            
+        self.root.after(self.settings["log_drain_interval_ms"], self.drain_log)
+        
+    def on_close(self):
+        """Flush the log file and close the window"""
+        if self.pending_updates > 0 and not messagebox.askyesno(
+            "Updates Running",
+            "Update All is still running. Quit anyway? The remaining updates can be resumed on the next launch."
+        ):
+            return
+        self.log_pipeline.close()
+        self.root.destroy()
         
     def run(self):
         self.root.mainloop()
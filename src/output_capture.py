@@ -0,0 +1,94 @@
+import collections
+import os
+import re
+import shutil
+import threading
+import time
+
+from settings import get_data_path
+
+# Lines of an error summary, and the longest summary in characters (status bar, results)
+SUMMARY_LINES = 5
+SUMMARY_CHARS = 500
+
+def output_file_name(program_name):
+    """Return a safe log file name for a program's output"""
+    return re.sub(r"[^\w.-]+", "_", program_name).strip("_") + ".log"
+
+class OutputCapture:
+    """Bounded capture of one process's output.
+
+    The last max_lines lines stay in memory for display and error
+    summaries, while every line is written to an optional log file as it
+    arrives, so memory use does not grow with the amount of output. add()
+    may be called from any thread.
+    """
+
+    def __init__(self, log_path=None, max_lines=200):
+        self.log_path = log_path
+        self.lines = collections.deque(maxlen=max(1, int(max_lines)))
+        self.line_count = 0
+        self.lock = threading.Lock()
+        self.file = None
+        if log_path:
+            try:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                self.file = open(log_path, "w", encoding="utf-8", errors="replace")
+            except OSError as e:
+                print(f"Could not open output log {log_path}: {e}")
+                self.log_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, stream, line):
+        """Record one line of output from "stdout" or "stderr" """
+        with self.lock:
+            self.lines.append((stream, line))
+            self.line_count += 1
+            if self.file:
+                try:
+                    self.file.write(f"[{stream}] {line}\n" if stream == "stderr" else line + "\n")
+                except OSError as e:
+                    print(f"Error writing output log {self.log_path}: {e}")
+                    self.file = None
+
+    def tail(self, count=None, stream=None):
+        """Return the last count lines kept in memory, optionally of one stream only"""
+        with self.lock:
+            lines = [line for s, line in self.lines if stream is None or s == stream]
+        return lines[-count:] if count else lines
+
+    def summary(self):
+        """Return the end of stderr (or of stdout if stderr is empty) as a short error summary, or "" """
+        lines = self.tail(SUMMARY_LINES, "stderr") or self.tail(SUMMARY_LINES, "stdout")
+        text = "\n".join(line.strip() for line in lines)
+        if len(text) > SUMMARY_CHARS:
+            text = "..." + text[-SUMMARY_CHARS:]
+        return text
+
+    def close(self):
+        """Close the log file"""
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+def output_log_dir(settings, run_id=None):
+    """Return the directory for the installer output logs of one run, pruning the oldest runs.
+
+    Runs beyond settings["output_log_keep_runs"] are deleted. The directory
+    itself is only created when the first log is written, so runs that
+    start no installer process leave nothing behind.
+    """
+    log_dir = get_data_path(settings, settings["output_log_dir"])
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S") + "-update"
+    keep_runs = settings["output_log_keep_runs"]
+    os.makedirs(log_dir, exist_ok=True)
+    runs = sorted(name for name in os.listdir(log_dir) if name != run_id)
+    for name in runs[:max(0, len(runs) - keep_runs + 1)] if keep_runs > 0 else []:
+        shutil.rmtree(os.path.join(log_dir, name), ignore_errors=True)
+    return os.path.join(log_dir, run_id)
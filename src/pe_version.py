@@ -0,0 +1,227 @@
+import mmap
+import os
+import struct
+
+# Resource type ID of the VS_VERSIONINFO resource
+RT_VERSION = 16
+
+# Signature of the VS_FIXEDFILEINFO structure
+VS_FFI_SIGNATURE = 0xFEEF04BD
+
+# Guards against malformed or hostile files looping forever
+MAX_RESOURCE_ENTRIES = 4096
+MAX_VERSION_BLOCKS = 4096
+
+class PEFormatError(ValueError):
+    """Raised when a file is not a PE image or its headers are malformed"""
+
+def read_version_info(path):
+    """Read the VS_VERSIONINFO resource of a PE executable.
+
+    Only the headers and the resource directory are touched through a
+    read-only memory map. Returns a dict with the StringFileInfo strings
+    (e.g. "FileVersion", "ProductVersion") plus "FixedFileVersion" and
+    "FixedProductVersion" from VS_FIXEDFILEINFO, or None if the image has
+    no readable version resource (including a truncated or corrupt resource
+    directory). Raises PEFormatError for files that are not PE images.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise PEFormatError("Empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                resource = find_version_resource(data)
+                if resource is None:
+                    return None
+                offset, size = resource
+                return parse_version_info(data, offset, offset + size)
+            except struct.error as e:
+                raise PEFormatError(f"Truncated PE image: {e}")
+
+def get_exe_version(path, field="FileVersion"):
+    """Return a version string from a PE executable, or None if it cannot be read natively.
+
+    The StringFileInfo value is preferred, as that is what Windows shows in
+    file properties; the numeric VS_FIXEDFILEINFO version is the fallback.
+    """
+    try:
+        info = read_version_info(path)
+    except (OSError, ValueError):
+        return None
+    if not info:
+        return None
+
+    value = info.get(field, "").strip()
+    if value:
+        return value
+    return info.get(f"Fixed{field}")
+
+def find_version_resource(data):
+    """Return (file offset, size) of the first RT_VERSION resource, or None"""
+    if data[:2] != b"MZ":
+        raise PEFormatError("Missing MZ signature")
+    pe_offset = struct.unpack_from("<I", data, 0x3C)[0]
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        raise PEFormatError("Missing PE signature")
+
+    # COFF file header
+    num_sections, = struct.unpack_from("<H", data, pe_offset + 6)
+    optional_size, = struct.unpack_from("<H", data, pe_offset + 20)
+    optional_offset = pe_offset + 24
+
+    # Optional header: the data directories start at a different offset for PE32+
+    magic, = struct.unpack_from("<H", data, optional_offset)
+    if magic == 0x10B:
+        directories_offset = optional_offset + 96
+    elif magic == 0x20B:
+        directories_offset = optional_offset + 112
+    else:
+        raise PEFormatError(f"Unknown optional header magic 0x{magic:x}")
+
+    # The resource table is data directory 2
+    if directories_offset + 3 * 8 > optional_offset + optional_size:
+        return None
+    resource_rva, resource_size = struct.unpack_from("<II", data, directories_offset + 2 * 8)
+    if not resource_rva or not resource_size:
+        return None
+
+    sections = []
+    section_offset = optional_offset + optional_size
+    for i in range(num_sections):
+        virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from(
+            "<IIII", data, section_offset + i * 40 + 8)
+        sections.append((virtual_address, max(virtual_size, raw_size), raw_offset, raw_size))
+
+    def rva_to_offset(rva):
+        for virtual_address, span, raw_offset, raw_size in sections:
+            if virtual_address <= rva < virtual_address + span:
+                delta = rva - virtual_address
+                if delta >= raw_size:
+                    return None
+                return raw_offset + delta
+        return None
+
+    root = rva_to_offset(resource_rva)
+    if root is None:
+        return None
+    try:
+        return walk_resources(data, root, rva_to_offset)
+    except struct.error:
+        # Entries pointing past the end of the file: the image has no readable version resource
+        return None
+
+def walk_resources(data, root, rva_to_offset):
+    """Walk type -> name -> language from the resource root, taking RT_VERSION and then the first entry.
+
+    Returns (file offset, size) of the resource data, or None.
+    """
+    offset = root
+    wanted_id = RT_VERSION
+    for level in range(3):
+        entry = find_resource_entry(data, offset, wanted_id)
+        if entry is None:
+            return None
+        target, is_directory = entry
+        if level < 2 and not is_directory:
+            return None
+        offset = root + target
+        wanted_id = None
+
+    if is_directory:
+        return None
+    data_rva, data_size = struct.unpack_from("<II", data, offset)
+    data_offset = rva_to_offset(data_rva)
+    if data_offset is None or data_offset + data_size > len(data):
+        return None
+    return data_offset, data_size
+
+def find_resource_entry(data, offset, wanted_id=None):
+    """Find an entry in an IMAGE_RESOURCE_DIRECTORY.
+
+    Returns (offset relative to the resource root, is_directory) for the entry
+    with wanted_id, or for the first entry if wanted_id is None.
+    """
+    named, ids = struct.unpack_from("<HH", data, offset + 12)
+    count = min(named + ids, MAX_RESOURCE_ENTRIES)
+    for i in range(count):
+        name, target = struct.unpack_from("<II", data, offset + 16 + i * 8)
+        if wanted_id is not None and (name & 0x80000000 or name != wanted_id):
+            continue
+        return target & 0x7FFFFFFF, bool(target & 0x80000000)
+    return None
+
+def read_block(data, offset, end):
+    """Read a version resource block header.
+
+    Returns (key, value offset, value length in bytes, children offset,
+    block end, is text) or None if the block does not fit.
+    """
+    if offset + 6 > end:
+        return None
+    length, value_length, value_type = struct.unpack_from("<HHH", data, offset)
+    block_end = min(offset + length, end)
+    if length < 6 or block_end <= offset + 6:
+        return None
+
+    # szKey is a NUL-terminated UTF-16LE string
+    key_start = offset + 6
+    key_end = key_start
+    while key_end + 1 < block_end and data[key_end:key_end + 2] != b"\0\0":
+        key_end += 2
+    key = data[key_start:key_end].decode("utf-16-le", errors="replace")
+
+    value_offset = align4(key_end + 2)
+    is_text = value_type == 1
+    value_size = value_length * 2 if is_text else value_length
+    value_size = max(0, min(value_size, block_end - value_offset))
+    children_offset = align4(value_offset + value_size)
+    return key, value_offset, value_size, children_offset, block_end, is_text
+
+def iter_blocks(data, offset, end):
+    """Yield the child blocks found between offset and end"""
+    for _ in range(MAX_VERSION_BLOCKS):
+        offset = align4(offset)
+        block = read_block(data, offset, end)
+        if block is None:
+            return
+        yield block
+        offset = block[4]
+
+def parse_version_info(data, offset, end):
+    """Parse a VS_VERSIONINFO block into a dict of version fields"""
+    root = read_block(data, offset, end)
+    if root is None or root[0] != "VS_VERSION_INFO":
+        return None
+    key, value_offset, value_size, children_offset, root_end, is_text = root
+
+    info = {}
+    if value_size >= 52:
+        signature, _, file_ms, file_ls, product_ms, product_ls = struct.unpack_from(
+            "<IIIIII", data, value_offset)
+        if signature == VS_FFI_SIGNATURE:
+            info["FixedFileVersion"] = format_fixed_version(file_ms, file_ls)
+            info["FixedProductVersion"] = format_fixed_version(product_ms, product_ls)
+
+    # StringFileInfo -> StringTable (one per language) -> String
+    for child in iter_blocks(data, children_offset, root_end):
+        if child[0] != "StringFileInfo":
+            continue
+        for table in iter_blocks(data, child[3], child[4]):
+            for string in iter_blocks(data, table[3], table[4]):
+                name, string_offset, string_size = string[0], string[1], string[2]
+                value = data[string_offset:string_offset + string_size]
+                value = value.decode("utf-16-le", errors="replace").split("\0", 1)[0]
+                # The first language table wins, as in Windows file properties
+                info.setdefault(name, value)
+    return info
+
+def format_fixed_version(most_significant, least_significant):
+    """Format a VS_FIXEDFILEINFO version pair as a dotted string"""
+    return "{}.{}.{}.{}".format(
+        most_significant >> 16, most_significant & 0xFFFF,
+        least_significant >> 16, least_significant & 0xFFFF
+    )
+
+def align4(offset):
+    """Round an offset up to the next DWORD boundary"""
+    return (offset + 3) & ~3
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from json_store import save_entries
+
+# Probe results that describe a transient failure and are never cached
+UNCACHEABLE_VERSIONS = ("Timeout", "Error")
+
+CACHE_FORMAT_VERSION = 1
+
+def file_fingerprint(path):
+    """Return (size, mtime_ns, inode) for a path, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+def spec_hash(program):
+    """Hash everything in a program entry that affects its probe result"""
+    spec = {
+        "install_path": program.get("install_path"),
+        "version_check": program.get("version_check"),
+    }
+    encoded = json.dumps(spec, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+def probed_paths(program):
+    """Return the paths whose fingerprints decide whether a cached result is still valid"""
+    paths = [program.get("install_path", "")]
+    version_check = program.get("version_check")
+    if isinstance(version_check, dict) and version_check.get("type") in ("exe_version", "file_content"):
+        paths.append(version_check.get("path", ""))
+    return paths
+
+class ProbeCache:
+    """On-disk cache of probe results keyed by program name.
+
+    An entry is valid while the program's version_check spec and the
+    (size, mtime, inode) fingerprints of its probed paths are unchanged.
+    cmd_output results additionally expire after a TTL, since the command's
+    output cannot be fingerprinted.
+    """
+
+    def __init__(self, path, cmd_output_ttl=3600, max_entries=2000, max_age_days=30):
+        self.path = path
+        self.cmd_output_ttl = cmd_output_ttl
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = {}
+        # Programs whose entry was stored, used or dropped since the last save
+        self.changed = set()
+        self.load()
+
+    def load(self):
+        """Load cache entries from disk, starting empty if the file is missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == CACHE_FORMAT_VERSION:
+                self.entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading probe cache {self.path}: {e}")
+
+    def lookup(self, program):
+        """Return the cached (installed, version) for a program, or None if missing or stale"""
+        name = program.get("name")
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry is None:
+            return None
+
+        if entry["spec"] != spec_hash(program):
+            return None
+        if entry["fingerprints"] != [file_fingerprint(p) for p in probed_paths(program)]:
+            return None
+
+        now = time.time()
+        version_check = program.get("version_check")
+        if (isinstance(version_check, dict) and version_check.get("type") == "cmd_output" and
+                now - entry["probed_at"] > self.cmd_output_ttl):
+            return None
+
+        with self.lock:
+            entry["used_at"] = now
+            self.changed.add(name)
+        return entry["installed"], entry["version"]
+
+    def store(self, program, installed, version):
+        """Remember a probe result together with the fingerprints it was taken against"""
+        if version in UNCACHEABLE_VERSIONS:
+            self.invalidate(program.get("name"))
+            return
+
+        now = time.time()
+        entry = {
+            "spec": spec_hash(program),
+            "fingerprints": [file_fingerprint(p) for p in probed_paths(program)],
+            "installed": installed,
+            "version": version,
+            "probed_at": now,
+            "used_at": now,
+        }
+        with self.lock:
+            self.entries[program.get("name")] = entry
+            self.changed.add(program.get("name"))
+
+    def invalidate(self, name):
+        """Drop the cached result for one program"""
+        with self.lock:
+            # Dropped from the file too, even if another process stored it
+            self.entries.pop(name, None)
+            self.changed.add(name)
+
+    def prune(self, entries):
+        """Drop entries unused for max_age_days, then the least recently used beyond max_entries, in place"""
+        cutoff = time.time() - self.max_age
+        keep = {name for name, e in entries.items() if e["used_at"] >= cutoff}
+        if len(keep) > self.max_entries:
+            keep = set(sorted(keep, key=lambda name: entries[name]["used_at"], reverse=True)[:self.max_entries])
+        for name in [name for name in entries if name not in keep]:
+            del entries[name]
+
+    def evict(self):
+        """Apply prune() to the entries in memory"""
+        with self.lock:
+            self.prune(self.entries)
+
+    def save(self):
+        """Write the cache to disk atomically if it changed, keeping entries other processes saved meanwhile"""
+        with self.save_lock:
+            self.evict()
+            with self.lock:
+                if not self.changed:
+                    return
+                entries, changed = dict(self.entries), self.changed
+                self.changed = set()
+
+            try:
+                save_entries(self.path, CACHE_FORMAT_VERSION, "entries", entries, changed, prune=self.prune)
+            except Exception as e:
+                print(f"Error saving probe cache {self.path}: {e}")
@@ -0,0 +1,260 @@
+import asyncio
+import codecs
+import locale
+import os
+import re
+import signal
+import subprocess
+import threading
+from concurrent.futures import Future
+
+# Maximum number of child processes the shared runner runs at the same time
+DEFAULT_MAX_PROCESSES = 16
+
+# Bytes read from a pipe per step
+READ_SIZE = 64 * 1024
+
+# Seconds to wait for the pipes to close after a process was killed
+KILL_GRACE = 5
+
+# Progress output often rewrites one line with "\r", so that also ends a line
+# Longer runs of output without a line break are passed on in pieces of this many characters
+MAX_LINE_CHARS = 64 * 1024
+
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+class ProcessResult:
+    """Outcome of a process run by ProcessRunner.
+
+    stdout and stderr hold the complete decoded output, or are empty if the
+    process was run with capture=False. returncode is None
+    if the process was killed after timing out or being cancelled, or was
+    cancelled before it started.
+    """
+
+    __slots__ = ("returncode", "stdout", "stderr", "timed_out", "cancelled")
+
+    def __init__(self, returncode, stdout="", stderr="", timed_out=False, cancelled=False):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+class ProcessJob:
+    """Handle of a process started by ProcessRunner.submit(); safe to use from any thread"""
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.future = Future()
+        self.cancel_requested = False
+        self.cancel_event = None
+
+    def cancel(self):
+        """Kill the process, or keep it from starting if it is still queued"""
+        self.cancel_requested = True
+        self.runner.loop.call_soon_threadsafe(self.wake)
+
+    def wake(self):
+        """Signal the cancellation to the running coroutine (called on the event loop)"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def result(self, timeout=None):
+        """Block until the process has finished and return its ProcessResult.
+
+        Errors starting the process (e.g. FileNotFoundError) are raised here.
+        """
+        return self.future.result(timeout)
+
+    def done(self):
+        """Return True once the process has finished"""
+        return self.future.done()
+
+    def add_done_callback(self, callback):
+        """Call callback(job) once the process has finished, on the runner's event loop thread"""
+        self.future.add_done_callback(lambda future: callback(self))
+
+class ProcessRunner:
+    """Run child processes on one asyncio event loop in a background thread.
+
+    Waiting for a process costs no thread of its own, so hundreds of probes
+    can be outstanding at once; at most max_processes run at the same time.
+    stdout and stderr are read as the process writes them and passed line
+    by line to an optional on_line(stream, line) callback, which runs on
+    the event loop thread and must not block. With capture=False the output
+    is only passed to on_line and not kept, so a process can print any
+    amount without growing memory use.
+
+    The event loop is also the watchdog: when a timeout fires or a job is
+    cancelled, the whole process tree is killed, not only the direct child,
+    so the installers a setup program starts do not outlive it.
+    """
+
+    def __init__(self, max_processes=DEFAULT_MAX_PROCESSES):
+        self.max_processes = max(1, int(max_processes))
+        self.semaphore = None
+        self.encoding = locale.getpreferredencoding(False)
+        # Before Python 3.8 the default event loop on Windows cannot start subprocesses
+        self.loop = asyncio.ProactorEventLoop() if os.name == "nt" else asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="process-runner")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, args, on_line=None, input=None, timeout=None, shell=False, capture=True):
+        """Start a process in the background and return its ProcessJob.
+
+        args is a list of arguments, or a command line with shell=True.
+        input is text written to stdin, and timeout the number of seconds
+        after which the process is killed.
+        """
+        job = ProcessJob(self)
+        asyncio.run_coroutine_threadsafe(
+            self.execute(job, args, on_line, input, timeout, shell, capture), self.loop)
+        return job
+
+    def run(self, args, on_line=None, input=None, timeout=None, shell=False, capture=True):
+        """Run a process and block until it has finished; returns its ProcessResult"""
+        return self.submit(args, on_line, input, timeout, shell, capture).result()
+
+    async def execute(self, job, args, on_line, input, timeout, shell, capture):
+        """Run a job and resolve its future"""
+        try:
+            result = await self.run_process(job, args, on_line, input, timeout, shell, capture)
+        except BaseException as e:
+            job.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            job.future.set_result(result)
+
+    async def run_process(self, job, args, on_line, input, timeout, shell, capture):
+        """Start a process, stream its output and wait for it, a timeout or a cancellation"""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_processes)
+        job.cancel_event = asyncio.Event()
+        if job.cancel_requested:
+            job.cancel_event.set()
+
+        async with self.semaphore:
+            if job.cancel_event.is_set():
+                return ProcessResult(None, cancelled=True)
+
+            options = {
+                "stdin": subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                "stdout": subprocess.PIPE,
+                "stderr": subprocess.PIPE,
+            }
+            if os.name != "nt":
+                # A process group of its own, so its children can be killed with it
+                options["start_new_session"] = True
+            if shell:
+                process = await asyncio.create_subprocess_shell(args, **options)
+            else:
+                process = await asyncio.create_subprocess_exec(*args, **options)
+
+            stdout, stderr = ([], []) if capture else (None, None)
+            finished = asyncio.ensure_future(asyncio.gather(
+                self.read_lines(process.stdout, "stdout", stdout, on_line),
+                self.read_lines(process.stderr, "stderr", stderr, on_line),
+                self.write_input(process, input),
+                process.wait()
+            ))
+            cancelled = asyncio.ensure_future(job.cancel_event.wait())
+            done, pending = await asyncio.wait(
+                (finished, cancelled), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            cancelled.cancel()
+
+            killed = finished not in done
+            if killed:
+                await kill_tree(process)
+                # Children that inherited the pipes can keep them open after the kill
+                try:
+                    await asyncio.wait_for(asyncio.shield(finished), KILL_GRACE)
+                except asyncio.TimeoutError:
+                    finished.cancel()
+            else:
+                finished.result()
+
+            return ProcessResult(
+                None if killed else process.returncode,
+                "".join(stdout or ()),
+                "".join(stderr or ()),
+                timed_out=killed and not job.cancel_event.is_set(),
+                cancelled=killed and job.cancel_event.is_set()
+            )
+
+    async def read_lines(self, stream, name, chunks, on_line):
+        """Collect a pipe's output (unless chunks is None), passing each complete line to on_line as it arrives"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        carry = ""
+        while True:
+            data = await stream.read(READ_SIZE)
+            text = decoder.decode(data, final=not data)
+            if chunks is not None:
+                chunks.append(text)
+            if on_line:
+                lines = LINE_BREAK.split(carry + text)
+                carry = lines.pop()
+                if not data and carry:
+                    lines.append(carry)
+                    carry = ""
+                while len(carry) > MAX_LINE_CHARS:
+                    lines.append(carry[:MAX_LINE_CHARS])
+                    carry = carry[MAX_LINE_CHARS:]
+                for line in lines:
+                    if line.strip():
+                        try:
+                            on_line(name, line)
+                        except Exception as e:
+                            print(f"Error handling process output: {str(e)}")
+            if not data:
+                return
+
+    async def write_input(self, process, input):
+        """Write text to a process's stdin and close it"""
+        if input is None:
+            return
+        try:
+            process.stdin.write(input.encode(self.encoding))
+            await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def shutdown(self):
+        """Stop the event loop; processes still running are left alone"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+async def kill_tree(process):
+    """Kill a process and every process it started"""
+    if os.name == "nt":
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/T", "/F", "/PID", str(process.pid),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            await killer.wait()
+        except OSError as e:
+            print(f"Error killing process tree {process.pid}: {str(e)}")
+    else:
+        try:
+            # process.kill() would reap the killed process before asyncio's child watcher sees it
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+default_runner = None
+default_runner_lock = threading.Lock()
+
+def get_runner():
+    """Return the shared ProcessRunner, starting it on first use"""
+    global default_runner
+    with default_runner_lock:
+        if default_runner is None:
+            default_runner = ProcessRunner()
+        return default_runner
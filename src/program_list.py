@@ -0,0 +1,267 @@
+import customtkinter as ctk
+
+from program_state import CHECKING
+
+# Status label colors; other statuses use the theme's text color
+STATUS_COLORS = {
+    "Installed": "green",
+    "Update Available": "orange",
+    "Newer Installed": "yellow",
+    "Not Installed": "red",
+    "Damaged": "red",
+    "Cancelled": "orange",
+    "Error": "red",
+}
+
+def describe_version(state):
+    """Return the version line shown for a program's state"""
+    new_version = state.new_version
+    new_known = new_version != "Unknown" and new_version != "N/A"
+    if state.installed is None or state.status == CHECKING:
+        return "Checking..."
+    if state.current_version == "Damaged":
+        return f"Damaged: {state.detail or 'files changed'}"
+    if not state.installed:
+        return f"New: {new_version}" if new_known else "Not Installed"
+    if state.current_version == "Timeout":
+        return "Version: check timed out"
+    if state.current_version == "Unknown" or state.current_version == "Error":
+        return "Version: Unknown"
+    if state.status == "Newer Installed":
+        # An older catalog version is flagged, never installed by Update All
+        return f"Current: {state.current_version} → Catalog: {new_version} (older)"
+    if new_known:
+        return f"Current: {state.current_version} → New: {new_version}"
+    return f"Current: {state.current_version}"
+
+def describe_button(state):
+    """Return (text, state) of a program's update button"""
+    if not state.busy:
+        return "Update", "normal"
+    if state.cancelled:
+        return "Cancelling...", "disabled"
+    return "Cancel", "normal"
+
+class ProgramRow:
+    """Widgets for one visible row of the program list, re-bound to different programs while scrolling"""
+
+    def __init__(self, master, on_update, on_wheel):
+        self.item = None
+        self.rendered = None
+
+        # Frame for each program
+        self.frame = ctk.CTkFrame(master)
+
+        # Program name
+        self.name_label = ctk.CTkLabel(self.frame, text="", font=ctk.CTkFont(size=16, weight="bold"))
+        self.name_label.grid(row=0, column=0, padx=10, pady=10, sticky="w")
+
+        # Installation path (smaller font)
+        self.path_label = ctk.CTkLabel(self.frame, text="", font=ctk.CTkFont(size=12))
+        self.path_label.grid(row=1, column=0, padx=10, pady=(0, 5), sticky="w")
+
+        # Version information
+        self.version_label = ctk.CTkLabel(self.frame, text="", font=ctk.CTkFont(size=12))
+        self.version_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="w")
+
+        # Status label
+        self.status_label = ctk.CTkLabel(self.frame, text="", font=ctk.CTkFont(size=12))
+        self.status_label.grid(row=0, column=1, padx=10, pady=10)
+        self.default_text_color = self.status_label.cget("text_color")
+
+        # Update button
+        self.update_btn = ctk.CTkButton(
+            self.frame,
+            text="Update",
+            command=lambda: self.item is not None and on_update(self.item),
+            width=80
+        )
+        self.update_btn.grid(row=0, column=2, padx=10, pady=10)
+
+        # Progress bar (hidden by default)
+        self.progress_bar = ctk.CTkProgressBar(self.frame)
+        self.progress_bar.set(0)
+        self.progress_bar.grid(row=3, column=0, columnspan=3, padx=10, pady=(0, 10), sticky="ew")
+        self.progress_bar.grid_remove()  # Hide initially, keeping the grid options
+
+        # Scrolling over any part of the row scrolls the list
+        for widget in (self.frame, self.name_label, self.path_label, self.version_label, self.status_label):
+            bind_mouse_wheel(widget, on_wheel)
+
+    def show(self, item):
+        """Render a ProgramState into this row, touching only widgets whose content changed"""
+        self.item = item
+        program = item.program
+        state = (
+            program["name"], program["install_path"], describe_version(item), item.status,
+            STATUS_COLORS.get(item.status)
+        ) + describe_button(item) + (item.progress is not None, item.progress or 0)
+        previous = self.rendered or (None,) * len(state)
+        self.rendered = state
+
+        if state[0] != previous[0]:
+            self.name_label.configure(text=state[0])
+        if state[1] != previous[1]:
+            self.path_label.configure(text=state[1])
+        if state[2] != previous[2]:
+            self.version_label.configure(text=state[2])
+        if state[3:5] != previous[3:5]:
+            self.status_label.configure(text=state[3], text_color=state[4] or self.default_text_color)
+        if state[5:7] != previous[5:7]:
+            self.update_btn.configure(text=state[5], state=state[6])
+        if state[7] != previous[7]:
+            if state[7]:
+                self.progress_bar.grid()
+            else:
+                self.progress_bar.grid_remove()
+        if state[8] != previous[8]:
+            self.progress_bar.set(state[8])
+
+def bind_mouse_wheel(widget, callback):
+    """Bind mouse wheel scrolling on Windows/macOS (<MouseWheel>) and X11 (<Button-4/5>)"""
+    # CustomTkinter widgets require add="+" to keep their internal bindings
+    widget.bind("<MouseWheel>", lambda event: callback(-1 if event.delta > 0 else 1), add="+")
+    widget.bind("<Button-4>", lambda event: callback(-1), add="+")
+    widget.bind("<Button-5>", lambda event: callback(1), add="+")
+
+class VirtualProgramList(ctk.CTkFrame):
+    """Scrollable program list that only creates widgets for the rows that fit on screen.
+
+    Items are ProgramState records; their display text is derived when a
+    row is drawn. A small pool of ProgramRow widgets is re-bound to
+    whichever items are scrolled into view, so widget count and build time
+    do not grow with the catalog.
+    A filter box narrows the list by program name or status.
+    """
+
+    def __init__(self, master, on_update, height=300, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_update = on_update
+        self.items = []
+        self.visible = []
+        self.first = 0
+        self.rows = []
+        self.row_height = None
+        self.measure_pending = False
+        self.filter_text = ""
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # Filter box
+        self.filter_entry = ctk.CTkEntry(self, placeholder_text="Filter by name or status...")
+        self.filter_entry.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="ew")
+        self.filter_entry.bind("<KeyRelease>", lambda event: self.set_filter(self.filter_entry.get()), add="+")
+
+        # Rows are packed into a fixed-size body; only the ones in view exist
+        self.body = ctk.CTkFrame(self, fg_color="transparent", height=height)
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.body.pack_propagate(False)
+        self.body.bind("<Configure>", lambda event: self.render(), add="+")
+        bind_mouse_wheel(self.body, self.scroll_rows)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+    def set_items(self, items):
+        """Replace the list contents"""
+        self.items = list(items)
+        self.apply_filter()
+
+    def set_filter(self, text):
+        """Show only items whose name or status contains text (case-insensitive)"""
+        text = text.strip().lower()
+        if text != self.filter_text:
+            self.filter_text = text
+            self.first = 0
+            self.apply_filter()
+
+    def apply_filter(self):
+        """Recompute which items are shown and redraw"""
+        text = self.filter_text
+        if text:
+            self.visible = [
+                item for item in self.items
+                if text in item.name.lower() or text in item.status.lower()
+            ]
+        else:
+            self.visible = list(self.items)
+        self.render()
+
+    def refresh_items(self, items):
+        """Redraw the rows in view whose items changed"""
+        if self.filter_text:
+            # A status change can move an item in or out of the filter
+            self.apply_filter()
+            return
+        changed = {id(item) for item in items}
+        for row in self.rows:
+            if row.item is not None and id(row.item) in changed:
+                row.show(row.item)
+
+    def page_size(self):
+        """Number of rows that fit in the body"""
+        height = self.body.winfo_height()
+        if self.row_height is None or height <= 1:
+            return 1 if self.row_height is None else max(1, len(self.rows))
+        return max(1, height // self.row_height + 1)
+
+    def render(self):
+        """Bind the pooled rows to the items currently in view"""
+        needed = min(self.page_size(), len(self.visible))
+        self.first = max(0, min(self.first, len(self.visible) - needed))
+
+        while len(self.rows) < needed:
+            self.rows.append(ProgramRow(self.body, self.on_update, self.scroll_rows))
+
+        for k, row in enumerate(self.rows):
+            index = self.first + k
+            if k < needed and index < len(self.visible):
+                row.show(self.visible[index])
+                if not row.frame.winfo_manager():
+                    row.frame.pack(fill="x", padx=10, pady=5)
+            elif row.frame.winfo_manager():
+                row.frame.pack_forget()
+                row.item = None
+
+        # Measure a row once it has been laid out so the pool can be sized to the body
+        if self.row_height is None and self.rows and not self.measure_pending:
+            self.measure_pending = True
+            self.after_idle(self.measure_row)
+
+        self.update_scrollbar()
+
+    def measure_row(self):
+        """Record the height of a row (plus its padding) and fill the body with rows"""
+        self.measure_pending = False
+        height = self.rows[0].frame.winfo_reqheight()
+        if height > 1:
+            self.row_height = height + 10
+            self.render()
+
+    def update_scrollbar(self):
+        """Sync the scrollbar with the first shown row and the page size"""
+        total = len(self.visible)
+        if not total:
+            self.scrollbar.set(0, 1)
+            return
+        shown = max(1, self.page_size() - 1)
+        self.scrollbar.set(self.first / total, min(1.0, (self.first + shown) / total))
+
+    def scroll_rows(self, count):
+        """Scroll by a number of rows (negative scrolls up)"""
+        first = max(0, min(self.first + count, len(self.visible) - 1))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def on_scrollbar(self, *args):
+        """Handle scrollbar drags ("moveto") and clicks ("scroll")"""
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.visible))
+            self.render()
+        elif args[0] == "scroll":
+            count = int(args[1])
+            if args[2] == "pages":
+                count *= max(1, self.page_size() - 1)
+            self.scroll_rows(count)
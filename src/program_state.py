@@ -0,0 +1,154 @@
+import threading
+
+from version_probe import NEEDS_UPDATE, get_install_status
+
+# Status of a program whose probe has not landed yet
+CHECKING = "Checking..."
+
+class ProgramState:
+    """Probe and update state of one program, independent of how it is shown.
+
+    installed and current_version are None until the program is probed.
+    progress is the fraction of a running update, or None when no update
+    bar is shown. busy is set while an update is pending or running, and
+    job holds its installer process so it can be cancelled.
+    """
+
+    __slots__ = ("program", "installed", "current_version", "status", "detail", "progress", "busy", "cancelled",
+                 "job", "message")
+
+    def __init__(self, program):
+        self.program = program
+        self.installed = None
+        self.current_version = None
+        self.status = CHECKING
+        # Damage report or similar explanation of the status
+        self.detail = None
+        self.progress = None
+        self.busy = False
+        self.cancelled = False
+        self.job = None
+        # Result message of the last update
+        self.message = None
+
+    @property
+    def name(self):
+        return self.program["name"]
+
+    @property
+    def new_version(self):
+        return self.program.get("new_version", "Unknown")
+
+    def as_dict(self):
+        """Return the probe result as a JSON-serializable dict (CLI and reports)"""
+        return {
+            "name": self.name,
+            "installed": self.installed,
+            "current_version": self.current_version,
+            "new_version": self.new_version,
+            "status": self.status,
+        }
+
+class ProgramStore:
+    """Program states in catalog order, indexed by program name.
+
+    Changes are made through update() or apply_probe() from any thread and
+    collected until flush(), which passes every changed state to the
+    subscribers in one batch: a view redraws once per batch, however many
+    probe results or progress steps landed in between.
+    """
+
+    def __init__(self, programs=()):
+        self.lock = threading.Lock()
+        self.states = {}
+        # Changed entries of programs whose update was running when the catalog was replaced
+        self.deferred = {}
+        self.changed = {}
+        self.reset = False
+        self.subscribers = []
+        self.set_programs(programs)
+
+    def __len__(self):
+        return len(self.states)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.states.values()))
+
+    def get(self, name):
+        """Return the state of a program, or None"""
+        return self.states.get(name)
+
+    def set_programs(self, programs):
+        """Replace the catalog; programs whose entry is unchanged keep their state.
+
+        A program whose update is pending or running keeps its state, and
+        with it the running update, until finish_update(). Returns the
+        states of added or changed programs, which need probing.
+        """
+        fresh = []
+        with self.lock:
+            states = {}
+            deferred = {}
+            for program in programs:
+                state = self.states.get(program["name"])
+                if state is not None and state.busy and state.program != program:
+                    deferred[program["name"]] = program
+                elif state is None or state.program != program:
+                    state = ProgramState(program)
+                    fresh.append(state)
+                states[program["name"]] = state
+            self.states = states
+            self.deferred = deferred
+            self.changed.clear()
+            self.reset = True
+        return fresh
+
+    def update(self, state, **changes):
+        """Change fields of a state and queue it for the next flush()"""
+        with self.lock:
+            for field, value in changes.items():
+                setattr(state, field, value)
+            self.changed[id(state)] = state
+
+    def finish_update(self, state, **changes):
+        """Mark a program's update as done, applying changes like update().
+
+        If the program's catalog entry changed while its update ran, its
+        state is replaced now and the new state, which needs probing, is
+        returned; otherwise None.
+        """
+        self.update(state, busy=False, cancelled=False, job=None, progress=None, **changes)
+        with self.lock:
+            program = self.deferred.pop(state.name, None)
+            if program is None or self.states.get(state.name) is not state:
+                return None
+            fresh = ProgramState(program)
+            self.states[state.name] = fresh
+            self.reset = True
+        return fresh
+
+    def apply_probe(self, state, installed, current_version, detail=None):
+        """Record a probe result and classify it; returns the new status"""
+        status = get_install_status(state.program, installed, current_version)
+        self.update(state, installed=installed, current_version=current_version, status=status, detail=detail)
+        return status
+
+    def needing_update(self):
+        """Return the states that Update All would install, in catalog order"""
+        return [state for state in self if state.status in NEEDS_UPDATE and not state.busy]
+
+    def subscribe(self, callback):
+        """Call callback(states, reset) on every flush() with changes; reset means the catalog was replaced"""
+        self.subscribers.append(callback)
+
+    def flush(self):
+        """Deliver the changes queued since the last flush() to the subscribers"""
+        with self.lock:
+            changed = list(self.changed.values())
+            reset = self.reset
+            self.changed.clear()
+            self.reset = False
+        if changed or reset:
+            for callback in self.subscribers:
+                callback(changed, reset)
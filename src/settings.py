@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+
+# Default application settings, overridden by an optional settings.json
+DEFAULT_SETTINGS = {
+    # Maximum number of version probes running at the same time
+    "probe_workers": 8,
+    # Directory (relative to the current directory) for caches and other app data
+    "data_dir": ".dfir_updater",
+    # Seconds a cached cmd_output probe result stays valid
+    "cmd_output_ttl": 3600,
+    # Probe cache eviction: entry limit and days before an unused entry is dropped
+    "probe_cache_max_entries": 2000,
+    "probe_cache_max_age_days": 30,
+    # Maximum number of child processes (probe commands, installers) running at the same time
+    "max_processes": 16,
+    # Seconds an installer or cmd_output version check may run without a per-program "timeout" or
+    # history, the longest adaptive timeouts, and the multiple of the longest recent run used as the
+    # adaptive timeout (0 always uses the defaults)
+    "install_timeout": 300,
+    "install_timeout_max": 7200,
+    "probe_timeout": 30,
+    "probe_timeout_max": 300,
+    "adaptive_timeout_factor": 3,
+    # Maximum number of installers Update All runs at the same time
+    "install_workers": 4,
+    # Per-resource-class install limits (classes not listed only share install_workers)
+    "install_class_limits": {"msi": 1},
+    # Number of threads extracting members of a zip installer in parallel
+    "extract_workers": 4,
+    # Number of installers hashed in parallel before Update All starts
+    "verify_workers": 4,
+    # Local cache of installers copied from slow media (0 disables staging, the default,
+    # since only the installer file is copied and not files next to it)
+    "staging_cache_max_mb": 0,
+    # Installers copied in parallel, and how many may be staged ahead of the running installs
+    "staging_workers": 2,
+    "staging_lookahead": 4,
+    # Installer output: lines kept in memory (and shown in the log) per install, and
+    # per-run directories of full output logs in the data directory
+    "output_lines": 200,
+    "output_log_dir": "install_logs",
+    "output_log_keep_runs": 20,
+    # Rotating log file in the data directory
+    "log_file": "updater.log",
+    "log_max_bytes": 1024 * 1024,
+    "log_backup_count": 5,
+    # Lines kept in the log textbox and how often queued messages are shown
+    "log_max_lines": 1000,
+    "log_drain_interval_ms": 100,
+    # How often programs.json is checked for edits (0 disables reloading)
+    "config_poll_interval_ms": 2000,
+    # Per-run timing traces (JSON lines + summary) in the data directory
+    "trace_enabled": True,
+    "trace_dir": "traces",
+    "trace_keep_runs": 20,
+    # History of probe and install durations (SQLite) for Update All plans, and runs kept per program
+    "timing_history": True,
+    "timing_history_keep": 20,
+    # Optional Prometheus textfile collector output, e.g. "C:\\metrics\\dfir_updater.prom"
+    "metrics_textfile": None,
+    # Record a cProfile of the probe calls with each trace
+    "profile": False,
+}
+
+def get_resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+def load_settings():
+    """Load settings.json from the current directory or resources, falling back to defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+
+    # Prefer settings.json next to programs.json in the current directory
+    for path in (os.path.join(os.getcwd(), "settings.json"), get_resource_path("settings.json")):
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r") as f:
+                user_settings = json.load(f)
+            if isinstance(user_settings, dict):
+                settings.update(user_settings)
+        except Exception as e:
+            print(f"Error loading settings from {path}: {e}")
+        break
+
+    return settings
+
+def get_data_path(settings, name):
+    """Return the path of a file in the app data directory, creating the directory if needed"""
+    data_dir = os.path.join(os.getcwd(), settings["data_dir"])
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, name)
@@ -0,0 +1,348 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import span
+from integrity import CHUNK_SIZE, verify_installer
+from json_store import save_entries
+
+STAGING_INDEX_FORMAT_VERSION = 2
+
+def cache_key(sha256, installer_path):
+    """Return the cache key of an installer: "<sha256>/<original file name>".
+
+    The file name is kept because PowerShell picks the handler of .msi and
+    .exe installers by it, and some installers check their own name.
+    """
+    return f"{sha256}/{os.path.basename(installer_path)}"
+
+def copy_and_hash(source, f):
+    """Copy source into the open binary file f and return the SHA-256 of the copied bytes.
+
+    The source is read once, so on slow media staging costs no more than
+    verifying the installer in place.
+    """
+    digest = hashlib.sha256()
+    with open(source, "rb") as src:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+class InstallerCache:
+    """Content-addressed local copies of installers, evicted least recently used first.
+
+    Copies are stored as <dir>/<sha256[:2]>/<sha256>/<file name>, so an
+    installer keeps its name and the same installer is stored once however
+    many paths refer to it. Only the installer file itself is copied, not
+    files next to it. A copy is only trusted
+    while its size and mtime match the index. Copies handed out by lookup()
+    or add() are pinned until release(), so eviction never removes an
+    installer that is about to run; while many are pinned the cache may
+    briefly exceed max_bytes. The index is merged with the copy on disk when
+    saved, so the GUI and the CLI sharing one cache see each other's copies.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.entries = {}
+        self.pins = {}
+        # Keys added, used or removed since the last save
+        self.changed = set()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load()
+
+    def load(self):
+        """Load the index, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            if data.get("format") == STAGING_INDEX_FORMAT_VERSION:
+                self.entries = data.get("entries", {})
+            elif data.get("format") == 1:
+                # Copies of format 1 were stored as <sha256[:2]>/<sha256><extension>
+                for key in data.get("entries", {}):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, key[:2], key))
+                    except OSError:
+                        pass
+                    self.changed.add(key)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading installer cache {self.index_path}: {e}")
+
+    def path_of(self, key):
+        """Return the path of a cached copy"""
+        return os.path.join(self.cache_dir, key[:2], *key.split("/"))
+
+    def lookup(self, key):
+        """Return the path of a cached copy (pinned until release()), or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        path = self.path_of(key)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        with self.lock:
+            if st is None or st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+                # Deleted or modified outside the cache; it can no longer be trusted
+                self.entries.pop(key, None)
+                self.changed.add(key)
+                stale = st is not None
+            else:
+                entry["used"] = time.time()
+                self.pins[key] = self.pins.get(key, 0) + 1
+                self.changed.add(key)
+                return path
+        if stale:
+            self.remove(key)
+        return None
+
+    def temp_file(self):
+        """Return (file object, path) of a new temporary file inside the cache directory"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def add(self, key, tmp_path):
+        """Move a fully written, verified temporary file into the cache and return its (pinned) path"""
+        path = self.path_of(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        st = os.stat(path)
+        with self.lock:
+            self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "used": time.time()}
+            self.pins[key] = self.pins.get(key, 0) + 1
+            self.changed.add(key)
+        self.evict()
+        return path
+
+    def release(self, path):
+        """Unpin a copy returned by lookup() or add(); other paths are ignored"""
+        key = f"{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}"
+        if path != self.path_of(key):
+            return
+        with self.lock:
+            count = self.pins.get(key, 0) - 1
+            if count > 0:
+                self.pins[key] = count
+            else:
+                self.pins.pop(key, None)
+
+    def prune(self, entries):
+        """Remove the least recently used unpinned copies of entries, in place, until they fit max_bytes.
+
+        Called with the lock held. A copy that cannot be deleted (e.g. an
+        installer another process is running) stays in the index.
+        """
+        total = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["used"]):
+            if total <= self.max_bytes:
+                break
+            if self.pins.get(key) or not self.remove(key):
+                continue
+            total -= entries.pop(key)["size"]
+
+    def evict(self):
+        """Apply prune() to the copies known to this process"""
+        with self.lock:
+            before = set(self.entries)
+            self.prune(self.entries)
+            self.changed.update(before - set(self.entries))
+
+    def remove(self, key):
+        """Delete a cached copy, and its hash directory, from disk; returns False if the copy is still there"""
+        path = self.path_of(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+        return True
+
+    def save(self):
+        """Write the index to disk atomically if it changed, keeping copies other processes added meanwhile.
+
+        The merged index is evicted down to max_bytes as a whole, so copies
+        staged by another process count towards the size cap.
+        """
+        with self.save_lock:
+            with self.lock:
+                if not self.changed:
+                    return
+                entries, changed = dict(self.entries), self.changed
+                self.changed = set()
+
+            def prune(merged):
+                with self.lock:
+                    self.prune(merged)
+
+            try:
+                merged = save_entries(
+                    self.index_path, STAGING_INDEX_FORMAT_VERSION, "entries", entries, changed, prune=prune)
+            except Exception as e:
+                print(f"Error saving installer cache {self.index_path}: {e}")
+                return
+            with self.lock:
+                # Adopt the other processes' copies and evictions, except for keys changed here since
+                for key in set(self.entries) - set(merged) - self.changed:
+                    del self.entries[key]
+                for key, entry in merged.items():
+                    if key not in self.changed:
+                        self.entries[key] = entry
+
+def stage_installer(program, cache, manifest=None, tracer=None):
+    """Verify a program's installer and return a local copy of it.
+
+    If the installer's content is already known, from its "sha256" or from
+    the hash manifest entry of the unchanged source file, a cached copy is
+    used without reading the source at all. Otherwise the installer is
+    copied into the cache and hashed in the same pass. Installers larger
+    than the whole cache, and programs with "stage": false (installers that
+    need files next to them), are verified and run in place.
+
+    Returns (status, message, installer_path) with the statuses of
+    verify_installer(); installer_path is None if the installer must not
+    run. Pass the path to cache.release() once the install is done.
+    """
+    source = program["installer_path"]
+    expected = program.get("sha256", "").strip().lower()
+    verified = ("OK", "Installer hash verified") if expected else ("No Hash", "No sha256 configured")
+
+    with span(tracer, "stage", program["name"]) as attrs:
+        known = manifest.peek(source) if manifest else None
+        if expected and known and known != expected:
+            attrs["hit"] = False
+            return "Mismatch", f"Installer hash mismatch: expected {expected}, got {known}", None
+
+        for sha256 in dict.fromkeys(filter(None, (expected, known))):
+            path = cache.lookup(cache_key(sha256, source))
+            if path:
+                attrs["hit"] = True
+                return verified + (path,)
+        attrs["hit"] = False
+
+        try:
+            st = os.stat(source)
+        except OSError:
+            return "Missing", f"Installer not found: {source}", None
+        if st.st_size > cache.max_bytes or program.get("stage") is False:
+            status, message = verify_installer(program, manifest)
+            return status, message, source
+
+        tmp_path = None
+        try:
+            f, tmp_path = cache.temp_file()
+            with f:
+                sha256 = copy_and_hash(source, f)
+            attrs["bytes"] = st.st_size
+            if manifest and os.stat(source).st_mtime_ns == st.st_mtime_ns:
+                manifest.remember(source, st, sha256)
+            if expected and sha256 != expected:
+                return "Mismatch", f"Installer hash mismatch: expected {expected}, got {sha256}", None
+            path = cache.add(cache_key(sha256, source), tmp_path)
+            tmp_path = None
+            return verified + (path,)
+        except Exception as e:
+            return "Error", f"Could not stage installer: {str(e)}", None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+class InstallerStager:
+    """Stage the installers of an update run ahead of the installs that need them.
+
+    Installers are staged in the given order on a small worker pool, at most
+    lookahead installers ahead of the installs taking them, so copying the
+    next installers off slow media overlaps with the installs already
+    running. An install whose installer has not been queued yet (e.g.
+    because dependencies reordered the run) stages it itself.
+    """
+
+    def __init__(self, cache, manifest=None, workers=2, lookahead=4, tracer=None):
+        self.cache = cache
+        self.manifest = manifest
+        self.lookahead = max(1, int(lookahead))
+        self.tracer = tracer
+        self.lock = threading.Lock()
+        self.queue = []
+        self.futures = {}
+        self.taken = 0
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="stage")
+
+    def start(self, programs):
+        """Queue the installers of programs, in install order"""
+        with self.lock:
+            self.queue.extend(programs)
+            self.fill()
+
+    def fill(self):
+        """Submit queued installers while fewer than lookahead are waiting (called with the lock held)"""
+        while self.queue and len(self.futures) - self.taken < self.lookahead:
+            program = self.queue.pop(0)
+            if program["name"] not in self.futures:
+                self.futures[program["name"]] = self.executor.submit(
+                    stage_installer, program, self.cache, self.manifest, self.tracer)
+
+    def claim(self, program):
+        """Return the staging future of a program, or None if it was never submitted"""
+        with self.lock:
+            future = self.futures.get(program["name"])
+            if future is None:
+                self.queue = [queued for queued in self.queue if queued["name"] != program["name"]]
+                self.futures[program["name"]] = None
+            self.taken += 1
+            self.fill()
+        return future
+
+    def get(self, program):
+        """Return (status, message, installer_path) for a program, waiting for its staging if needed"""
+        future = self.claim(program)
+        if future is None:
+            return stage_installer(program, self.cache, self.manifest, self.tracer)
+        return future.result()
+
+    def skip(self, program):
+        """Drop a program that will not be installed, unpinning its installer once staged"""
+        future = self.claim(program)
+        if future is not None:
+            future.add_done_callback(self.release_staged)
+
+    def release_staged(self, future):
+        """Unpin the installer of a skipped program once its staging is done (a future's done callback)"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.release(future.result()[2])
+
+    def release(self, installer_path):
+        """Unpin an installer returned by get() once its install is done"""
+        if installer_path:
+            self.cache.release(installer_path)
+
+    def close(self):
+        """Stop the workers, evict down to the size cap and save the indexes"""
+        self.executor.shutdown(wait=True)
+        self.cache.evict()
+        self.cache.save()
+        if self.manifest:
+            self.manifest.save()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+# Phases with timeouts: running an installer, and running a cmd_output version check
+TIMEOUT_PHASES = ("install", "probe")
+
+# Adaptive timeouts never go below these, so a program that was always quick still gets some slack
+MIN_TIMEOUTS = {"install": 60, "probe": 5}
+
+# Seconds a snapshot of the timing history is reused before it is read again
+SNAPSHOT_TTL = 60
+
+def get_configured_timeout(program, phase):
+    """Return a program's "timeout" for a phase in seconds, or None if it has none.
+
+    "timeout" is either a number (the install timeout) or an object with
+    "install" and/or "probe" seconds.
+    """
+    timeout = program.get("timeout")
+    if isinstance(timeout, dict):
+        return timeout.get(phase)
+    return timeout if phase == "install" else None
+
+class TimeoutPolicy:
+    """Decide how long an install or probe may run before its process tree is killed.
+
+    A program's configured "timeout" always wins. Otherwise, with a timing
+    history, the timeout is factor times the longest recent run of the
+    program (with the same installer if known), kept between MIN_TIMEOUTS
+    and the phase's maximum. Programs without history get the phase's
+    default. The history is read once per SNAPSHOT_TTL, not per program.
+    """
+
+    def __init__(self, history=None, defaults=None, maximums=None, factor=3):
+        self.history = history
+        self.defaults = dict({"install": 300, "probe": 30}, **(defaults or {}))
+        self.maximums = dict({"install": 7200, "probe": 300}, **(maximums or {}))
+        self.factor = factor
+        self.lock = threading.Lock()
+        self.snapshots = {}
+
+    def get(self, program, phase, installer_hash=None):
+        """Return the timeout in seconds of a program's install or probe"""
+        configured = get_configured_timeout(program, phase)
+        if configured:
+            return configured
+
+        longest = self.longest(phase)
+        seconds = longest.get((program["name"], installer_hash or ""))
+        if seconds is None:
+            seconds = max((value for (name, _), value in longest.items() if name == program["name"]), default=None)
+        if seconds is None:
+            return self.defaults[phase]
+        return min(max(seconds * self.factor, MIN_TIMEOUTS[phase]), self.maximums[phase])
+
+    def longest(self, phase):
+        """Return the (possibly cached) longest recent durations of a phase"""
+        if not self.history or self.factor <= 0:
+            return {}
+        with self.lock:
+            loaded, durations = self.snapshots.get(phase, (None, None))
+            if loaded is None or time.monotonic() - loaded > SNAPSHOT_TTL:
+                try:
+                    durations = self.history.longest(phase)
+                except Exception as e:
+                    print(f"Error reading timing history for timeouts: {str(e)}")
+                    durations = {}
+                self.snapshots[phase] = (time.monotonic(), durations)
+            return durations
+
+def create_timeout_policy(settings, history=None):
+    """Return the TimeoutPolicy configured in settings"""
+    return TimeoutPolicy(
+        history,
+        defaults={"install": settings["install_timeout"], "probe": settings["probe_timeout"]},
+        maximums={"install": settings["install_timeout_max"], "probe": settings["probe_timeout_max"]},
+        factor=settings["adaptive_timeout_factor"]
+    )
@@ -0,0 +1,167 @@
+import contextlib
+import os
+import re
+import sqlite3
+import statistics
+import time
+
+from settings import get_data_path
+
+# Phases whose durations are kept, from the spans of a run's tracer
+RECORDED_PHASES = ("probe", "stage", "install")
+
+# Durations used for a prediction: the median of the most recent runs
+PREDICTION_SAMPLES = 5
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS durations (
+        program TEXT NOT NULL,
+        phase TEXT NOT NULL,
+        installer_hash TEXT NOT NULL DEFAULT '',
+        duration REAL NOT NULL,
+        success INTEGER NOT NULL DEFAULT 1,
+        timed_out INTEGER NOT NULL DEFAULT 0,
+        recorded REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS durations_lookup ON durations (program, phase, installer_hash, recorded)",
+)
+
+# Columns (name, definition) added since the first version of the schema, by schema version (PRAGMA user_version)
+MIGRATIONS = {
+    1: ("timed_out", "INTEGER NOT NULL DEFAULT 0"),
+}
+SCHEMA_VERSION = 1
+
+def staged_hash(installer_path):
+    """Return the SHA-256 in the directory name of a staged installer copy, or None for other paths"""
+    match = re.fullmatch(r"[0-9a-f]{64}", os.path.basename(os.path.dirname(installer_path or "")))
+    return match.group(0) if match else None
+
+class TimingHistory:
+    """SQLite history of probe, staging and install durations per program and installer hash.
+
+    Installs are keyed by installer hash as well, because a new installer
+    version can take much longer than the last one. A connection is opened
+    per call, so the history can be used from any thread and by the GUI and
+    the command line at the same time.
+    """
+
+    def __init__(self, path, keep=20):
+        self.path = path
+        self.keep = keep
+        # Migrate in one write transaction, so processes opening the history at
+        # the same time (parallel validators, the GUI and the CLI) do it only once
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.migrate(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def migrate(self, conn):
+        """Create the schema, or add the columns that an older version lacks"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(durations)")}
+        if columns:
+            for step in range(version + 1, SCHEMA_VERSION + 1):
+                name, definition = MIGRATIONS[step]
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE durations ADD COLUMN {name} {definition}")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def connect(self):
+        """Open a connection for one transaction"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_spans(self, spans):
+        """Store the probe, stage and install spans of a finished run"""
+        rows = []
+        now = time.time()
+        for span in spans:
+            if span["phase"] in RECORDED_PHASES and span.get("program"):
+                # Cache hits say nothing about how long the real work takes
+                if span.get("cached") or span.get("hit"):
+                    continue
+                rows.append((
+                    span["program"], span["phase"], span.get("installer_hash") or "",
+                    span["duration"], 0 if span.get("success") is False else 1, 1 if span.get("timed_out") else 0, now
+                ))
+        if not rows:
+            return
+
+        with self.connect() as conn:
+            conn.executemany(
+                "INSERT INTO durations (program, phase, installer_hash, duration, success, timed_out, recorded) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            # Keep only the newest durations of every program, phase and installer
+            for key in {row[:3] for row in rows}:
+                conn.execute(
+                    "DELETE FROM durations WHERE program = ? AND phase = ? AND installer_hash = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM durations WHERE program = ? AND phase = ? AND installer_hash = ? "
+                    "ORDER BY recorded DESC LIMIT ?)", key + key + (self.keep,))
+
+    def predict(self, program_name, phase="install", installer_hash=None):
+        """Return the predicted duration in seconds, or None without history.
+
+        Successful runs with the same installer hash are used first, then
+        successful runs of any installer of the program.
+        """
+        try:
+            durations = self.query_durations(program_name, phase, installer_hash)
+        except sqlite3.Error as e:
+            print(f"Error reading timing history {self.path}: {e}")
+            return None
+        return statistics.median(durations) if durations else None
+
+    def query_durations(self, program_name, phase, installer_hash):
+        """Return the most recent successful durations used by predict()"""
+        with self.connect() as conn:
+            durations = []
+            if installer_hash:
+                durations = [row[0] for row in conn.execute(
+                    "SELECT duration FROM durations WHERE program = ? AND phase = ? AND installer_hash = ? "
+                    "AND success = 1 ORDER BY recorded DESC LIMIT ?",
+                    (program_name, phase, installer_hash, PREDICTION_SAMPLES))]
+            if not durations:
+                durations = [row[0] for row in conn.execute(
+                    "SELECT duration FROM durations WHERE program = ? AND phase = ? AND success = 1 "
+                    "ORDER BY recorded DESC LIMIT ?",
+                    (program_name, phase, PREDICTION_SAMPLES))]
+        return durations
+
+    def longest(self, phase):
+        """Return {(program, installer_hash): seconds} of the longest kept runs that succeeded or timed out.
+
+        A run that timed out counts with the time it was given, so the next
+        adaptive timeout of a program that was killed too early is longer.
+        """
+        with self.connect() as conn:
+            return {
+                (program, installer_hash): duration for program, installer_hash, duration in conn.execute(
+                    "SELECT program, installer_hash, MAX(duration) FROM durations "
+                    "WHERE phase = ? AND (success = 1 OR timed_out = 1) GROUP BY program, installer_hash", (phase,))
+            }
+
+def open_timing_history(settings):
+    """Return the app's TimingHistory, or None if timing history is disabled"""
+    if not settings["timing_history"]:
+        return None
+    path = get_data_path(settings, "timing_history.sqlite3")
+    try:
+        return TimingHistory(path, keep=settings["timing_history_keep"])
+    except sqlite3.Error as e:
+        print(f"Error opening timing history {path}: {e}")
+        return None
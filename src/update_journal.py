@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOURNAL_FORMAT_VERSION = 1
+
+# Program states recorded in the journal. A program is "installed" once its
+# installer succeeded and "verified" once its install was confirmed afterwards.
+STARTED = "started"
+INSTALLED = "installed"
+VERIFIED = "verified"
+FAILED = "failed"
+SKIPPED = "skipped"
+CANCELLED = "cancelled"
+
+def program_fingerprint(program):
+    """Hash a whole programs.json entry, so a resumed run notices edited entries"""
+    encoded = json.dumps(dict(program), sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+class UpdateJournal:
+    """Crash-safe, append-only record of one Update All run.
+
+    The journal is a JSON lines file: a "plan" record with the planned
+    programs, then one "state" record per state transition. Every record is
+    flushed and fsynced before the step it describes goes on, so after a
+    crash or reboot the file tells exactly which programs were finished.
+    The file is deleted when the run completes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def begin(self, programs, config_path=None, resumed_from=None):
+        """Start a new journal for the planned programs, replacing any earlier one"""
+        plan = {
+            "event": "plan",
+            "format": JOURNAL_FORMAT_VERSION,
+            "started": time.time(),
+            "config": os.path.abspath(config_path) if config_path else None,
+            "resumed_from": resumed_from,
+            "programs": [{"name": p["name"], "fingerprint": program_fingerprint(p)} for p in programs],
+        }
+        with self.lock:
+            self.close_file()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(plan) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, name, state, **details):
+        """Append a state transition of a program and force it to disk"""
+        entry = dict(details, event="state", name=name, state=state, time=time.time())
+        with self.lock:
+            if self.file is None:
+                return
+            try:
+                self.file.write(json.dumps(entry) + "\n")
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                print(f"Error writing update journal {self.path}: {e}")
+
+    def finish(self):
+        """Mark the run as complete by removing the journal"""
+        with self.lock:
+            self.close_file()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing update journal {self.path}: {e}")
+
+    def close_file(self):
+        """Close the journal file, keeping it on disk (called with the lock held)"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class InterruptedRun:
+    """An Update All run read back from a journal that was never finished"""
+
+    def __init__(self, plan, states):
+        self.started = plan.get("started")
+        self.config = plan.get("config")
+        self.planned = plan["programs"]
+        self.states = states
+
+    def is_done(self, program):
+        """Return True if a program was verified in this run and its entry has not changed since"""
+        for planned in self.planned:
+            if planned["name"] == program["name"]:
+                return (self.states.get(program["name"]) == VERIFIED and
+                        planned["fingerprint"] == program_fingerprint(program))
+        return False
+
+    def remaining(self, programs):
+        """Return the planned programs (from the current catalog) that still need updating, in plan order"""
+        by_name = {program["name"]: program for program in programs}
+        return [
+            by_name[planned["name"]] for planned in self.planned
+            if planned["name"] in by_name and not self.is_done(by_name[planned["name"]])
+        ]
+
+    def done_count(self):
+        """Return the number of planned programs that were verified"""
+        return sum(1 for planned in self.planned if self.states.get(planned["name"]) == VERIFIED)
+
+def load_journal(path):
+    """Read an unfinished journal, or return None if there is none or it is unreadable.
+
+    A record cut off by a crash ends the journal; everything before it counts.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Error reading update journal {path}: {e}")
+        return None
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+    if not records or records[0].get("event") != "plan" or records[0].get("format") != JOURNAL_FORMAT_VERSION:
+        return None
+
+    states = {}
+    for record in records[1:]:
+        if record.get("event") == "state":
+            states[record["name"]] = record["state"]
+    return InterruptedRun(records[0], states)
@@ -0,0 +1,142 @@
+import statistics
+
+from install_scheduler import DEFAULT_CLASS_LIMITS, get_resource_class
+
+# Seconds assumed for an install when no program in the plan has any history
+DEFAULT_INSTALL_SECONDS = 60
+
+class PlannedInstall:
+    """One install of an update plan, with its predicted duration and simulated start"""
+
+    __slots__ = ("program", "seconds", "predicted", "start", "finish")
+
+    def __init__(self, program, seconds, predicted):
+        self.program = program
+        self.seconds = seconds
+        # False if seconds is a stand-in because the program has no history yet
+        self.predicted = predicted
+        self.start = None
+        self.finish = None
+
+class UpdatePlan:
+    """The order and predicted timing of an Update All run"""
+
+    def __init__(self, installs, wall_time, max_workers):
+        self.installs = installs
+        self.wall_time = wall_time
+        self.max_workers = max_workers
+
+    @property
+    def programs(self):
+        """Return the planned programs in scheduling order"""
+        return [install.program for install in self.installs]
+
+    @property
+    def total_time(self):
+        """Return the summed install time, i.e. the wall-clock time of a serial run"""
+        return sum(install.seconds for install in self.installs)
+
+    def as_dict(self):
+        """Return the plan as a JSON-serializable dict"""
+        return {
+            "wall_time": round(self.wall_time, 1),
+            "total_time": round(self.total_time, 1),
+            "install_workers": self.max_workers,
+            "installs": [{
+                "name": install.program["name"],
+                "seconds": round(install.seconds, 1),
+                "predicted": install.predicted,
+                "start": None if install.start is None else round(install.start, 1),
+                "finish": None if install.finish is None else round(install.finish, 1),
+            } for install in self.installs],
+        }
+
+    def describe(self):
+        """Return the plan as lines of text for the log or a report"""
+        lines = [
+            f"{len(self.installs)} installs, predicted wall-clock time {format_seconds(self.wall_time)} "
+            f"on {self.max_workers} workers ({format_seconds(self.total_time)} if run one at a time)"
+        ]
+        for install in self.installs:
+            estimate = format_seconds(install.seconds) + ("" if install.predicted else " (no history)")
+            if install.start is None:
+                lines.append(f"  {install.program['name']}: {estimate}, never starts (dependency cycle)")
+            else:
+                lines.append(f"  {install.program['name']}: {estimate}, starts at {format_seconds(install.start)}")
+        return lines
+
+def format_seconds(seconds):
+    """Format a duration as e.g. "45s" or "12m 5s" """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+def plan_updates(programs, history=None, max_workers=4, class_limits=None, manifest=None):
+    """Order programs longest install first and predict the run's wall-clock time.
+
+    Install durations are predicted from the timing history, by installer
+    hash where it is known from the program's "sha256" or the hash
+    manifest. Programs without history are assumed to take the median of
+    the predicted ones. Starting the longest installs first keeps them from
+    being the tail of the run; the wall-clock time is simulated with the
+    same worker, resource class and dependency rules as InstallScheduler.
+    """
+    installs = []
+    for program in programs:
+        installer_hash = program.get("sha256", "").strip().lower() or None
+        if not installer_hash and manifest and program.get("installer_path"):
+            installer_hash = manifest.peek(program["installer_path"])
+        seconds = history.predict(program["name"], "install", installer_hash) if history else None
+        installs.append(PlannedInstall(program, seconds, seconds is not None))
+
+    known = [install.seconds for install in installs if install.predicted]
+    fallback = statistics.median(known) if known else DEFAULT_INSTALL_SECONDS
+    for install in installs:
+        if not install.predicted:
+            install.seconds = fallback
+
+    # Stable sort: equal predictions keep their programs.json order
+    installs.sort(key=lambda install: -install.seconds)
+    max_workers = max(1, int(max_workers))
+    wall_time = simulate(installs, max_workers, DEFAULT_CLASS_LIMITS if class_limits is None else class_limits)
+    return UpdatePlan(installs, wall_time, max_workers)
+
+def simulate(installs, max_workers, class_limits):
+    """Set start and finish of each install as InstallScheduler would run them; returns the wall-clock time"""
+    planned = {install.program["name"] for install in installs}
+    pending = list(installs)
+    running = []
+    finished = set()
+    now = 0.0
+
+    while pending:
+        # Start every job that may start now, in order, like InstallScheduler.next_ready()
+        for install in list(pending):
+            if len(running) >= max_workers:
+                break
+            dependencies = [d for d in install.program.get("depends_on", []) if d in planned]
+            if any(d not in finished for d in dependencies):
+                continue
+            resource_class = get_resource_class(install.program)
+            limit = class_limits.get(resource_class)
+            if limit is not None and sum(1 for r in running if get_resource_class(r.program) == resource_class) >= limit:
+                continue
+            pending.remove(install)
+            install.start = now
+            install.finish = now + install.seconds
+            running.append(install)
+
+        if not running:
+            # The rest wait on each other and are skipped by the scheduler
+            break
+        now = min(install.finish for install in running)
+        for install in [r for r in running if r.finish <= now]:
+            running.remove(install)
+            finished.add(install.program["name"])
+
+    return max([now] + [install.finish for install in running])
@@ -0,0 +1,109 @@
+from install_manifest import is_install_intact
+from installer import run_installer
+from instrumentation import profiled
+from integrity import is_verified, verify_installers
+from staging import InstallerStager
+from update_journal import CANCELLED, FAILED, INSTALLED, SKIPPED, STARTED, VERIFIED
+
+class VerifiedInstallers:
+    """Installers verified in place before a run, with the get/skip/release/close interface of InstallerStager"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def get(self, program):
+        """Return (status, message, installer_path); None runs the installer from installer_path"""
+        status, message = self.results[program["name"]]
+        return status, message, None
+
+    def skip(self, program):
+        pass
+
+    def release(self, installer_path):
+        pass
+
+    def close(self):
+        pass
+
+def prepare_installers(programs, settings, manifest, installer_cache=None, tracer=None, log=print):
+    """Start staging the installers of an update run, or verify them all up front if staging is disabled.
+
+    Returns an InstallerStager or VerifiedInstallers for update_program();
+    close() it once the run is done.
+    """
+    if installer_cache:
+        # Installers are verified while being copied, a few ahead of the running installs
+        log("Staging installers...")
+        stager = InstallerStager(
+            installer_cache,
+            manifest,
+            workers=settings["staging_workers"],
+            lookahead=settings["staging_lookahead"],
+            tracer=tracer
+        )
+        stager.start(programs)
+        return stager
+
+    log("Verifying installers...")
+    return VerifiedInstallers(verify_installers(
+        programs,
+        manifest=manifest,
+        max_workers=settings["verify_workers"],
+        tracer=tracer
+    ))
+
+def update_program(program, installers, log, journal=None, cancelled=None, probe_cache=None, tracer=None, **options):
+    """Update one program with its staged or verified installer; shared by the GUI and the CLI.
+
+    installers comes from prepare_installers(). An installer that failed
+    verification is not run, nor is one whose update was cancelled
+    (cancelled() returns True) before it started. With a journal, every
+    state transition is recorded: STARTED, then INSTALLED and VERIFIED once
+    the install is confirmed, or FAILED or CANCELLED. The program's cached
+    probe result is dropped once its installer ran. options are passed on
+    to run_installer(), which runs under the tracer's profiler.
+
+    Returns (hash status, success, message).
+    """
+    name = program["name"]
+    cancelled = cancelled or (lambda: False)
+    if cancelled():
+        installers.skip(program)
+        status, installer_path = "Cancelled", None
+    else:
+        status, message, installer_path = installers.get(program)
+        if is_verified(status) and cancelled():
+            status = "Cancelled"
+    if status == "Cancelled":
+        message = f"Update of {name} cancelled"
+    if not is_verified(status):
+        installers.release(installer_path)
+        if journal:
+            journal.record(name, CANCELLED if status == "Cancelled" else FAILED, message=message)
+        return status, False, message
+
+    if journal:
+        journal.record(name, STARTED)
+    try:
+        success, message = profiled(
+            tracer, run_installer, (program, log), dict(options, tracer=tracer, installer_path=installer_path))
+    finally:
+        installers.release(installer_path)
+    if probe_cache:
+        probe_cache.invalidate(name)
+
+    # A resumed run skips only programs whose install was confirmed afterwards
+    if journal and success:
+        journal.record(name, INSTALLED)
+        if is_install_intact(program, options.get("install_index")):
+            journal.record(name, VERIFIED)
+    elif journal:
+        journal.record(name, CANCELLED if cancelled() else FAILED, message=message)
+    return status, success, message
+
+def skip_update(program, installers, reason, journal=None):
+    """Drop a program the scheduler will not update (e.g. a dependency failed); returns the message"""
+    installers.skip(program)
+    if journal:
+        journal.record(program["name"], SKIPPED, reason=reason)
+    return f"Skipped {program['name']}: {reason}"
@@ -0,0 +1,447 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from catalog import Program, compile_probe
+from file_scan import search_file
+from install_manifest import DAMAGED
+from instrumentation import profiled, span
+from pe_version import get_exe_version
+from process_runner import get_runner
+from versions import compare_versions, get_version_scheme
+
+# PowerShell script that reads a JSON array of paths from stdin and writes a
+# JSON array with one VersionInfo field per path, in the same order
+EXE_VERSION_SCRIPT = (
+    "$paths = @([Console]::In.ReadToEnd() | ConvertFrom-Json); "
+    "$out = @(foreach ($p in $paths) { "
+    "try { $v = (Get-Item -LiteralPath $p).VersionInfo.{field}; "
+    "if ($v) { $v.Trim() } else { '' } } catch { '' } }); "
+    "ConvertTo-Json -InputObject $out -Compress"
+)
+
+# Statuses that Update All installs; "Newer Installed" (the catalog version is
+# older than the installed one) is flagged instead of downgraded
+NEEDS_UPDATE = ("Not Installed", "Update Available", "Damaged")
+
+# Probe results that carry no installed version
+UNKNOWN_VERSIONS = ("Unknown", "Error", "Timeout")
+
+# Seconds a cmd_output version command may run
+CMD_OUTPUT_TIMEOUT = 30
+
+# Seconds a batched PowerShell version query gets on top of its timeout for every executable
+EXE_VERSION_PATH_ALLOWANCE = 0.5
+
+def get_exe_versions(paths, field="FileVersion", timeout=None, runner=None):
+    """Read a VersionInfo field for many executables.
+
+    The version resource is parsed natively first; only executables that
+    cannot be read that way are sent to a single PowerShell session.
+    Returns a dict mapping each path to its version string, or "Unknown" when
+    the field is empty. subprocess.TimeoutExpired is raised if PowerShell does
+    not answer within the timeout (CMD_OUTPUT_TIMEOUT by default) plus
+    EXE_VERSION_PATH_ALLOWANCE per path.
+    """
+    paths = list(dict.fromkeys(paths))
+    versions = {}
+    for path in paths:
+        version = get_exe_version(path, field)
+        if version:
+            versions[path] = version
+
+    remaining = [path for path in paths if path not in versions]
+    if remaining:
+        versions.update(get_exe_versions_powershell(remaining, field, timeout, runner))
+    return versions
+
+def get_exe_versions_powershell(paths, field="FileVersion", timeout=None, runner=None):
+    """Read a VersionInfo field for many executables in a single PowerShell session"""
+    if not paths:
+        return {}
+    timeout = (timeout or CMD_OUTPUT_TIMEOUT) + EXE_VERSION_PATH_ALLOWANCE * len(paths)
+
+    args = ["powershell", "-NoProfile", "-NonInteractive", "-Command", EXE_VERSION_SCRIPT.replace("{field}", field)]
+    result = (runner or get_runner()).run(args, input=json.dumps(paths), timeout=timeout)
+    if result.timed_out:
+        raise subprocess.TimeoutExpired(args, timeout)
+
+    versions = dict.fromkeys(paths, "Unknown")
+    if result.returncode != 0 or not result.stdout.strip():
+        return versions
+
+    try:
+        values = json.loads(result.stdout)
+    except ValueError:
+        print(f"Unexpected PowerShell output for version batch: {result.stdout[:200]}")
+        return versions
+    if not isinstance(values, list):
+        values = [values]
+
+    for path, value in zip(paths, values):
+        if isinstance(value, str) and value.strip():
+            versions[path] = value.strip()
+    return versions
+
+def parse_cmd_output(probe, result):
+    """Extract the version from the ProcessResult of a cmd_output probe"""
+    if result.timed_out:
+        return "Timeout"
+    if result.returncode == 0 and result.stdout:
+        if probe.regex:
+            match = probe.regex.search(result.stdout)
+            if match:
+                return match.group(1)
+        return result.stdout.strip()
+    elif result.stderr and probe.regex:
+        match = probe.regex.search(result.stderr)
+        if match:
+            return match.group(1)
+        return "Unknown"
+    else:
+        return "Unknown"
+
+def get_program_version(program, runner=None, timeout=CMD_OUTPUT_TIMEOUT):
+    """Get the currently installed version of a program; probe commands are killed after timeout seconds"""
+    try:
+        # Programs from the config loader carry a precompiled probe
+        probe = program.probe if isinstance(program, Program) else compile_probe(program.get("version_check"))
+
+        # Check if program has version checking configuration
+        if probe.kind is None:
+            return "Unknown"
+
+        if probe.kind == "none":
+            return "N/A"
+
+        elif probe.kind == "exe_version":
+            # Get version from executable file properties
+            exe_path = probe.path or ""
+            if not os.path.exists(exe_path):
+                return "Not Installed"
+
+            # Read the file version from the executable's version resource
+            return get_exe_versions([exe_path], timeout=timeout, runner=runner)[exe_path]
+
+        elif probe.kind == "cmd_output":
+            # Get version from command output
+            if not probe.command:
+                return "Unknown"
+
+            result = (runner or get_runner()).run(probe.command, shell=True, timeout=timeout)
+            return parse_cmd_output(probe, result)
+
+        elif probe.kind == "file_content":
+            # Get version from file content
+            file_path = probe.path or ""
+            if not os.path.exists(file_path):
+                return "Not Installed"
+
+            if probe.regex:
+                # Streamed in chunks, stopping at the first match
+                match = search_file(
+                    file_path,
+                    probe.regex,
+                    encoding=probe.encoding,
+                    max_bytes=probe.max_bytes,
+                    tail=probe.tail
+                )
+                if match:
+                    return match.group(1)
+            return "Unknown"
+
+        else:
+            return "Unknown"
+
+    except subprocess.TimeoutExpired:
+        return "Timeout"
+    except Exception as e:
+        print(f"Error getting version for {program.get('name', 'Unknown')}: {str(e)}")
+        return "Error"
+
+def probe_program(program):
+    """Check whether a program is installed and, if so, which version"""
+    if not os.path.exists(program["install_path"]):
+        return False, "Not Installed"
+    return True, get_program_version(program)
+
+def get_install_status(program, installed, current_version):
+    """Classify a probe result as Not Installed, Damaged, Update Available, Newer Installed or Installed.
+
+    Versions are compared under the program's version_scheme, so "4.2.5"
+    and "v4.2.5.0" are the same version; strings that cannot be parsed
+    count as different whenever they are not equal. A probe that failed or
+    timed out says nothing about the installed version and never asks for
+    an update.
+    """
+    if not installed:
+        return "Not Installed"
+    if current_version == DAMAGED:
+        return "Damaged"
+    new_version = program.get("new_version", "Unknown")
+    if (current_version in UNKNOWN_VERSIONS or
+        new_version == "Unknown" or new_version == "N/A"):
+        return "Installed"
+
+    order = compare_versions(current_version, new_version, get_version_scheme(program))
+    if order is None:
+        order = 0 if current_version == new_version else -1
+    if order < 0:
+        return "Update Available"
+    if order > 0:
+        return "Newer Installed"
+    return "Installed"
+
+def get_probe_type(program):
+    """Return the version_check type of a program, or "none" if it has no version check"""
+    version_check = program.get("version_check")
+    if isinstance(version_check, dict):
+        return version_check.get("type", "none")
+    return "none"
+
+def is_exe_version_probe(program):
+    """Return True if a program's version comes from executable file properties"""
+    version_check = program.get("version_check")
+    return isinstance(version_check, dict) and version_check.get("type") == "exe_version"
+
+class ProbeEngine:
+    """Run installation/version probes concurrently on a bounded worker pool.
+
+    cmd_output commands run on the process runner's event loop, so a worker
+    thread is only busy while a probe's result is looked up or reported,
+    not while its command runs. With a TimeoutPolicy, each cmd_output
+    command gets its program's probe timeout instead of CMD_OUTPUT_TIMEOUT,
+    and a batched PowerShell query the longest probe timeout of its programs.
+    """
+
+    def __init__(self, max_workers=8, probe=probe_program, batch_exe_versions=True, cache=None, install_index=None,
+                 runner=None, timeouts=None):
+        self.max_workers = max(1, int(max_workers))
+        self.probe = probe
+        self.batch_exe_versions = batch_exe_versions
+        self.cache = cache
+        self.install_index = install_index
+        self.runner = runner or get_runner()
+        self.timeouts = timeouts
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="probe"
+        )
+
+    def probe_all(self, programs, on_result, on_complete=None, tracer=None):
+        """Probe every program at once.
+
+        on_result(index, program, installed, version) is called from a worker
+        thread as soon as each probe lands; on_complete() is called once after
+        the last one. Each probe is recorded as a "probe" span if a tracer is given.
+        """
+        programs = list(programs)
+        if not programs:
+            if on_complete:
+                on_complete()
+            return []
+
+        remaining = [len(programs)]
+        lock = threading.Lock()
+
+        def run(index, program):
+            with span(tracer, "probe", program.get("name"), probe_type=get_probe_type(program)) as attrs:
+                cached = self.cache.lookup(program) if self.cache else None
+                attrs["cached"] = cached is not None
+                if cached is None:
+                    try:
+                        if tracer:
+                            installed, version = tracer.profiled(self.probe, program)
+                        else:
+                            installed, version = self.probe(program)
+                    except Exception as e:
+                        print(f"Error probing {program.get('name', 'Unknown')}: {str(e)}")
+                        installed, version = False, "Error"
+                    if self.cache:
+                        self.cache.store(program, installed, version)
+                else:
+                    installed, version = cached
+            finish(index, program, installed, version)
+
+        def finish(index, program, installed, version):
+            try:
+                # Installs with a recorded manifest are checked for missing or modified
+                # files every time, since the probe cache cannot see them
+                if installed and self.install_index:
+                    with span(tracer, "install_check", program.get("name")) as attrs:
+                        check = self.install_index.check(program)
+                        attrs["state"] = check.state if check else None
+                    if check and check.state == DAMAGED:
+                        version = DAMAGED
+                on_result(index, program, installed, version)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    done = remaining[0] == 0
+                if done:
+                    if self.cache:
+                        self.cache.save()
+                    if self.install_index:
+                        self.install_index.save()
+                    if on_complete:
+                        on_complete()
+
+        futures = []
+        batch = []
+        for i, program in enumerate(programs):
+            if self.batch_exe_versions and is_exe_version_probe(program):
+                batch.append((i, program))
+            elif self.probe is probe_program and get_probe_type(program) == "cmd_output":
+                futures.append(self.start_cmd_probe(i, program, finish, tracer))
+            else:
+                futures.append(self.executor.submit(run, i, program))
+
+        # All exe_version probes share one task (and at most one PowerShell session)
+        if batch:
+            futures.append(self.executor.submit(self.run_exe_batch, batch, finish, tracer))
+        return futures
+
+    def start_cmd_probe(self, index, program, finish, tracer=None):
+        """Probe a cmd_output program without holding a worker thread while its command runs.
+
+        Returns a future that resolves once the result has been reported.
+        """
+        done = Future()
+        started = time.monotonic()
+
+        def report(installed, version, cached=False, timed_out=False):
+            if tracer:
+                # Failed probes are kept out of the durations that adaptive probe timeouts are based on,
+                # except killed ones, which count with the time they were given
+                tracer.record("probe", started, time.monotonic() - started, program.get("name"),
+                              probe_type="cmd_output", cached=cached, success=version not in ("Error", "Timeout"),
+                              timed_out=timed_out)
+            try:
+                finish(index, program, installed, version)
+            except Exception as e:
+                done.set_exception(e)
+            else:
+                done.set_result(None)
+
+        def start():
+            try:
+                cached = self.cache.lookup(program) if self.cache else None
+                if cached is not None:
+                    report(*cached, cached=True)
+                    return
+                probe = program.probe if isinstance(program, Program) else compile_probe(program.get("version_check"))
+                if not os.path.exists(program["install_path"]):
+                    installed, version = False, "Not Installed"
+                elif not probe.command:
+                    installed, version = True, "Unknown"
+                else:
+                    timeout = self.timeouts.get(program, "probe") if self.timeouts else CMD_OUTPUT_TIMEOUT
+                    job = self.runner.submit(probe.command, shell=True, timeout=timeout)
+                    # Parse and report on a worker thread, keeping the event loop free
+                    job.add_done_callback(lambda job: self.executor.submit(complete, probe, job))
+                    return
+            except Exception as e:
+                print(f"Error probing {program.get('name', 'Unknown')}: {str(e)}")
+                installed, version = False, "Error"
+            if self.cache:
+                self.cache.store(program, installed, version)
+            report(installed, version)
+
+        def complete(probe, job):
+            timed_out = False
+            try:
+                result = job.result()
+                timed_out = result.timed_out
+                version = parse_cmd_output(probe, result)
+            except Exception as e:
+                print(f"Error getting version for {program.get('name', 'Unknown')}: {str(e)}")
+                version = "Error"
+            if self.cache:
+                self.cache.store(program, True, version)
+            report(True, version, timed_out=timed_out)
+
+        self.executor.submit(start)
+        return done
+
+    def run_exe_batch(self, batch, finish, tracer=None):
+        """Probe every exe_version program of a check in one go"""
+        started = time.monotonic()
+        results = {}
+        exe_paths = []
+        cached = {}
+        for index, program in batch:
+            exe_path = program["version_check"].get("path", "")
+            hit = self.cache.lookup(program) if self.cache else None
+            if hit is not None:
+                cached[index] = hit
+            elif not os.path.exists(program["install_path"]):
+                results[index] = (False, "Not Installed")
+            elif not os.path.exists(exe_path):
+                results[index] = (True, "Not Installed")
+            else:
+                exe_paths.append(exe_path)
+
+        # Report cached and cheap results first so those rows do not wait on the batch
+        lookup_time = time.monotonic() - started
+        for index, program in batch:
+            if index in cached:
+                finish(index, program, *cached[index])
+            elif index in results:
+                if self.cache:
+                    self.cache.store(program, *results[index])
+                finish(index, program, *results[index])
+            else:
+                continue
+            if tracer:
+                tracer.record("probe", started, lookup_time, program.get("name"),
+                              probe_type="exe_version", cached=index in cached)
+
+        # The batch may run as long as the slowest of its programs' probes
+        timeout = None
+        if self.timeouts and exe_paths:
+            timeout = max(self.timeouts.get(program, "probe") for index, program in batch
+                          if index not in cached and index not in results)
+
+        versions = {}
+        fallback = "Unknown"
+        with span(tracer, "probe_batch", count=len(exe_paths)):
+            try:
+                versions = profiled(tracer, get_exe_versions, (exe_paths,), {"timeout": timeout, "runner": self.runner})
+            except subprocess.TimeoutExpired:
+                fallback = "Timeout"
+            except Exception as e:
+                print(f"Error getting versions for exe_version batch: {str(e)}")
+                fallback = "Error"
+        batch_time = time.monotonic() - started
+
+        for index, program in batch:
+            if index in cached or index in results:
+                continue
+            exe_path = program["version_check"].get("path", "")
+            version = versions.get(exe_path, fallback)
+            if self.cache:
+                self.cache.store(program, True, version)
+            if tracer:
+                tracer.record("probe", started, batch_time, program.get("name"), probe_type="exe_version",
+                              cached=False, batched=True, success=version not in ("Error", "Timeout"),
+                              timed_out=version == "Timeout")
+            finish(index, program, True, version)
+
+    def probe_all_sync(self, programs, tracer=None):
+        """Probe every program concurrently and return [(installed, version), ...] in input order"""
+        programs = list(programs)
+        results = [None] * len(programs)
+
+        def store(index, program, installed, version):
+            results[index] = (installed, version)
+
+        for future in self.probe_all(programs, store, tracer=tracer):
+            future.result()
+        return results
+
+    def shutdown(self):
+        """Stop accepting new probes; queued and running probes are left to finish"""
+        self.executor.shutdown(wait=False)
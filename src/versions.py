@@ -0,0 +1,107 @@
+import functools
+import re
+
+# Values of a program's optional "version_scheme" field:
+#   dotted - numeric components ("4.2.5", "v2.1", "1.0.0-rc1"); trailing
+#            ".0" components do not matter, pre-releases sort before
+#            the release, and later numbers such as builds or revisions
+#            ("1.2.3 build 456", "1.0.0-2") break ties (default)
+#   date   - dates or date-like builds ("2024-03-01", "2024.03.01")
+#   string - any difference counts as an update (no ordering)
+VERSION_SCHEMES = ("dotted", "date", "string")
+
+# Pre-release tags and their order; a final release sorts after all of them
+PRE_RELEASE_RANKS = {
+    "dev": 0, "snapshot": 0, "nightly": 0,
+    "alpha": 1, "a": 1,
+    "beta": 2, "b": 2,
+    "pre": 3, "preview": 3,
+    "rc": 4, "cr": 4,
+}
+FINAL_RANK = 5
+
+NUMBERS = re.compile(r"\d+(?:[._]\d+)*")
+DATE_NUMBERS = re.compile(r"\d+(?:[-._/]\d+)*")
+PRE_RELEASE = re.compile(r"^[-._+\s]*(dev|snapshot|nightly|alpha|beta|preview|pre|rc|cr|a|b)[-._\s]?(\d*)", re.IGNORECASE)
+# Architecture and bitness labels, whose numbers are not part of the version ("2.1 (64-bit)", "x64")
+ARCHITECTURE = re.compile(r"\b(?:x86|x64|amd64|arm64|win32|win64|\d+[-\s]?bit)\b", re.IGNORECASE)
+
+class Version:
+    """A parsed version, ordered by release components, then pre-release tag, then later numbers"""
+
+    __slots__ = ("text", "release", "pre", "post", "key")
+
+    def __init__(self, text, release, pre=(FINAL_RANK, 0), post=()):
+        self.text = text
+        self.release = release
+        self.pre = pre
+        # Numbers after the release and tag: builds, revisions, service packs
+        self.post = post
+        # Trailing zero components do not change a version: 4.2.5 == 4.2.5.0
+        trimmed = list(release)
+        while len(trimmed) > 1 and trimmed[-1] == 0:
+            trimmed.pop()
+        self.key = (tuple(trimmed), pre, post)
+
+    def __eq__(self, other):
+        return isinstance(other, Version) and self.key == other.key
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Version({self.text!r})"
+
+@functools.lru_cache(maxsize=4096)
+def parse_version(text, scheme="dotted"):
+    """Parse a version string, or return None if it holds no version.
+
+    Text around the number, such as "v" or "Version ", is skipped. Numbers
+    after the release and any pre-release tag are kept in order, so
+    "1.2.3 build 456", "20.9 SR-4", "2.44.0.windows.1" and "2024-03-01"
+    (under dotted) differ from their next builds; architecture labels
+    such as " (64-bit)" are ignored. Parsed versions are cached, since the
+    same catalog versions are compared on every check.
+    """
+    if not isinstance(text, str) or scheme == "string":
+        return None
+
+    # Prefer the first multi-part number, so "7-Zip 23.01" parses as 23.01
+    pattern = DATE_NUMBERS if scheme == "date" else NUMBERS
+    matches = list(pattern.finditer(text))
+    if not matches:
+        return None
+    match = next((m for m in matches if not m.group(0).isdigit()), matches[0])
+    release = tuple(int(part) for part in re.split(r"\D", match.group(0)))
+
+    pre = (FINAL_RANK, 0)
+    rest = text[match.end():]
+    if scheme == "dotted":
+        tag = PRE_RELEASE.match(rest)
+        # A bare "a"/"b" only counts when followed by a number ("1.0b2"), not in "1.0a" or "1.0 build"
+        if tag and (len(tag.group(1)) > 1 or tag.group(2)):
+            pre = (PRE_RELEASE_RANKS[tag.group(1).lower()], int(tag.group(2) or 0))
+            rest = rest[tag.end():]
+    post = tuple(int(number) for number in re.findall(r"\d+", ARCHITECTURE.sub(" ", rest)))
+    return Version(text, release, pre, post)
+
+def compare_versions(current, new, scheme="dotted"):
+    """Return -1, 0 or 1 as current is older than, equal to or newer than new.
+
+    Returns None if either string cannot be parsed under the scheme; callers
+    then fall back to comparing the strings themselves.
+    """
+    a = parse_version(current, scheme)
+    b = parse_version(new, scheme)
+    if a is None or b is None:
+        return None
+    if a == b:
+        return 0
+    return -1 if a < b else 1
+
+def get_version_scheme(program):
+    """Return a program's version_scheme, defaulting to "dotted" """
+    return program.get("version_scheme") or "dotted"
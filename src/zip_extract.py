@@ -0,0 +1,127 @@
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes read/written per chunk when streaming archive members
+CHUNK_SIZE = 1024 * 1024
+
+# Member names that are absolute or carry a drive letter, whatever the platform extracting them
+ABSOLUTE_NAME = re.compile(r"^([/\\]|[A-Za-z]:)")
+
+def file_crc32(path):
+    """Compute the CRC-32 of a file in chunks"""
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
+
+def is_unchanged(info, target):
+    """Return True if target already holds exactly the archive member's content"""
+    try:
+        if os.path.getsize(target) != info.file_size:
+            return False
+        return file_crc32(target) == info.CRC
+    except OSError:
+        return False
+
+def safe_target(dest_dir, name):
+    """Resolve an archive member name inside dest_dir, rejecting paths that escape it"""
+    if ABSOLUTE_NAME.match(name):
+        raise ValueError(f"Archive member escapes destination: {name}")
+    target = os.path.realpath(os.path.join(dest_dir, name))
+    if os.path.commonpath([dest_dir, target]) != dest_dir:
+        raise ValueError(f"Archive member escapes destination: {name}")
+    return target
+
+def extract_zip(zip_path, dest_dir, max_workers=4, progress=None):
+    """Extract a zip archive into dest_dir.
+
+    Members are streamed to disk in chunks by a pool of worker threads, each
+    with its own handle on the archive. Files whose size and CRC already
+    match the archive are left untouched. progress(done_bytes, total_bytes)
+    is called from the worker threads as data is processed.
+    Returns (extracted_count, unchanged_count).
+    """
+    dest_dir = os.path.realpath(dest_dir)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    with zipfile.ZipFile(zip_path) as archive:
+        members = archive.infolist()
+
+    files = []
+    for info in members:
+        target = safe_target(dest_dir, info.filename)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+        else:
+            files.append((info, target))
+
+    total = sum(info.file_size for info, target in files)
+    done = [0]
+    counts = {"extracted": 0, "unchanged": 0}
+    lock = threading.Lock()
+    local = threading.local()
+    handles = []
+
+    def advance(size):
+        with lock:
+            done[0] += size
+            current = done[0]
+        if progress:
+            progress(current, total)
+
+    def extract(info, target):
+        if is_unchanged(info, target):
+            with lock:
+                counts["unchanged"] += 1
+            advance(info.file_size)
+            return
+
+        # One archive handle per worker thread
+        archive = getattr(local, "archive", None)
+        if archive is None:
+            archive = local.archive = zipfile.ZipFile(zip_path)
+            with lock:
+                handles.append(archive)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.part"
+        try:
+            with archive.open(info) as src, open(tmp_path, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    advance(len(chunk))
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Keep the archived modification time
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        os.utime(target, (mtime, mtime))
+        with lock:
+            counts["extracted"] += 1
+
+    try:
+        # Largest members first so one big file does not end up as the tail
+        files.sort(key=lambda item: item[0].file_size, reverse=True)
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="unzip") as pool:
+            for future in [pool.submit(extract, info, target) for info, target in files]:
+                future.result()
+    finally:
+        for archive in handles:
+            archive.close()
+
+    return counts["extracted"], counts["unchanged"]
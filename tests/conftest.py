@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the flat modules in src/ by name, like the scripts do, and the
+# benchmark's stub commands from scripts/
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "scripts"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "src"))
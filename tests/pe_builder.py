@@ -0,0 +1,80 @@
+"""Build small PE images with a version resource for the pe_version tests"""
+import struct
+
+def utf16z(text):
+    """Encode a string as NUL-terminated UTF-16LE"""
+    return text.encode("utf-16-le") + b"\0\0"
+
+def pad4(data):
+    """Pad bytes to a 32-bit boundary"""
+    return data + b"\0" * (-len(data) % 4)
+
+def block(key, value=b"", value_length=0, value_type=0, children=b""):
+    """Build one version resource block (wLength, wValueLength, wType, szKey, value, children)"""
+    body = pad4(pad4(struct.pack("<HHH", 0, value_length, value_type) + utf16z(key)) + value) + children
+    return struct.pack("<H", len(body)) + body[2:]
+
+def string_table(language, strings):
+    """Build a StringTable block, e.g. string_table("040904b0", {"FileVersion": "1.0"})"""
+    children = b""
+    for key, text in strings.items():
+        value = utf16z(text)
+        children += pad4(block(key, value, len(value) // 2, 1))
+    return pad4(block(language, children=children, value_type=1))
+
+def fixed_file_info(file_version, product_version=None):
+    """Build a VS_FIXEDFILEINFO structure from two 4-tuples"""
+    product_version = product_version or file_version
+    return struct.pack(
+        "<13I", 0xFEEF04BD, 0x10000,
+        (file_version[0] << 16) | file_version[1], (file_version[2] << 16) | file_version[3],
+        (product_version[0] << 16) | product_version[1], (product_version[2] << 16) | product_version[3],
+        0, 0, 0, 0, 0, 0, 0
+    )
+
+def version_info(tables=(), fixed=None):
+    """Build a VS_VERSIONINFO resource with the given StringTables, followed by a VarFileInfo block"""
+    children = b""
+    if tables:
+        children += pad4(block("StringFileInfo", children=b"".join(tables), value_type=1))
+    translation = pad4(block("Translation", struct.pack("<HH", 0x409, 1200), 4))
+    children += pad4(block("VarFileInfo", children=translation, value_type=1))
+    value = fixed or b""
+    return block("VS_VERSION_INFO", value, len(value), 0, children)
+
+def resource_section(resources, rva):
+    """Build a .rsrc section: RT_VERSION -> ID 1 -> one data entry per (language, data) pair"""
+    directory = lambda count: struct.pack("<IIHHHH", 0, 0, 0, 0, 0, count)
+    languages_offset = 48
+    entries_offset = languages_offset + 16 + 8 * len(resources)
+    data_offset = entries_offset + 16 * len(resources)
+
+    section = directory(1) + struct.pack("<II", 16, 0x80000000 | 24)
+    section += directory(1) + struct.pack("<II", 1, 0x80000000 | languages_offset)
+    section += directory(len(resources))
+    for i, (language, data) in enumerate(resources):
+        section += struct.pack("<II", language, entries_offset + 16 * i)
+    blobs = b""
+    for language, data in resources:
+        section += struct.pack("<IIII", rva + data_offset + len(blobs), len(data), 0, 0)
+        blobs += pad4(data)
+    return section + blobs
+
+def build_pe(resources, pe32_plus=False):
+    """Return the bytes of a PE32 (or PE32+) image whose only section holds the given version resources"""
+    rsrc_rva, raw_offset = 0x1000, 0x400
+    rsrc = resource_section(resources, rsrc_rva)
+
+    # PE32+ has a larger optional header, with the data directories 16 bytes further in
+    optional_size, directories, magic, machine = (240, 112, 0x20B, 0x8664) if pe32_plus else (224, 96, 0x10B, 0x14C)
+    dos = b"MZ" + b"\0" * 58 + struct.pack("<I", 0x80)
+    dos += b"\0" * (0x80 - len(dos))
+    coff = b"PE\0\0" + struct.pack("<HHIIIHH", machine, 1, 0, 0, 0, optional_size, 0x22)
+    optional = bytearray(optional_size)
+    struct.pack_into("<H", optional, 0, magic)
+    struct.pack_into("<II", optional, directories + 16, rsrc_rva, len(rsrc))
+    section = b".rsrc\0\0\0" + struct.pack(
+        "<IIII", len(rsrc), rsrc_rva, len(rsrc) + (-len(rsrc) % 512), raw_offset) + b"\0" * 16
+    header = dos + coff + bytes(optional) + section
+    header += b"\0" * (raw_offset - len(header))
+    return header + rsrc + b"\0" * (-len(rsrc) % 512)
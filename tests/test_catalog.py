@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+import catalog
+from catalog import CatalogCache, ConfigError
+from config import read_programs
+
+def write_catalog(tmp_path, **fields):
+    entry = {"name": "Tool", "install_path": "C:/Tool", "installer_path": "C:/setup.exe", "silent_args": "/S"}
+    entry.update(fields)
+    path = tmp_path / "programs.json"
+    path.write_text(json.dumps([entry]))
+    return str(path)
+
+def test_snapshot_of_older_schema_is_validated_again(tmp_path, monkeypatch):
+    config_path = write_catalog(tmp_path, timeout="abc")
+    cache_path = str(tmp_path / "catalog_cache.json")
+
+    # A build whose schema did not check "timeout" cached the catalog
+    with open(config_path) as f:
+        programs = json.load(f)
+    snapshot = {"files": {config_path: catalog.file_digest(config_path)}, "programs": programs, "used": 0}
+    with open(cache_path, "w") as f:
+        json.dump({"format": 1, "catalogs": {config_path: snapshot}}, f)
+
+    with pytest.raises(ConfigError):
+        read_programs(config_path, CatalogCache(cache_path))
+
+def test_valid_catalog_is_cached(tmp_path):
+    config_path = write_catalog(tmp_path, timeout=60)
+    cache_path = str(tmp_path / "catalog_cache.json")
+    read_programs(config_path, CatalogCache(cache_path))
+    assert CatalogCache(cache_path).lookup(config_path) is not None
+
+def test_manifest_exclude_must_be_a_list_of_patterns(tmp_path):
+    with pytest.raises(ConfigError):
+        read_programs(write_catalog(tmp_path, manifest_exclude="*.ini"))
+
+def test_touched_files_are_not_hashed_again(tmp_path, monkeypatch):
+    config_path = write_catalog(tmp_path)
+    cache_path = str(tmp_path / "catalog_cache.json")
+    read_programs(config_path, CatalogCache(cache_path))
+
+    # A checkout or copy changes the mtime but not the content
+    os.utime(config_path, (1000000000, 1000000000))
+    read_programs(config_path, CatalogCache(cache_path))
+
+    hashed = []
+    monkeypatch.setattr(catalog, "file_digest", lambda path: hashed.append(path))
+    assert read_programs(config_path, CatalogCache(cache_path))[0]["name"] == "Tool"
+    assert hashed == []
@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from benchmark import write_stub_powershell
+from process_runner import ProcessRunner
+from version_probe import get_exe_versions, get_exe_versions_powershell
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="puts a POSIX stub powershell first on PATH")
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    bin_dir = str(tmp_path / "bin")
+    write_stub_powershell(bin_dir)
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ.get("PATH", ""))
+    for name in ("DFIR_BENCH_PROBE_LATENCY", "DFIR_BENCH_VERSION_REPLY", "DFIR_BENCH_VERSION_EXIT"):
+        monkeypatch.delenv(name, raising=False)
+    runner = ProcessRunner(2)
+    yield runner
+    runner.shutdown()
+
+PATHS = ["/opt/tools/a.exe", "/opt/tools/b.exe", "/opt/tools/c.exe"]
+
+def test_results_follow_input_order(runner, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_EXE_VERSIONS", json.dumps({"a.exe": "1.0", "b.exe": "", "c.exe": " 3.0 "}))
+    assert get_exe_versions_powershell(PATHS, runner=runner) == {
+        PATHS[0]: "1.0", PATHS[1]: "Unknown", PATHS[2]: "3.0"}
+
+def test_single_object_reply(runner, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_VERSION_REPLY", '"7.1"')
+    assert get_exe_versions_powershell(PATHS[:1], runner=runner) == {PATHS[0]: "7.1"}
+
+def test_output_that_is_not_json(runner, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_VERSION_REPLY", "Get-Item : access denied")
+    assert get_exe_versions_powershell(PATHS, runner=runner) == dict.fromkeys(PATHS, "Unknown")
+
+def test_non_zero_exit(runner, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_VERSION_EXIT", "1")
+    assert get_exe_versions_powershell(PATHS, runner=runner) == dict.fromkeys(PATHS, "Unknown")
+
+def test_timeout(runner, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_PROBE_LATENCY", "10")
+    with pytest.raises(subprocess.TimeoutExpired):
+        get_exe_versions_powershell(PATHS[:1], timeout=0.5, runner=runner)
+
+def test_only_unreadable_executables_reach_powershell(runner, tmp_path, monkeypatch):
+    monkeypatch.setenv("DFIR_BENCH_EXE_VERSION", "9.9")
+    path = tmp_path / "script.exe"
+    path.write_bytes(b"not a PE file")
+    assert get_exe_versions([str(path), str(path)], runner=runner) == {str(path): "9.9"}
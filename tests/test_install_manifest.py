@@ -0,0 +1,34 @@
+from install_manifest import DAMAGED, INTACT, InstallIndex
+
+def make_install(tmp_path):
+    root = tmp_path / "Tool"
+    (root / "logs").mkdir(parents=True)
+    (root / "tool.exe").write_bytes(b"binary")
+    (root / "settings.ini").write_text("theme=dark\n")
+    (root / "logs" / "run.log").write_text("started\n")
+    return root
+
+def test_excluded_files_are_not_recorded(tmp_path):
+    root = make_install(tmp_path)
+    program = {"name": "Tool", "install_path": str(root), "manifest_exclude": ["settings.ini", "logs/*"]}
+    index = InstallIndex(str(tmp_path / "install_index.json"))
+    assert index.record(program) == 1
+
+    # The tool rewrites its settings and logs in place
+    (root / "settings.ini").write_text("theme=light\n")
+    (root / "logs" / "run.log").unlink()
+    assert index.check(program).state == INTACT
+
+    (root / "tool.exe").write_bytes(b"patched")
+    check = index.check(program)
+    assert check.state == DAMAGED and check.modified == ["tool.exe"]
+
+def test_exclude_added_after_recording_applies(tmp_path):
+    root = make_install(tmp_path)
+    program = {"name": "Tool", "install_path": str(root)}
+    index = InstallIndex(str(tmp_path / "install_index.json"))
+    assert index.record(program) == 3
+
+    (root / "settings.ini").write_text("theme=light\n")
+    assert index.check(program).state == DAMAGED
+    assert index.check(dict(program, manifest_exclude=["*.ini"])).state == INTACT
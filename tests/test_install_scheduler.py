@@ -0,0 +1,93 @@
+import threading
+import time
+
+from install_scheduler import InstallScheduler
+
+def job(name, installer="setup.exe", **fields):
+    program = {"name": name, "installer_path": f"C:\\installers\\{installer}"}
+    program.update(fields)
+    return program, None
+
+class Recorder:
+    """run_job that records the peak concurrency overall and per installer type"""
+
+    def __init__(self, fail=(), seconds=0.05):
+        self.fail = set(fail)
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.ran = []
+        self.skipped = {}
+
+    def __call__(self, program, payload):
+        kinds = ("all", program["installer_path"].rsplit(".", 1)[1])
+        with self.lock:
+            self.ran.append(program["name"])
+            for kind in kinds:
+                self.running[kind] = self.running.get(kind, 0) + 1
+                self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+        time.sleep(self.seconds)
+        with self.lock:
+            for kind in kinds:
+                self.running[kind] -= 1
+        return program["name"] not in self.fail
+
+    def skip(self, program, payload, reason):
+        self.skipped[program["name"]] = reason
+
+def run(jobs, recorder, **options):
+    scheduler = InstallScheduler(**options)
+    completed = []
+    scheduler.start(jobs, recorder, on_skip=recorder.skip, on_complete=lambda: completed.append(True))
+    scheduler.wait()
+    assert completed == [True]
+    return scheduler
+
+def test_worker_limit():
+    recorder = Recorder()
+    run([job(f"P{i}") for i in range(8)], recorder, max_workers=3)
+    assert sorted(recorder.ran) == [f"P{i}" for i in range(8)]
+    assert recorder.peak["all"] == 3
+
+def test_msi_installers_run_one_at_a_time():
+    recorder = Recorder()
+    jobs = [job(f"M{i}", "tool.msi") for i in range(4)] + [job(f"E{i}") for i in range(4)]
+    run(jobs, recorder, max_workers=4)
+    assert recorder.peak["msi"] == 1
+    assert recorder.peak["exe"] > 1
+
+def test_custom_class_limits():
+    recorder = Recorder()
+    jobs = [job(f"E{i}") for i in range(6)]
+    run(jobs, recorder, max_workers=4, class_limits={"exe": 2})
+    assert recorder.peak["exe"] == 2
+
+def test_dependents_of_a_failed_install_are_skipped():
+    recorder = Recorder(fail={"Runtime"})
+    jobs = [
+        job("Runtime"),
+        job("Tool", depends_on=["Runtime"]),
+        job("Plugin", depends_on=["Tool"]),
+        job("Other", depends_on=["Not planned"]),
+    ]
+    scheduler = run(jobs, recorder, max_workers=4)
+    assert sorted(recorder.ran) == ["Other", "Runtime"]
+    assert recorder.skipped == {"Tool": "Dependency failed: Runtime", "Plugin": "Dependency failed: Tool"}
+    assert scheduler.results == {"Runtime": False, "Tool": False, "Plugin": False, "Other": True}
+
+def test_dependencies_run_first():
+    recorder = Recorder(seconds=0.01)
+    run([job("Plugin", depends_on=["Tool"]), job("Tool", depends_on=["Runtime"]), job("Runtime")],
+        recorder, max_workers=4)
+    assert recorder.ran == ["Runtime", "Tool", "Plugin"]
+
+def test_dependency_cycle_is_rejected():
+    recorder = Recorder()
+    jobs = [job("A", depends_on=["B"]), job("B", depends_on=["A"]), job("C")]
+    run(jobs, recorder, max_workers=2)
+    assert recorder.ran == ["C"]
+    assert recorder.skipped == {"A": "Dependency cycle", "B": "Dependency cycle"}
+
+def test_no_jobs():
+    run([], Recorder())
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+from installer import installer_command, run_installer
+from process_runner import ProcessRunner
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="runs a POSIX script as the installer")
+
+@pytest.fixture
+def runner():
+    runner = ProcessRunner(2)
+    yield runner
+    runner.shutdown()
+
+def write_installer(tmp_path, body):
+    path = tmp_path / "setup.exe"
+    path.write_text(f"#!{sys.executable}\nimport sys\n{body}\n")
+    path.chmod(0o755)
+    return str(path)
+
+def program(tmp_path, installer_path):
+    return {"name": "Tool", "install_path": str(tmp_path / "Tool"), "installer_path": installer_path,
+            "silent_args": "/S"}
+
+def test_installer_command():
+    assert installer_command("C:\\x\\setup.exe", "/S") == '"C:\\x\\setup.exe" /S'
+    assert installer_command("C:\\x\\tool.MSI", "/qn") == 'msiexec /i "C:\\x\\tool.MSI" /qn'
+    assert installer_command("C:\\x\\setup.exe", "") == '"C:\\x\\setup.exe"'
+
+def test_installer_output_moves_progress(tmp_path, runner):
+    installer = write_installer(tmp_path, 'print(sys.argv[1:]); print("Installing 40%"); print("Done 100%")')
+    messages, progress = [], []
+    success, message = run_installer(program(tmp_path, installer), messages.append,
+                                     progress=lambda done, total: progress.append(done), runner=runner)
+    assert success, message
+    assert progress == [40, 100]
+    assert any("['/S']" in line for line in messages)
+
+def test_failed_installer_reports_exit_code(tmp_path, runner):
+    installer = write_installer(tmp_path, "sys.exit(3)")
+    success, message = run_installer(program(tmp_path, installer), lambda message: None, runner=runner)
+    assert not success
+    assert "exited with code 3" in message
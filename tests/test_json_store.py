@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from integrity import HashManifest
+from probe_cache import ProbeCache
+
+def hash_files(manifest_path, paths):
+    manifest = HashManifest(manifest_path)
+    for path in paths:
+        manifest.get_hash(path)
+    manifest.save()
+
+def test_saves_keep_entries_of_other_instances(tmp_path):
+    files = []
+    for i in range(4):
+        path = tmp_path / f"installer{i}.exe"
+        path.write_bytes(bytes([i]) * 100)
+        files.append(str(path))
+    manifest_path = str(tmp_path / "hash_manifest.json")
+
+    # Both load an empty manifest before either saves
+    first = HashManifest(manifest_path)
+    second = HashManifest(manifest_path)
+    first.get_hash(files[0])
+    second.get_hash(files[1])
+    first.save()
+    second.save()
+    assert len(HashManifest(manifest_path).entries) == 2
+
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        list(pool.map(hash_files, [manifest_path] * 2, [files[2:3], files[3:]]))
+    assert len(HashManifest(manifest_path).entries) == 4
+
+def test_invalidate_removes_entry_saved_by_another_instance(tmp_path):
+    cache_path = str(tmp_path / "probe_cache.json")
+    install_dir = tmp_path / "Tool"
+    install_dir.mkdir()
+    program = {"name": "Tool", "install_path": str(install_dir)}
+    stale = ProbeCache(cache_path)
+    writer = ProbeCache(cache_path)
+    writer.store(program, True, "1.0")
+    writer.save()
+    assert ProbeCache(cache_path).lookup(program) == (True, "1.0")
+    stale.invalidate("Tool")
+    stale.save()
+    assert ProbeCache(cache_path).lookup(program) is None
@@ -0,0 +1,93 @@
+import struct
+
+import pytest
+
+from pe_builder import build_pe, fixed_file_info, string_table, version_info
+from pe_version import PEFormatError, get_exe_version, read_version_info
+
+def write(tmp_path, data, name="tool.exe"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def simple_info(version="4.2.5.1"):
+    return version_info(
+        [string_table("040904b0", {"FileVersion": version, "ProductVersion": version})],
+        fixed_file_info((4, 2, 5, 1)))
+
+@pytest.mark.parametrize("pe32_plus", [False, True])
+def test_read_version_info(tmp_path, pe32_plus):
+    path = write(tmp_path, build_pe([(0x409, simple_info())], pe32_plus=pe32_plus))
+    info = read_version_info(path)
+    assert info["FileVersion"] == "4.2.5.1"
+    assert info["ProductVersion"] == "4.2.5.1"
+    assert info["FixedFileVersion"] == "4.2.5.1"
+    assert get_exe_version(path) == "4.2.5.1"
+    assert get_exe_version(path, "ProductVersion") == "4.2.5.1"
+
+def test_first_string_table_wins(tmp_path):
+    info = version_info([
+        string_table("040704b0", {"FileVersion": "2.0 (de)"}),
+        string_table("040904b0", {"FileVersion": "2.0 (en)", "ProductVersion": "2.0"}),
+    ])
+    path = write(tmp_path, build_pe([(0x409, info)]))
+    assert read_version_info(path)["FileVersion"] == "2.0 (de)"
+    # Strings missing from the first table come from the next one
+    assert get_exe_version(path, "ProductVersion") == "2.0"
+
+def test_first_language_resource_wins(tmp_path):
+    path = write(tmp_path, build_pe([(0x407, simple_info("1.1")), (0x409, simple_info("1.2"))]))
+    assert get_exe_version(path) == "1.1"
+
+def test_fixed_version_without_string_file_info(tmp_path):
+    path = write(tmp_path, build_pe([(0x409, version_info(fixed=fixed_file_info((3, 1, 0, 7), (3, 1, 0, 0))))]))
+    info = read_version_info(path)
+    assert "FileVersion" not in info
+    assert get_exe_version(path) == "3.1.0.7"
+    assert get_exe_version(path, "ProductVersion") == "3.1.0.0"
+
+def test_empty_string_falls_back_to_fixed_version(tmp_path):
+    info = version_info([string_table("040904b0", {"FileVersion": " "})], fixed_file_info((5, 0, 0, 2)))
+    assert get_exe_version(write(tmp_path, build_pe([(0x409, info)]))) == "5.0.0.2"
+
+def test_no_version_at_all(tmp_path):
+    path = write(tmp_path, build_pe([(0x409, version_info())]))
+    assert read_version_info(path) == {}
+    assert get_exe_version(path) is None
+
+@pytest.mark.parametrize("cut", [0x400 + 8, 0x400 + 30, 0x400 + 60, 0x400 + 100])
+def test_truncated_resources(tmp_path, cut):
+    path = write(tmp_path, build_pe([(0x409, simple_info())])[:cut])
+    assert read_version_info(path) is None
+    assert get_exe_version(path) is None
+
+@pytest.mark.parametrize("patches", [
+    [("<I", 20, 0x80000000 | 0x7FFFFF00)],  # type directory entry points far outside the section
+    [("<I", 16, 17), ("<H", 14, 0xFFFF)],   # no RT_VERSION among more entries than the section holds
+    [("<I", 68, 0x7FFFFF00)],               # language entry points outside the section
+    [("<I", 72, 0xDEADBEEF)],               # data entry RVA outside every section
+    [("<I", 76, 0x7FFFFFFF)],               # data entry size beyond the end of the file
+])
+def test_corrupt_resource_directory(tmp_path, patches):
+    data = bytearray(build_pe([(0x409, simple_info())]))
+    for struct_format, offset, value in patches:
+        struct.pack_into(struct_format, data, 0x400 + offset, value)
+    path = write(tmp_path, bytes(data))
+    assert read_version_info(path) is None
+    assert get_exe_version(path) is None
+
+def test_corrupt_version_block(tmp_path):
+    info = bytearray(simple_info())
+    # wLength of StringFileInfo claims far more than the resource holds
+    start = info.index("StringFileInfo".encode("utf-16-le")) - 6
+    struct.pack_into("<H", info, start, 0xFFF0)
+    path = write(tmp_path, build_pe([(0x409, bytes(info))]))
+    assert get_exe_version(path) == "4.2.5.1"
+
+def test_non_pe_files(tmp_path):
+    path = write(tmp_path, b"not an executable", "notes.txt")
+    with pytest.raises(PEFormatError):
+        read_version_info(path)
+    assert get_exe_version(path) is None
+    assert get_exe_version(str(tmp_path / "missing.exe")) is None
+    assert get_exe_version(write(tmp_path, b"", "empty.exe")) is None
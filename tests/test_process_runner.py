@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+import pytest
+
+from process_runner import ProcessRunner
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses a POSIX shell to start a sleeping child")
+
+# Wrapper that starts a long-running child and waits for it, like Start-Process -Wait
+WRAPPER = ["sh", "-c", "sleep 60 & echo $!; wait"]
+
+def is_running(pid):
+    """Return True while pid exists and is not a zombie"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+def wait_gone(pid, seconds=5):
+    deadline = time.monotonic() + seconds
+    while is_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not is_running(pid)
+
+@pytest.fixture
+def runner():
+    runner = ProcessRunner(4)
+    yield runner
+    runner.shutdown()
+
+def start_wrapper(runner, **kwargs):
+    """Submit the wrapper and return (job, pid of its sleeping child)"""
+    pids = []
+    started = threading.Event()
+
+    def on_line(stream, line):
+        pids.append(int(line))
+        started.set()
+
+    job = runner.submit(WRAPPER, on_line=on_line, **kwargs)
+    assert started.wait(10)
+    return job, pids[0]
+
+def test_timeout_kills_process_tree(runner):
+    started = time.monotonic()
+    job, child = start_wrapper(runner, timeout=1)
+    result = job.result(30)
+    assert result.timed_out and result.returncode is None
+    assert time.monotonic() - started < 30
+    assert wait_gone(child)
+
+def test_cancel_kills_process_tree(runner):
+    job, child = start_wrapper(runner)
+    job.cancel()
+    result = job.result(30)
+    assert result.cancelled and result.returncode is None
+    assert wait_gone(child)
+
+def test_output_is_captured(runner):
+    result = runner.run(["sh", "-c", "echo out; echo err >&2; exit 3"], timeout=10)
+    assert (result.returncode, result.stdout.strip(), result.stderr.strip()) == (3, "out", "err")
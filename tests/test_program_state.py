@@ -0,0 +1,32 @@
+from program_state import ProgramStore
+
+def program(name, new_version="2.0"):
+    return {"name": name, "install_path": f"C:\\Tools\\{name}", "new_version": new_version}
+
+def test_unchanged_programs_keep_their_state():
+    store = ProgramStore([program("A"), program("B")])
+    state = store.get("A")
+    fresh = store.set_programs([program("A"), program("B", "3.0")])
+    assert store.get("A") is state
+    assert [state.name for state in fresh] == ["B"]
+
+def test_busy_program_is_replaced_once_its_update_finishes():
+    store = ProgramStore([program("A")])
+    state = store.get("A")
+    store.update(state, busy=True)
+
+    # Reloaded while its installer runs: the row keeps the running update
+    assert store.set_programs([program("A", "3.0")]) == []
+    assert store.get("A") is state and state.busy
+
+    fresh = store.finish_update(state, status="Installed")
+    assert not state.busy
+    assert store.get("A") is fresh
+    assert fresh.new_version == "3.0" and not fresh.busy
+
+def test_finished_update_without_reload_keeps_state():
+    store = ProgramStore([program("A")])
+    state = store.get("A")
+    store.update(state, busy=True)
+    assert store.finish_update(state, status="Installed") is None
+    assert store.get("A") is state and state.status == "Installed"
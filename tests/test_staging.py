@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+from concurrent.futures import Future
+
+from staging import InstallerCache, InstallerStager, cache_key, stage_installer
+from timing_history import staged_hash
+
+def make_program(tmp_path, name="setup.exe", **fields):
+    source = tmp_path / "media" / name
+    source.parent.mkdir(exist_ok=True)
+    source.write_bytes(b"installer" * 100)
+    program = {"name": "Tool", "installer_path": str(source), "sha256": hashlib.sha256(source.read_bytes()).hexdigest()}
+    program.update(fields)
+    return program
+
+def test_staged_copy_keeps_file_name(tmp_path):
+    program = make_program(tmp_path)
+    cache = InstallerCache(str(tmp_path / "installers"), 1024 * 1024)
+    status, _, path = stage_installer(program, cache)
+    assert status == "OK"
+    assert os.path.basename(path) == "setup.exe"
+    assert staged_hash(path) == program["sha256"]
+
+    cache.release(path)
+    assert not cache.pins
+    # A second run uses the copy without reading the source
+    os.remove(program["installer_path"])
+    assert stage_installer(program, cache)[2] == path
+
+def test_stage_false_runs_in_place(tmp_path):
+    program = make_program(tmp_path, stage=False)
+    cache = InstallerCache(str(tmp_path / "installers"), 1024 * 1024)
+    assert stage_installer(program, cache) == ("OK", "Installer hash verified", program["installer_path"])
+    assert not cache.entries
+
+def test_format_1_copies_are_removed(tmp_path):
+    cache_dir = tmp_path / "installers"
+    old = cache_dir / "ab" / ("ab" + "0" * 62 + ".exe")
+    old.parent.mkdir(parents=True)
+    old.write_bytes(b"old")
+    (cache_dir / "index.json").write_text(json.dumps({"format": 1, "entries": {old.name: {}}}))
+    cache = InstallerCache(str(cache_dir), 1024 * 1024)
+    assert not old.exists()
+    assert not cache.entries
+
+def add_copy(cache, data):
+    sha256 = hashlib.sha256(data).hexdigest()
+    f, tmp = cache.temp_file()
+    with f:
+        f.write(data)
+    path = cache.add(cache_key(sha256, "setup.exe"), tmp)
+    cache.release(path)
+    return path
+
+def test_caches_sharing_a_directory_keep_each_others_copies(tmp_path):
+    cache_dir = str(tmp_path / "installers")
+    gui, cli = InstallerCache(cache_dir, 1000), InstallerCache(cache_dir, 1000)
+    first = add_copy(gui, b"a" * 400)
+    second = add_copy(cli, b"b" * 400)
+    gui.save()
+    cli.save()
+    assert len(InstallerCache(cache_dir, 1000).entries) == 2
+
+    # The copies of the other process count towards the size cap
+    third = add_copy(gui, b"c" * 400)
+    gui.save()
+    assert len(InstallerCache(cache_dir, 1000).entries) == 2
+    assert not os.path.exists(first) and os.path.exists(second) and os.path.exists(third)
+
+def test_skip_ignores_failed_staging(tmp_path):
+    cache = InstallerCache(str(tmp_path / "installers"), 1024 * 1024)
+    stager = InstallerStager(cache)
+    future = Future()
+    future.set_exception(OSError("media removed"))
+    stager.release_staged(future)
+    stager.close()
@@ -0,0 +1,27 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from timing_history import TimingHistory
+
+OLD_SCHEMA = (
+    "CREATE TABLE durations (program TEXT NOT NULL, phase TEXT NOT NULL, installer_hash TEXT NOT NULL DEFAULT '', "
+    "duration REAL NOT NULL, success INTEGER NOT NULL DEFAULT 1, recorded REAL NOT NULL)"
+)
+
+def open_history(path):
+    TimingHistory(path)
+    return True
+
+def test_concurrent_open_migrates_once(tmp_path):
+    path = str(tmp_path / "timing_history.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(OLD_SCHEMA)
+    conn.commit()
+    conn.close()
+
+    with ProcessPoolExecutor(max_workers=6) as pool:
+        assert all(pool.map(open_history, [path] * 6))
+
+    history = TimingHistory(path)
+    history.record_spans([{"phase": "install", "program": "Tool", "duration": 2.0, "timed_out": True}])
+    assert history.longest("install") == {("Tool", ""): 2.0}
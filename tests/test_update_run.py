@@ -0,0 +1,40 @@
+import json
+import zipfile
+
+from update_journal import CANCELLED, FAILED, INSTALLED, STARTED, VERIFIED, UpdateJournal
+from update_run import VerifiedInstallers, update_program
+
+def make_program(tmp_path):
+    installer = tmp_path / "tool.zip"
+    with zipfile.ZipFile(installer, "w") as archive:
+        archive.writestr("tool.txt", "1.0")
+    return {"name": "Tool", "install_path": str(tmp_path / "Tool"), "installer_path": str(installer), "silent_args": ""}
+
+def journal_states(journal):
+    with open(journal.path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return [record["state"] for record in records if record["event"] == "state"]
+
+def test_update_is_journaled_and_verified(tmp_path):
+    program = make_program(tmp_path)
+    journal = UpdateJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin([program])
+    installers = VerifiedInstallers({"Tool": ("No Hash", "No sha256 configured")})
+
+    status, success, message = update_program(program, installers, lambda text: None, journal=journal)
+    assert (status, success) == ("No Hash", True), message
+    assert (tmp_path / "Tool" / "tool.txt").exists()
+    assert journal_states(journal) == [STARTED, INSTALLED, VERIFIED]
+
+def test_cancelled_and_unverified_updates_do_not_run(tmp_path):
+    program = make_program(tmp_path)
+    journal = UpdateJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin([program])
+
+    installers = VerifiedInstallers({"Tool": ("OK", "Installer hash verified")})
+    assert update_program(program, installers, print, journal=journal, cancelled=lambda: True)[:2] == ("Cancelled", False)
+    installers = VerifiedInstallers({"Tool": ("Mismatch", "Installer hash mismatch")})
+    assert update_program(program, installers, print, journal=journal)[:2] == ("Mismatch", False)
+
+    assert not (tmp_path / "Tool").exists()
+    assert journal_states(journal) == [CANCELLED, FAILED]
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from instrumentation import Tracer
+from process_runner import ProcessRunner
+from timeouts import TimeoutPolicy
+from timing_history import TimingHistory
+from version_probe import NEEDS_UPDATE, ProbeEngine, get_install_status
+
+def program(new_version):
+    return {"name": "Tool", "new_version": new_version}
+
+@pytest.mark.parametrize("current", ["Unknown", "Error", "Timeout"])
+def test_failed_probe_does_not_ask_for_update(current):
+    status = get_install_status(program("2.0"), True, current)
+    assert status == "Installed"
+    assert status not in NEEDS_UPDATE
+
+@pytest.mark.parametrize("current, expected", [
+    ("1.0", "Update Available"),
+    ("2.0", "Installed"),
+    ("3.0", "Newer Installed"),
+    ("Damaged", "Damaged"),
+])
+def test_install_status(current, expected):
+    assert get_install_status(program("2.0"), True, current) == expected
+
+def test_not_installed():
+    assert get_install_status(program("2.0"), False, "Not Installed") == "Not Installed"
+
+@pytest.mark.skipif(os.name == "nt", reason="uses a POSIX sleep as the version command")
+def test_killed_probe_raises_next_timeout(tmp_path):
+    history = TimingHistory(str(tmp_path / "timing_history.sqlite3"))
+    policy = TimeoutPolicy(history, defaults={"probe": 1})
+    slow = {"name": "Slow", "install_path": str(tmp_path),
+            "version_check": {"type": "cmd_output", "command": "sleep 10"}}
+    assert policy.get(slow, "probe") == 1
+
+    runner = ProcessRunner(2)
+    engine = ProbeEngine(runner=runner, timeouts=policy)
+    tracer = Tracer("check")
+    try:
+        assert engine.probe_all_sync([slow], tracer=tracer) == [(True, "Timeout")]
+    finally:
+        engine.shutdown()
+        runner.shutdown()
+    history.record_spans(tracer.spans)
+
+    assert TimeoutPolicy(history, defaults={"probe": 1}).get(slow, "probe") > 1
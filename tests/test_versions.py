@@ -0,0 +1,36 @@
+import pytest
+
+from versions import compare_versions
+
+@pytest.mark.parametrize("older, newer", [
+    ("4.2.5", "4.2.6"),
+    ("1.0.0-rc1", "1.0.0"),
+    ("1.0.0-rc1", "1.0.0-rc2"),
+    ("1.0b2", "1.0"),
+    ("2024-03-01", "2024-05-01"),
+    ("1.0.0-1", "1.0.0-2"),
+    ("1.2.3 build 456", "1.2.3 build 789"),
+    ("20.9 SR-4", "20.9 SR-5"),
+    ("2.44.0.windows.1", "2.44.0.windows.2"),
+    ("1.2.3", "1.2.3 build 1"),
+])
+def test_older_version_sorts_first(older, newer):
+    assert compare_versions(older, newer) == -1
+    assert compare_versions(newer, older) == 1
+
+@pytest.mark.parametrize("a, b", [
+    ("4.2.5", "4.2.5.0"),
+    ("v2.1", "2.1"),
+    ("2.1 (64-bit)", "2.1"),
+    ("2.1 x64", "Version 2.1"),
+    ("7-Zip 23.01", "23.01"),
+])
+def test_equal_versions(a, b):
+    assert compare_versions(a, b) == 0
+
+def test_date_scheme():
+    assert compare_versions("2024.03.01", "2024-05-01", "date") == -1
+
+def test_unparsable_versions():
+    assert compare_versions("Unknown", "1.0") is None
+    assert compare_versions("1.0", "1.0", "string") is None
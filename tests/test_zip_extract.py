@@ -0,0 +1,76 @@
+import os
+import zipfile
+
+import pytest
+
+from zip_extract import extract_zip, safe_target
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+MEMBERS = {"tool.exe": b"binary" * 1000, "lib/helper.dll": b"helper" * 500, "README.txt": b"read me"}
+
+def test_extract_and_skip_unchanged(tmp_path):
+    archive = write_zip(tmp_path / "tool.zip", MEMBERS)
+    dest = tmp_path / "Tool"
+    progress = []
+    counts = extract_zip(archive, str(dest), max_workers=2, progress=lambda done, total: progress.append((done, total)))
+    assert counts == (3, 0)
+    assert (dest / "lib" / "helper.dll").read_bytes() == MEMBERS["lib/helper.dll"]
+    total = sum(len(data) for data in MEMBERS.values())
+    assert progress[-1] == (total, total)
+
+    # Unchanged members are not rewritten; a modified one is restored
+    os.utime(dest / "README.txt", (1000000000, 1000000000))
+    (dest / "tool.exe").write_bytes(b"patched" * 1000)
+    assert extract_zip(archive, str(dest)) == (1, 2)
+    assert (dest / "tool.exe").read_bytes() == MEMBERS["tool.exe"]
+    assert os.stat(dest / "README.txt").st_mtime == 1000000000
+
+def test_same_size_different_content_is_extracted(tmp_path):
+    archive = write_zip(tmp_path / "tool.zip", {"a.txt": b"aaaa"})
+    dest = tmp_path / "Tool"
+    dest.mkdir()
+    (dest / "a.txt").write_bytes(b"bbbb")
+    assert extract_zip(archive, str(dest)) == (1, 0)
+    assert (dest / "a.txt").read_bytes() == b"aaaa"
+
+@pytest.mark.parametrize("name", [
+    "../evil.txt",
+    "lib/../../evil.txt",
+    "/etc/evil.txt",
+    "\\Windows\\evil.txt",
+    "C:/Windows/evil.txt",
+    "C:\\Windows\\evil.txt",
+    "c:evil.txt",
+])
+def test_safe_target_rejects_escaping_names(tmp_path, name):
+    with pytest.raises(ValueError):
+        safe_target(os.path.realpath(str(tmp_path)), name)
+
+def test_safe_target_allows_names_inside(tmp_path):
+    dest = os.path.realpath(str(tmp_path))
+    assert safe_target(dest, "lib/./helper.dll") == os.path.join(dest, "lib", "helper.dll")
+    assert safe_target(dest, "lib/../tool.exe") == os.path.join(dest, "tool.exe")
+
+def test_traversal_member_is_not_written(tmp_path):
+    archive = write_zip(tmp_path / "evil.zip", {"ok.txt": b"ok", "../outside.txt": b"evil"})
+    with pytest.raises(ValueError):
+        extract_zip(archive, str(tmp_path / "Tool"))
+    assert not (tmp_path / "outside.txt").exists()
+    assert not (tmp_path / "Tool" / "ok.txt").exists()
+
+@pytest.mark.skipif(os.name == "nt", reason="creating symlinks needs privileges on Windows")
+def test_symlink_out_of_destination_is_rejected(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    dest = tmp_path / "Tool"
+    dest.mkdir()
+    os.symlink(str(outside), str(dest / "link"))
+    archive = write_zip(tmp_path / "evil.zip", {"link/evil.txt": b"evil"})
+    with pytest.raises(ValueError):
+        extract_zip(archive, str(dest))
+    assert not (outside / "evil.txt").exists()